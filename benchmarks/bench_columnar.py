@@ -0,0 +1,70 @@
+"""Compare the startup time and memory of the memory and columnar repositories on a synthetic catalogue.
+
+Each repository is loaded in a fresh process, the memory figure is the growth of that process's peak resident set.
+
+Usage: python -m benchmarks.bench_columnar [number_of_books]
+"""
+import multiprocessing
+import resource
+import sys
+import time
+
+from library.adapters.columnar_repository import ColumnarRepository
+from library.adapters.memory_repository import MemoryRepository
+from library.domain.model import Book, Author, Publisher
+
+NO_PHOTO_URL = 'https://s.gr-assets.com/assets/nophoto/book/111x148-bcc042a9c91a29c1d680899eff700a03.png'
+
+
+def make_authors(number_of_authors: int):
+    return [Author(author_id, f'Author {author_id}') for author_id in range(number_of_authors)]
+
+
+def make_books(number_of_books: int, authors):
+    # Books are generated one at a time, as the JSON reader streams them.
+    for book_id in range(number_of_books):
+        book = Book(book_id, f'Title of book {book_id}')
+        book.publisher = Publisher(f'Publisher {book_id % 500}')
+        book.add_author(authors[book_id % len(authors)])
+        book.release_year = 1950 + book_id % 70
+        book.ebook = book_id % 2 == 0
+        book.description = f'The description of book {book_id}, long enough to look like a real one.'
+        book.num_pages = 100 + book_id % 300
+        book.image_url = NO_PHOTO_URL
+        book.isbn = f'{book_id:010d}'
+        book.link = f'https://www.goodreads.com/book/show/{book_id}'
+        book.ratings_count = book_id % 1000
+        book.average_rating = 3.5
+        book.text_reviews_count = book_id % 100
+        yield book
+
+
+def peak_rss_in_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load(repository_class, number_of_books: int, results):
+    authors = make_authors(max(1, number_of_books // 3))
+    repo = repository_class()
+    baseline = peak_rss_in_mb()
+    start = time.perf_counter()
+    repo.bulk_load(make_books(number_of_books, authors), authors, [])
+    repo.get_books_after(None, 10)
+    elapsed = time.perf_counter() - start
+    results.put((elapsed, peak_rss_in_mb() - baseline))
+
+
+def main():
+    number_of_books = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    results = multiprocessing.Queue()
+    print(f'{number_of_books} books')
+    for repository_class in (MemoryRepository, ColumnarRepository):
+        process = multiprocessing.Process(target=load, args=(repository_class, number_of_books, results))
+        process.start()
+        elapsed, megabytes = results.get()
+        process.join()
+        print(f'{repository_class.__name__:>18}: {elapsed:6.2f}s to load, {megabytes:8.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
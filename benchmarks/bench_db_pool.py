@@ -0,0 +1,58 @@
+"""Throughput of /books on the database repository under concurrent clients, per connection pool.
+
+A pool of threads stands in for the workers of a threaded server, each serving one request at a time.
+
+Usage: python -m benchmarks.bench_db_pool [number_of_requests] [number_of_clients]
+"""
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import clear_mappers
+
+from library import create_app
+from utils import get_project_root
+
+URLS = ['/books', '/books?book_id=25742454&search_type=book', '/books?search_type=publisher&query=N%2FA']
+
+
+def make_app(database_uri: str, pool: str, number_of_clients: int):
+    return create_app({
+        'TEST_DATA_PATH': get_project_root() / 'tests' / 'data',
+        'WTF_CSRF_ENABLED': False,
+        'REPOSITORY': 'database',
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_POOL': pool,
+        'SQLALCHEMY_POOL_SIZE': number_of_clients,
+        'RECOMMENDATION_POOL_REFRESH': 0,
+        'HASHING_EXECUTOR': 'inline',
+    })
+
+
+def run(app, number_of_requests: int, number_of_clients: int) -> float:
+    def serve(index: int):
+        response = app.test_client().get(URLS[index % len(URLS)])
+        assert response.status_code == 200
+
+    with ThreadPoolExecutor(number_of_clients) as clients:
+        list(clients.map(serve, range(number_of_clients)))  # Warm up.
+        start = time.perf_counter()
+        list(clients.map(serve, range(number_of_requests)))
+        return number_of_requests / (time.perf_counter() - start)
+
+
+def main():
+    number_of_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    number_of_clients = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    print(f'{number_of_requests} requests from {number_of_clients} clients')
+    with tempfile.TemporaryDirectory() as directory:
+        database_uri = f'sqlite:///{directory}/bench.db'
+        for pool in ('null', 'queue'):
+            clear_mappers()
+            app = make_app(database_uri, pool, number_of_clients)
+            print(f'{pool:>6}: {run(app, number_of_requests, number_of_clients):8.1f} requests/s')
+
+
+if __name__ == '__main__':
+    main()
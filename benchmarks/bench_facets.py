@@ -0,0 +1,111 @@
+"""Measure faceted queries on the bitmap FacetIndex and on SqlAlchemyRepository, against a plain scan of the books.
+
+Each query asks for the first page of 10 books, the number of matching books and the facet counts.
+
+Usage: python -m benchmarks.bench_facets [number_of_books]
+"""
+import random
+import sys
+import tempfile
+import time
+import timeit
+from collections import Counter
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from library.adapters import database_repository
+from library.adapters.facet_index import FacetIndex, FacetedQuery
+from library.adapters.orm import metadata, map_model_to_tables, books_table, book_authors_table, publishers_table
+
+PAGE_SIZE = 10
+REPEATS = 5
+QUERIES = {
+    'publisher and years': FacetedQuery(publisher_names=['Publisher 7'], release_year_min=1990, release_year_max=2000),
+    'ebook and rating': FacetedQuery(ebook=True, min_rating=4.5),
+    'author or publisher': FacetedQuery(author_ids=[12, 99], publisher_names=['Publisher 3'], operator='or'),
+    'pages by rating': FacetedQuery(num_pages_min=200, num_pages_max=250, sort_by='average_rating', descending=True),
+    'all by title': FacetedQuery(sort_by='title'),
+}
+
+
+def make_rows(number_of_books: int):
+    generator = random.Random(42)
+    for book_id in range(number_of_books):
+        yield {
+            'book_id': book_id,
+            'title': f'Title {generator.randrange(number_of_books)}',
+            'publisher_name': f'Publisher {book_id % 500}',
+            'author_id': generator.randrange(max(1, number_of_books // 3)),
+            'release_year': 1900 + generator.randrange(120),
+            'ebook': generator.random() < 0.3,
+            'num_pages': 50 + generator.randrange(950),
+            'average_rating': round(generator.uniform(1, 5), 2),
+            'ratings_count': generator.randrange(100_000),
+        }
+
+
+def scan(rows, query: FacetedQuery):
+    # What the views could do without the indexes: test every book against every filter.
+    def matches(row):
+        tests = []
+        if query.publisher_names:
+            tests.append(row['publisher_name'] in query.publisher_names)
+        if query.author_ids:
+            tests.append(row['author_id'] in query.author_ids)
+        if query.ebook is not None:
+            tests.append(row['ebook'] == query.ebook)
+        if query.release_year_min is not None or query.release_year_max is not None:
+            tests.append((query.release_year_min or 0) <= row['release_year'] <= (query.release_year_max or 10 ** 9))
+        if query.num_pages_min is not None or query.num_pages_max is not None:
+            tests.append((query.num_pages_min or 0) <= row['num_pages'] <= (query.num_pages_max or 10 ** 9))
+        if query.min_rating is not None:
+            tests.append(row['average_rating'] >= query.min_rating)
+        return not tests or (all(tests) if query.operator == 'and' else any(tests))
+
+    matched = [row for row in rows if matches(row)]
+    counts = Counter(row['publisher_name'] for row in matched), Counter(row['release_year'] for row in matched)
+    matched.sort(key=lambda row: (row[query.sort_by], row['book_id']), reverse=query.descending)
+    return matched[:PAGE_SIZE], len(matched), counts
+
+
+def main():
+    number_of_books = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rows = list(make_rows(number_of_books))
+    print(f'{number_of_books} books')
+
+    start = time.perf_counter()
+    index = FacetIndex()
+    for row in rows:
+        index.add(row['book_id'], row['title'], row['publisher_name'], [row['author_id']], row['release_year'],
+                  row['ebook'], row['num_pages'], row['average_rating'], row['ratings_count'])
+    print(f'facet index loaded in {time.perf_counter() - start:.2f}s')
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f'sqlite:///{directory}/bench.db')
+        clear_mappers()
+        metadata.create_all(engine)
+        map_model_to_tables()
+        with engine.begin() as connection:
+            connection.execute(publishers_table.insert(), [{'name': f'Publisher {n}'} for n in range(500)])
+            connection.execute(books_table.insert(), [
+                {key: value for key, value in row.items() if key != 'author_id'} for row in rows])
+            connection.execute(book_authors_table.insert(), [
+                {'book_id': row['book_id'], 'author_id': row['author_id']} for row in rows])
+        repo = database_repository.SqlAlchemyRepository(sessionmaker(bind=engine))
+
+        print(f'{"query":>20} {"scan (ms)":>10} {"bitmap first (ms)":>18} {"bitmap (ms)":>12} {"sqlite (ms)":>12}')
+        for name, query in QUERIES.items():
+            start = time.perf_counter()
+            index.query(query, 0, PAGE_SIZE)
+            first = time.perf_counter() - start
+            bitmap = timeit.timeit(lambda: index.query(query, 0, PAGE_SIZE), number=REPEATS) / REPEATS
+            scanned = timeit.timeit(lambda: scan(rows, query), number=1)
+            sqlite = timeit.timeit(lambda: repo.get_books_by_facets(query, 0, PAGE_SIZE), number=REPEATS) / REPEATS
+            assert index.query(query, 0, PAGE_SIZE)[0] == [row['book_id'] for row in scan(rows, query)[0]]
+            print(f'{name:>20} {scanned * 1000:10.1f} {first * 1000:18.1f} {bitmap * 1000:12.1f} '
+                  f'{sqlite * 1000:12.1f}')
+
+
+if __name__ == '__main__':
+    main()
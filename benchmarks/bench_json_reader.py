@@ -0,0 +1,77 @@
+"""Time BooksJSONReader on a synthetic Goodreads-shaped dataset.
+
+The indexed author resolution is timed over the whole file, the previous linear scan over dataset_of_authors is
+timed on a sample of books and extrapolated, as running it to completion takes hours at full size.
+
+Usage: python -m benchmarks.bench_json_reader [number_of_authors] [number_of_books]
+"""
+import itertools
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from library.adapters.jsondatareader import BooksJSONReader
+
+LEGACY_SAMPLE_SIZE = 200
+
+
+def write_synthetic_files(directory: Path, number_of_authors: int, number_of_books: int):
+    authors_file = directory / 'book_authors_excerpt.json'
+    books_file = directory / 'comic_books_excerpt.json'
+    with open(authors_file, 'w', encoding='UTF-8') as outfile:
+        for author_id in range(number_of_authors):
+            outfile.write(json.dumps({'author_id': str(author_id), 'name': f'Author {author_id}',
+                                      'average_rating': '3.9', 'text_reviews_count': '4',
+                                      'ratings_count': '12'}) + '\n')
+    with open(books_file, 'w', encoding='UTF-8') as outfile:
+        for book_id in range(number_of_books):
+            authors = [{'author_id': str(random.randrange(number_of_authors)), 'role': ''}
+                       for _ in range(random.randint(1, 3))]
+            outfile.write(json.dumps({'book_id': str(book_id), 'title': f'Book {book_id}', 'publisher': 'N/A',
+                                      'publication_year': '2016', 'is_ebook': 'false', 'description': '',
+                                      'num_pages': '120', 'image_url': '', 'isbn': '', 'link': '',
+                                      'ratings_count': '3', 'average_rating': '4.1', 'text_reviews_count': '1',
+                                      'authors': authors}) + '\n')
+    return str(books_file), str(authors_file)
+
+
+def legacy_resolve(book_json: dict, dataset_of_authors: list):
+    resolved = []
+    for author_id in book_json['authors']:
+        numerical_id = int(author_id['author_id'])
+        for author in dataset_of_authors:
+            if author.unique_id == numerical_id:
+                resolved.append(author)
+                break
+    return resolved
+
+
+def main():
+    number_of_authors = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    number_of_books = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+
+    with tempfile.TemporaryDirectory() as directory:
+        books_file, authors_file = write_synthetic_files(Path(directory), number_of_authors, number_of_books)
+
+        reader = BooksJSONReader(books_file, authors_file)
+        start = time.perf_counter()
+        reader.read_authors()
+        number_of_books_read = sum(1 for _ in reader.iter_books())
+        indexed = time.perf_counter() - start
+
+        sample = list(itertools.islice(reader.iter_json_lines(books_file), LEGACY_SAMPLE_SIZE))
+        start = time.perf_counter()
+        for book_json in sample:
+            legacy_resolve(book_json, reader.dataset_of_authors)
+        legacy = (time.perf_counter() - start) / len(sample) * number_of_books
+
+    print(f'{number_of_authors} authors, {number_of_books_read} books')
+    print(f'indexed author resolution (full read): {indexed:10.2f}s')
+    print(f'linear author scan (extrapolated):     {legacy:10.2f}s ({legacy / indexed:.0f}x slower)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Time loading a users file with plaintext passwords (hashed serially and in parallel) and with password hashes.
+
+Usage: python -m benchmarks.bench_load_users [number_of_users]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from library.adapters import csv_data_importer
+from library.adapters.csv_data_importer import load_users, write_hashed_users_file
+
+
+def timed_load(data_path: Path) -> float:
+    start = time.perf_counter()
+    load_users(data_path)
+    return time.perf_counter() - start
+
+
+def main():
+    number_of_users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as plaintext_path, tempfile.TemporaryDirectory() as hashed_path:
+        with open(Path(plaintext_path) / 'users.csv', 'w', encoding='utf-8') as users_file:
+            users_file.write('id,username,password\n')
+            for user_id in range(number_of_users):
+                users_file.write(f'{user_id},user{user_id},password{user_id}\n')
+        write_hashed_users_file(plaintext_path, Path(hashed_path) / 'users.csv')
+
+        print(f'{number_of_users} users')
+        parallel = timed_load(plaintext_path)
+        csv_data_importer.PARALLEL_HASHING_THRESHOLD = number_of_users + 1
+        print(f'plaintext, serial hashing:   {timed_load(plaintext_path):8.3f}s')
+        print(f'plaintext, parallel hashing: {parallel:8.3f}s')
+        print(f'password hashes:             {timed_load(hashed_path):8.3f}s')
+
+
+if __name__ == '__main__':
+    main()
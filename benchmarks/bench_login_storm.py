@@ -0,0 +1,72 @@
+"""Load test: a storm of logins arriving together with ordinary page views, with and without the hashing executor.
+
+A pool of threads stands in for the sync WSGI workers, each serving one request at a time. With inline hashing every
+worker ends up hashing and the page views queue behind the logins. With the hashing executor only a bounded number of
+logins wait for a hash, the rest are answered with a 503 straight away and the page views keep flowing.
+
+Usage: python -m benchmarks.bench_login_storm [number_of_logins]
+"""
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from library import create_app
+from utils import get_project_root
+
+WSGI_WORKERS = 8
+PAGE_VIEWS = 200
+
+
+def make_app(hashing_executor: str):
+    return create_app({
+        'TESTING': True,
+        'TEST_DATA_PATH': get_project_root() / 'tests' / 'data',
+        'WTF_CSRF_ENABLED': False,
+        'REPOSITORY': 'memory',
+        'HASHING_EXECUTOR': hashing_executor,
+        'HASHING_MAX_PENDING': WSGI_WORKERS // 2,
+        'HASHING_QUEUE_TIMEOUT': 0,
+    })
+
+
+def storm(app, number_of_logins: int):
+    def request(method, url, data=None):
+        submitted = time.perf_counter()
+
+        def serve():
+            response = app.test_client().open(url, method=method, data=data)
+            return response.status_code, time.perf_counter() - submitted
+
+        return serve
+
+    requests = []
+    for index in range(max(number_of_logins, PAGE_VIEWS)):
+        if index < number_of_logins:
+            requests.append(('login', request('POST', '/authentication/login',
+                                              {'user_name': 'thorke', 'password': 'cLQ^C#oFXloS'})))
+        if index < PAGE_VIEWS:
+            requests.append(('page', request('GET', '/books?book_id=25742454&search_type=book')))
+
+    with ThreadPoolExecutor(WSGI_WORKERS) as server:
+        futures = [(kind, server.submit(serve)) for kind, serve in requests]
+        return [(kind, *future.result()) for kind, future in futures]
+
+
+def report(name: str, results):
+    page_latencies = sorted(latency for kind, _, latency in results if kind == 'page')
+    logins = [status for kind, status, _ in results if kind == 'login']
+    p99 = page_latencies[int(len(page_latencies) * 0.99) - 1]
+    print(f'{name:>8}: page views p50 {statistics.median(page_latencies) * 1000:8.1f}ms, p99 {p99 * 1000:8.1f}ms; '
+          f'logins {logins.count(302)} signed in, {logins.count(503)} shed (503)')
+
+
+def main():
+    number_of_logins = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print(f'{number_of_logins} logins and {PAGE_VIEWS} page views on {WSGI_WORKERS} workers')
+    for hashing_executor in ('inline', 'process'):
+        report(hashing_executor, storm(make_app(hashing_executor), number_of_logins))
+
+
+if __name__ == '__main__':
+    main()
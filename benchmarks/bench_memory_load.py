@@ -0,0 +1,73 @@
+"""Compare starting the MemoryRepository book by book with bulk loading it, and time inserts into the loaded repository.
+
+Books arrive in shuffled id order, as they do in the data files. Each load runs in a fresh process, and the last
+books are held back and added one by one afterwards, landing at random places in the catalogue.
+
+Usage: python -m benchmarks.bench_memory_load [number_of_books]
+"""
+import multiprocessing
+import random
+import sys
+import time
+
+from benchmarks.bench_columnar import make_authors, make_books
+from library.adapters.memory_repository import MemoryRepository
+from library.domain.model import Publisher
+
+INSERTS = 1000
+
+
+def shuffled_books(number_of_books: int, authors):
+    books = list(make_books(number_of_books, authors))
+    random.Random(42).shuffle(books)
+    return books
+
+
+def per_row(repo: MemoryRepository, books, authors):
+    # What populate does without bulk=True.
+    for book in books:
+        publisher = repo.add_publisher(Publisher(book.publisher.name))
+        publisher.add_book(book)
+        book.publisher = publisher
+        repo.add_book(book)
+    for author in authors:
+        repo.add_author(author)
+
+
+def bulk(repo: MemoryRepository, books, authors):
+    repo.bulk_load(books, authors, [])
+
+
+def load(method, number_of_books: int, results):
+    authors = make_authors(max(1, number_of_books // 3))
+    books = shuffled_books(number_of_books, authors)
+    books, later = books[:-INSERTS], books[-INSERTS:]
+    repo = MemoryRepository()
+    start = time.perf_counter()
+    method(repo, books, authors)
+    repo.get_books_after(None, 10)
+    elapsed = time.perf_counter() - start
+
+    for book in later:
+        book.publisher = repo.add_publisher(Publisher(book.publisher.name))
+    start = time.perf_counter()
+    for book in later:
+        repo.add_book(book)
+    inserts = time.perf_counter() - start
+    results.put((elapsed, inserts))
+
+
+def main():
+    number_of_books = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    results = multiprocessing.Queue()
+    print(f'{number_of_books} books')
+    for method in (per_row, bulk):
+        process = multiprocessing.Process(target=load, args=(method, number_of_books, results))
+        process.start()
+        elapsed, inserts = results.get()
+        process.join()
+        print(f'{method.__name__:>8}: {elapsed:6.2f}s to load, {inserts / INSERTS * 1e6:7.1f}us per later insert')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Report the memory used per Book (and per Author) object of the domain model, as held by the memory repository.
+
+Strings are shared between the objects, so the numbers reflect the representation of the objects themselves.
+
+Usage: python -m benchmarks.bench_model_memory [number_of_books]
+"""
+import sys
+import tracemalloc
+
+from library.domain.model import Book, Author, Publisher
+
+
+def make_books(number_of_books: int, publisher: Publisher, author: Author):
+    books = []
+    for book_id in range(number_of_books):
+        book = Book(book_id, 'A Title')
+        book.publisher = publisher
+        book.add_author(author)
+        book.release_year = 2016
+        book.ebook = False
+        book.description = 'A description'
+        book.num_pages = 120
+        book.image_url = 'https://images.example/book.png'
+        book.isbn = '1234567890'
+        book.link = 'https://books.example/book'
+        book.ratings_count = 3
+        book.average_rating = 4.1
+        book.text_reviews_count = 1
+        books.append(book)
+    return books
+
+
+def make_authors(number_of_authors: int):
+    authors = []
+    for author_id in range(number_of_authors):
+        author = Author(author_id, 'An Author')
+        author.average_rating = 3.9
+        author.text_reviews_count = 4
+        author.ratings_count = 12
+        authors.append(author)
+    return authors
+
+
+def measure(factory, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = factory(count)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    # The list holding the objects is not part of their representation.
+    return (size - sys.getsizeof(objects)) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    publisher = Publisher('A Publisher')
+    author = Author(1, 'An Author')
+    print(f'bytes per Book:   {measure(lambda n: make_books(n, publisher, author), count):8.1f}')
+    print(f'bytes per Author: {measure(make_authors, count):8.1f}')
+
+
+if __name__ == '__main__':
+    main()
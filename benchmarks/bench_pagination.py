@@ -0,0 +1,49 @@
+"""Compare LIMIT/OFFSET and keyset pagination of SqlAlchemyRepository on a large books table.
+
+Usage: python -m benchmarks.bench_pagination [number_of_books]
+"""
+import sys
+import tempfile
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from library.adapters import database_repository
+from library.adapters.orm import metadata, map_model_to_tables, books_table
+
+PAGE_SIZE = 10
+REPEATS = 20
+
+
+def main():
+    number_of_books = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f'sqlite:///{directory}/bench.db')
+        clear_mappers()
+        metadata.create_all(engine)
+        map_model_to_tables()
+        with engine.begin() as connection:
+            for start in range(0, number_of_books, 100_000):
+                connection.execute(books_table.insert(), [
+                    {'book_id': book_id, 'title': f'Book {book_id}', 'ebook': False}
+                    for book_id in range(start, min(start + 100_000, number_of_books))])
+        repo = database_repository.SqlAlchemyRepository(sessionmaker(bind=engine))
+
+        print(f'{"page":>8} {"offset (ms)":>12} {"keyset (ms)":>12}')
+        for fraction in (0, 0.1, 0.5, 0.99):
+            page = int(number_of_books * fraction) // PAGE_SIZE
+            after_id = page * PAGE_SIZE - 1 if page > 0 else None
+            offset = timeit.timeit(lambda: repo.get_books(page, PAGE_SIZE), number=REPEATS) / REPEATS
+            keyset = timeit.timeit(lambda: repo.get_books_after(after_id, PAGE_SIZE), number=REPEATS) / REPEATS
+            assert [book.book_id for book in repo.get_books(page, PAGE_SIZE)] == \
+                   [book.book_id for book in repo.get_books_after(after_id, PAGE_SIZE)]
+            print(f'{page:>8} {offset * 1e3:>12.2f} {keyset * 1e3:>12.2f}')
+
+        repo.close_session()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Compare the per-row and the bulk populate paths of the SQLAlchemy repository.
+
+Usage: python -m benchmarks.bench_populate [data_path]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from library.adapters import database_repository, repository_populate
+from library.adapters.orm import metadata, map_model_to_tables
+from utils import get_project_root
+
+
+def time_populate(data_path: Path, bulk: bool) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f'sqlite:///{directory}/bench.db')
+        clear_mappers()
+        metadata.create_all(engine)
+        map_model_to_tables()
+        repo = database_repository.SqlAlchemyRepository(sessionmaker(bind=engine))
+
+        start = time.perf_counter()
+        repository_populate.populate(data_path, repo, bulk=bulk)
+        elapsed = time.perf_counter() - start
+
+        repo.close_session()
+        engine.dispose()
+    return elapsed
+
+
+def main():
+    data_path = Path(sys.argv[1]) if len(sys.argv) > 1 else get_project_root() / 'library' / 'adapters' / 'data'
+    per_row = time_populate(data_path, bulk=False)
+    bulk = time_populate(data_path, bulk=True)
+    print(f'per-row populate: {per_row:8.3f}s')
+    print(f'bulk populate:    {bulk:8.3f}s ({per_row / bulk:.1f}x faster)')
+
+
+if __name__ == '__main__':
+    main()
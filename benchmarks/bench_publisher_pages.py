@@ -0,0 +1,63 @@
+"""Compare loading every book of a large publisher with loading one page of them, in both repositories.
+
+Half of the synthetic books share one publisher, as "N/A" does in the real catalogue.
+
+Usage: python -m benchmarks.bench_publisher_pages [number_of_books]
+"""
+import sys
+import tempfile
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from library.adapters import database_repository
+from library.adapters.memory_repository import MemoryRepository
+from library.adapters.orm import metadata, map_model_to_tables, books_table, publishers_table
+from library.domain.model import Book, Publisher
+
+PAGE_SIZE = 10
+REPEATS = 5
+
+
+def publisher_of(book_id: int) -> str:
+    return 'N/A' if book_id % 2 == 0 else f'Publisher {book_id % 500}'
+
+
+def report(name: str, repo, number_of_books: int):
+    everything = timeit.timeit(lambda: repo.get_books_by_publisher('N/A'), number=1)
+    first_page = timeit.timeit(lambda: repo.get_books_by_publisher('N/A', 0, PAGE_SIZE), number=REPEATS) / REPEATS
+    middle = number_of_books // 4
+    middle_page = timeit.timeit(lambda: repo.get_books_by_publisher('N/A', middle, PAGE_SIZE),
+                                number=REPEATS) / REPEATS
+    print(f'{name:>8} {everything * 1000:14.1f} {first_page * 1000:14.2f} {middle_page * 1000:14.2f}')
+
+
+def main():
+    number_of_books = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f'{number_of_books} books, {number_of_books // 2} of them by N/A')
+    print(f'{"":>8} {"all (ms)":>14} {"first page":>14} {"middle page":>14}')
+
+    memory_repo = MemoryRepository()
+    publishers = {}
+    for book_id in range(number_of_books):
+        book = Book(book_id, f'Book {book_id}')
+        book.publisher = publishers.setdefault(publisher_of(book_id), Publisher(publisher_of(book_id)))
+        memory_repo.add_book(book)
+    report('memory', memory_repo, number_of_books)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f'sqlite:///{directory}/bench.db')
+        clear_mappers()
+        metadata.create_all(engine)
+        map_model_to_tables()
+        with engine.begin() as connection:
+            connection.execute(publishers_table.insert(), [{'name': name} for name in publishers])
+            connection.execute(books_table.insert(), [
+                {'book_id': book_id, 'title': f'Book {book_id}', 'ebook': False,
+                 'publisher_name': publisher_of(book_id)} for book_id in range(number_of_books)])
+        report('database', database_repository.SqlAlchemyRepository(sessionmaker(bind=engine)), number_of_books)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Compare the ORM loading strategies of SqlAlchemyRepository with the read-only 'rows' strategy on listing queries.
+
+Reports the books and authors hydrated per second by pages of 30, and the CPU time of a request for the 30-author
+/authors page, rendering included.
+
+Usage: python -m benchmarks.bench_read_model [number_of_books]
+"""
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from library import create_app
+from library.adapters.database_repository import SqlAlchemyRepository
+from library.adapters.orm import metadata, map_model_to_tables, books_table, authors_table, book_authors_table, \
+    publishers_table
+from library.utilities.services import encode_cursor
+from utils import get_project_root
+
+PAGE_SIZE = 30
+PAGES = 300
+REQUESTS = 1000
+STRATEGIES = ('selectin', 'joined', 'rows')
+
+
+def make_database(path: str, number_of_books: int):
+    number_of_authors = max(1, number_of_books // 2)
+    engine = create_engine(f'sqlite:///{path}')
+    metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(publishers_table.insert(), [{'name': f'Publisher {n}'} for n in range(500)])
+        connection.execute(authors_table.insert(), [
+            {'unique_id': author_id, 'full_name': f'Author {author_id}', 'average_rating': 3.9,
+             'text_reviews_count': author_id % 50, 'ratings_count': author_id % 1000}
+            for author_id in range(number_of_authors)])
+        connection.execute(books_table.insert(), [
+            {'book_id': book_id, 'title': f'Title of book {book_id}', 'release_year': 1950 + book_id % 70,
+             'description': f'The description of book {book_id}.', 'ebook': book_id % 2 == 0,
+             'num_pages': 100 + book_id % 300, 'image_url': 'https://images.example/book.png',
+             'isbn': f'{book_id:010d}', 'link': f'https://books.example/{book_id}', 'ratings_count': book_id % 1000,
+             'average_rating': 3.5, 'text_reviews_count': book_id % 100, 'publisher_name': f'Publisher {book_id % 500}'}
+            for book_id in range(number_of_books)])
+        connection.execute(book_authors_table.insert(), [
+            {'book_id': book_id, 'author_id': (book_id + offset) % number_of_authors}
+            for book_id in range(number_of_books) for offset in (0, 1)])
+    return engine, number_of_authors
+
+
+def hydration_rate(repo: SqlAlchemyRepository, get_page, number_of_items: int) -> float:
+    generator = random.Random(42)
+    start = time.perf_counter()
+    for _ in range(PAGES):
+        for item in get_page(generator.randrange(number_of_items - PAGE_SIZE), PAGE_SIZE):
+            getattr(item, 'authors', None)
+        repo.reset_session()
+    return PAGES * PAGE_SIZE / (time.perf_counter() - start)
+
+
+def request_cpu_time(database_uri: str, strategy: str, number_of_authors: int) -> float:
+    clear_mappers()
+    client = create_app({
+        'TEST_DATA_PATH': get_project_root() / 'tests' / 'data',
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'REPOSITORY': 'database',
+        'SQLALCHEMY_LOADING_STRATEGY': strategy,
+        'RECOMMENDATION_POOL_SIZE': 0,
+        'HASHING_EXECUTOR': 'inline',
+    }).test_client()
+    generator = random.Random(7)
+    urls = [f'/authors?cursor={encode_cursor("after", generator.randrange(number_of_authors - PAGE_SIZE))}'
+            for _ in range(REQUESTS)]
+    client.get(urls[0])
+    start = time.process_time()
+    for url in urls:
+        assert client.get(url).status_code == 200
+    return (time.process_time() - start) / REQUESTS
+
+
+def main():
+    number_of_books = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as directory:
+        path = f'{directory}/bench.db'
+        engine, number_of_authors = make_database(path, number_of_books)
+        print(f'{number_of_books} books with 2 authors each, {number_of_authors} authors, pages of {PAGE_SIZE}')
+        print(f'{"":>10} {"books/s":>10} {"authors/s":>10} {"/authors CPU (ms)":>18}')
+        for strategy in STRATEGIES:
+            clear_mappers()
+            map_model_to_tables()
+            repo = SqlAlchemyRepository(sessionmaker(bind=engine), loading_strategy=strategy)
+            books = hydration_rate(repo, lambda book_id, limit: repo.get_books_after(book_id, limit), number_of_books)
+            authors = hydration_rate(repo, lambda author_id, limit: repo.get_authors_after(author_id, limit),
+                                     number_of_authors)
+            cpu_time = request_cpu_time(f'sqlite:///{path}', strategy, number_of_authors)
+            print(f'{strategy:>10} {books:10.0f} {authors:10.0f} {cpu_time * 1000:18.2f}')
+
+
+if __name__ == '__main__':
+    main()
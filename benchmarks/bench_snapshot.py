@@ -0,0 +1,40 @@
+"""Compare building the columnar catalogue with opening it from a snapshot, as a worker does at startup.
+
+Usage: python -m benchmarks.bench_snapshot [number_of_books]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_columnar import make_authors, make_books
+from library.adapters.columnar_repository import ColumnarRepository
+from library.adapters.snapshot import write_snapshot, open_snapshot
+
+
+def main():
+    number_of_books = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    authors = make_authors(max(1, number_of_books // 3))
+
+    start = time.perf_counter()
+    repo = ColumnarRepository()
+    repo.bulk_load(make_books(number_of_books, authors), authors, [])
+    repo.get_books_after(None, 10)
+    print(f'{number_of_books} books')
+    print(f'build from books:   {time.perf_counter() - start:8.3f}s')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'catalogue.snapshot'
+        start = time.perf_counter()
+        write_snapshot(repo, path)
+        print(f'write snapshot:     {time.perf_counter() - start:8.3f}s ({path.stat().st_size / 2 ** 20:.1f} MB)')
+
+        start = time.perf_counter()
+        snapshot_repo = open_snapshot(path)
+        snapshot_repo.get_books_after(None, 10)
+        snapshot_repo.get_book(number_of_books // 2)
+        print(f'open snapshot:      {time.perf_counter() - start:8.3f}s (including a first page and a lookup)')
+
+
+if __name__ == '__main__':
+    main()
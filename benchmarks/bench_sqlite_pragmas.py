@@ -0,0 +1,79 @@
+"""Compare SQLite's default settings with the tuned pragmas of .env, for review writes and for reads under writes.
+
+Every review is committed on its own, as add_review does for a request. For the reads, one thread keeps reading a page
+of books while another writes reviews.
+
+Usage: python -m benchmarks.bench_sqlite_pragmas [number_of_reviews]
+"""
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+from sqlalchemy.pool import QueuePool
+
+from library.adapters.database_repository import SqlAlchemyRepository
+from library.adapters.orm import metadata, map_model_to_tables, set_sqlite_pragmas
+from library.adapters.repository_populate import populate
+from library.domain.model import Review
+from utils import get_project_root
+
+SETTINGS = {
+    'defaults': {},
+    'tuned': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'mmap_size': 268435456, 'cache_size': -65536,
+              'temp_store': 'MEMORY'},
+}
+
+
+def make_repo(path: str, pragmas: dict) -> SqlAlchemyRepository:
+    engine = create_engine(f'sqlite:///{path}', connect_args={'check_same_thread': False}, poolclass=QueuePool)
+    set_sqlite_pragmas(engine, pragmas)
+    clear_mappers()
+    metadata.create_all(engine)
+    map_model_to_tables()
+    repo = SqlAlchemyRepository(sessionmaker(bind=engine))
+    populate(get_project_root() / 'tests' / 'data', repo, bulk=True)
+    return repo
+
+
+def write_reviews(repo: SqlAlchemyRepository, number_of_reviews: int):
+    user = repo.get_user('thorke')
+    book = repo.get_book(25742454)
+    for n in range(number_of_reviews):
+        repo.add_review(Review(user, book, f'review {n}'))
+
+
+def read_while_writing(repo: SqlAlchemyRepository, number_of_reviews: int):
+    latencies = []
+    writing = threading.Thread(target=write_reviews, args=(repo, number_of_reviews))
+    writing.start()
+    while writing.is_alive():
+        start = time.perf_counter()
+        repo.get_books(0, 10)
+        repo.reset_session()
+        latencies.append(time.perf_counter() - start)
+    writing.join()
+    return sorted(latencies)
+
+
+def main():
+    number_of_reviews = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    print(f'{number_of_reviews} reviews, each committed on its own')
+    print(f'{"":>10} {"writes/s":>10} {"reads":>8} {"read p50 (ms)":>14} {"read p99 (ms)":>14}')
+    for name, pragmas in SETTINGS.items():
+        with tempfile.TemporaryDirectory() as directory:
+            repo = make_repo(f'{directory}/bench.db', pragmas)
+            start = time.perf_counter()
+            write_reviews(repo, number_of_reviews)
+            writes = number_of_reviews / (time.perf_counter() - start)
+            latencies = read_while_writing(repo, number_of_reviews)
+            p99 = latencies[int(len(latencies) * 0.99) - 1]
+            print(f'{name:>10} {writes:10.1f} {len(latencies):8d} {statistics.median(latencies) * 1000:14.2f} '
+                  f'{p99 * 1000:14.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Measure the latency of title completions on a large PrefixIndex, as a user types the start of titles.
+
+Every query is timed on its own. The first pass starts from an empty cache of best completions, the second pass
+repeats the same queries, as other users typing the same prefixes would.
+
+Usage: python -m benchmarks.bench_suggest [number_of_titles]
+"""
+import random
+import string
+import sys
+import time
+
+from library.adapters.prefix_index import PrefixIndex
+
+TYPED_TITLES = 2000
+TYPED_LENGTH = 8
+
+
+def make_vocabulary(generator: random.Random, size: int):
+    syllables = [consonant + vowel for consonant in 'bcdfghklmnprstvz' for vowel in 'aeiou']
+    return [''.join(generator.choice(syllables) for _ in range(generator.randint(1, 4))) for _ in range(size)]
+
+
+def make_titles(number_of_titles: int):
+    generator = random.Random(42)
+    vocabulary = make_vocabulary(generator, 20_000)
+    for _ in range(number_of_titles):
+        # A skewed choice: some words start far more titles than others.
+        words = [vocabulary[int(generator.paretovariate(0.8)) % len(vocabulary)] for _ in range(generator.randint(1, 6))]
+        yield ' '.join(words).capitalize()
+
+
+def time_queries(index: PrefixIndex, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.complete(query, 10)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+
+def report(name: str, latencies):
+    def percentile(fraction):
+        return latencies[int(len(latencies) * fraction) - 1] * 1000
+
+    print(f'{name:>6}: {len(latencies)} queries, p50 {percentile(0.5):.3f}ms, p99 {percentile(0.99):.3f}ms, '
+          f'max {latencies[-1] * 1000:.3f}ms')
+
+
+def main():
+    number_of_titles = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    titles = list(make_titles(number_of_titles))
+
+    start = time.perf_counter()
+    index = PrefixIndex()
+    for item_id, title in enumerate(titles):
+        index.add(item_id, title, item_id % 10_000)
+    index.complete('a', 10)
+    print(f'{number_of_titles} titles indexed in {time.perf_counter() - start:.2f}s')
+
+    generator = random.Random(7)
+    queries = [generator.choice(titles)[:length]
+               for _ in range(TYPED_TITLES) for length in range(1, TYPED_LENGTH + 1)]
+    queries += [generator.choice(string.ascii_lowercase) + generator.choice(string.ascii_lowercase)
+                for _ in range(TYPED_TITLES)]
+    report('cold', time_queries(index, queries))
+    report('warm', time_queries(index, queries))
+
+    start = time.perf_counter()
+    for item_id in range(number_of_titles, number_of_titles + 100):
+        index.add(item_id, generator.choice(titles), item_id)
+        index.complete(titles[item_id - number_of_titles][:3], 10)
+    print(f'add and complete: {(time.perf_counter() - start) * 10:.3f}ms per title')
+
+
+if __name__ == '__main__':
+    main()
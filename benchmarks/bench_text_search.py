@@ -0,0 +1,78 @@
+"""Measure full-text search latency of the memory repository and of SqlAlchemyRepository over SQLite FTS5.
+
+Titles, author names and descriptions are drawn from a small vocabulary, so that common words match many books and
+rare words only a few, as in a real catalogue.
+
+Usage: python -m benchmarks.bench_text_search [number_of_books]
+"""
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+
+from library.adapters import database_repository
+from library.adapters.memory_repository import MemoryRepository
+from library.adapters.orm import metadata, map_model_to_tables
+from library.domain.model import Book, Author, Publisher
+
+PAGE_SIZE = 10
+REPEATS = 20
+VOCABULARY_SIZE = 5000
+QUERIES = ('word1', 'word10 word20', 'word4000', 'word999 word1 word2', 'absent')
+
+
+def make_words(generator: random.Random, count: int):
+    # A skewed choice: low numbered words are far more common than high numbered ones.
+    return ' '.join(f'word{int(generator.paretovariate(1.2)) % VOCABULARY_SIZE}' for _ in range(count))
+
+
+def make_catalogue(number_of_books: int):
+    generator = random.Random(42)
+    authors = [Author(author_id, make_words(generator, 2)) for author_id in range(max(1, number_of_books // 3))]
+    books = []
+    for book_id in range(number_of_books):
+        book = Book(book_id, make_words(generator, 4))
+        book.publisher = Publisher(f'Publisher {book_id % 500}')
+        book.add_author(authors[book_id % len(authors)])
+        book.description = make_words(generator, 40)
+        book.average_rating = generator.uniform(1, 5)
+        books.append(book)
+    return books, authors
+
+
+def report(name: str, repo):
+    for query in QUERIES:
+        seconds = timeit.timeit(lambda: repo.search_books(query, 0, PAGE_SIZE + 1), number=REPEATS) / REPEATS
+        print(f'{name:>8} {query!r:>24} {seconds * 1000:10.2f}ms')
+
+
+def main():
+    number_of_books = int(sys.argv[1]) if len(sys.argv) > 1 else 90_000
+    # The domain classes are mapped before any book is made, so the same books can be loaded into both repositories.
+    clear_mappers()
+    map_model_to_tables()
+    books, authors = make_catalogue(number_of_books)
+    print(f'{number_of_books} books')
+
+    start = time.perf_counter()
+    memory_repo = MemoryRepository()
+    memory_repo.bulk_load(books, authors, [])
+    print(f'memory index built in {time.perf_counter() - start:.2f}s')
+    report('memory', memory_repo)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f'sqlite:///{directory}/bench.db')
+        metadata.create_all(engine)
+        database_repo = database_repository.SqlAlchemyRepository(sessionmaker(bind=engine))
+        start = time.perf_counter()
+        database_repo.bulk_load(books, authors, [])
+        print(f'database loaded and indexed in {time.perf_counter() - start:.2f}s')
+        report('fts5', database_repo)
+
+
+if __name__ == '__main__':
+    main()
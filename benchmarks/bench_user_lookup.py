@@ -0,0 +1,43 @@
+"""Time the user lookups done by a login against MemoryRepository for growing numbers of users.
+
+A login looks the user up twice (services.get_user and services.authenticate_user). Password hashing is left out as
+its cost does not depend on the number of users.
+
+Usage: python -m benchmarks.bench_user_lookup
+"""
+import timeit
+
+from library.adapters.memory_repository import MemoryRepository
+from library.authentication import services
+from library.domain.model import User
+
+USER_COUNTS = (1_000, 10_000, 100_000, 300_000)
+REPEATS = 2_000
+
+
+def login_lookups(repo: MemoryRepository, user_name: str):
+    user = services.get_user(user_name, repo)
+    repo.get_user(user['user_name'])
+
+
+def linear_lookup(users: list, user_name: str):
+    return next((user for user in users if user.user_name == user_name), None)
+
+
+def main():
+    print(f'{"users":>8} {"login lookups (us)":>20} {"linear scan (us)":>18}')
+    for user_count in USER_COUNTS:
+        repo = MemoryRepository()
+        users = [User(f'user{index}', 'password123') for index in range(user_count)]
+        for user in users:
+            repo.add_user(user)
+
+        # The last registered user is the worst case for a linear scan.
+        user_name = users[-1].user_name
+        indexed = timeit.timeit(lambda: login_lookups(repo, user_name), number=REPEATS) / REPEATS
+        linear = timeit.timeit(lambda: linear_lookup(users, user_name), number=20) / 20 * 2
+        print(f'{user_count:>8} {indexed * 1e6:>20.2f} {linear * 1e6:>18.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""Measure the memory of forked workers serving a synthetic catalogue, with and without building it before the fork.
+
+Each worker looks up random books and pages, as requests would, then runs a full garbage collection. Its memory is
+read from /proc/self/smaps_rollup: private memory is what the worker alone holds, and PSS charges it its share of the
+pages it still shares with the other processes.
+
+Usage: python -m benchmarks.bench_worker_memory [number_of_books] [number_of_workers]
+"""
+import gc
+import multiprocessing
+import os
+import random
+import sys
+
+from benchmarks.bench_columnar import make_authors, make_books
+from library.adapters.columnar_repository import ColumnarRepository
+from library.adapters.memory_repository import MemoryRepository
+from library.utilities import preload
+
+LOOKUPS = 20_000
+
+
+def load(repository_class, number_of_books: int):
+    authors = make_authors(max(1, number_of_books // 3))
+    repo = repository_class()
+    repo.bulk_load(make_books(number_of_books, authors), authors, [])
+    return repo
+
+
+def serve(repo, number_of_books: int):
+    generator = random.Random(os.getpid())
+    for _ in range(LOOKUPS):
+        repo.get_book(generator.randrange(number_of_books))
+        repo.get_books_after(generator.randrange(number_of_books), 10)
+    gc.collect()
+
+
+def memory_in_mb() -> dict:
+    fields = {}
+    with open('/proc/self/smaps_rollup') as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'rss': fields['Rss'], 'pss': fields['Pss'],
+            'private': fields['Private_Clean'] + fields['Private_Dirty']}
+
+
+def run_workers(number_of_workers: int, work) -> list:
+    readers = []
+    for _ in range(number_of_workers):
+        reader, writer = os.pipe()
+        if os.fork() == 0:
+            os.close(reader)
+            work()
+            os.write(writer, repr(memory_in_mb()).encode())
+            os._exit(0)
+        os.close(writer)
+        readers.append(reader)
+    # Every worker is still alive when the others measure their share of the pages.
+    results = []
+    for reader in readers:
+        with os.fdopen(reader) as pipe:
+            results.append(eval(pipe.read()))
+    for _ in readers:
+        os.wait()
+    return results
+
+
+def report(name: str, results: list):
+    average = {key: sum(result[key] for result in results) / len(results) for key in results[0]}
+    print(f'{name:>22} {average["rss"]:10.1f} {average["pss"]:10.1f} {average["private"]:12.1f}')
+
+
+def per_worker(number_of_books: int, number_of_workers: int):
+    def work():
+        serve(load(MemoryRepository, number_of_books), number_of_books)
+    return run_workers(number_of_workers, work)
+
+
+def preloaded(repository_class, frozen: bool):
+    def scenario(number_of_books: int, number_of_workers: int):
+        if frozen:
+            preload.begin()
+        repo = load(repository_class, number_of_books)
+        if frozen:
+            preload.finish()
+        return run_workers(number_of_workers, lambda: serve(repo, number_of_books))
+    return scenario
+
+
+SCENARIOS = {
+    'memory, per worker': per_worker,
+    'memory, preloaded': preloaded(MemoryRepository, frozen=False),
+    'memory, frozen': preloaded(MemoryRepository, frozen=True),
+    'columnar, frozen': preloaded(ColumnarRepository, frozen=True),
+}
+
+
+def main():
+    number_of_books = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    number_of_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f'{number_of_books} books, {number_of_workers} workers, MB per worker')
+    print(f'{"":>22} {"RSS":>10} {"PSS":>10} {"private":>12}')
+    for name, scenario in SCENARIOS.items():
+        # Each scenario runs in a fresh process, standing in for the server that forks the workers.
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=lambda: results.put(scenario(number_of_books, number_of_workers)))
+        process.start()
+        report(name, results.get())
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
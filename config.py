@@ -21,9 +21,48 @@ class Config:
 
     REPOSITORY = environ.get('REPOSITORY')
 
+    # Build the catalogue once in the server process and share it with forked workers, as with 'gunicorn --preload'
+    PRELOAD_CATALOGUE = environ.get('PRELOAD_CATALOGUE', 'False').lower().strip() == 'true'
+
+    # Catalogue snapshot opened by the columnar repository when it exists, written by 'flask write-snapshot'
+    SNAPSHOT_PATH = environ.get('SNAPSHOT_PATH')
+
+    # Recommendation pool configuration, a pool size of 0 disables the pool
+    RECOMMENDATION_POOL_SIZE = int(environ.get('RECOMMENDATION_POOL_SIZE', 8))
+    RECOMMENDATION_SAMPLE_SIZE = int(environ.get('RECOMMENDATION_SAMPLE_SIZE', 12))
+    RECOMMENDATION_POOL_REFRESH = float(environ.get('RECOMMENDATION_POOL_REFRESH', 60))
+
+    # Password hashing executor: 'process', 'thread' or 'inline' (on the request thread). At most HASHING_MAX_PENDING
+    # hashes wait for the workers, further sign-ins get a 503 after HASHING_QUEUE_TIMEOUT seconds.
+    HASHING_EXECUTOR = environ.get('HASHING_EXECUTOR', 'inline')
+    HASHING_WORKERS = int(environ.get('HASHING_WORKERS', 0)) or None
+    HASHING_MAX_PENDING = int(environ.get('HASHING_MAX_PENDING', 32))
+    HASHING_QUEUE_TIMEOUT = float(environ.get('HASHING_QUEUE_TIMEOUT', 0.5))
+    # Serve the executor's metrics at /authentication/hashing_metrics, which is not behind a login
+    HASHING_METRICS = environ.get('HASHING_METRICS', 'False').lower().strip() == 'true'
+
     # Database configuration
     SQLALCHEMY_DATABASE_URI = environ.get('SQLALCHEMY_DATABASE_URI')
 
+    # Connection pool: 'null' (a connection per request), 'queue' or 'static' (in-memory databases only)
+    SQLALCHEMY_POOL = environ.get('SQLALCHEMY_POOL', 'null')
+    SQLALCHEMY_POOL_SIZE = int(environ.get('SQLALCHEMY_POOL_SIZE', 5))
+    SQLALCHEMY_POOL_MAX_OVERFLOW = int(environ.get('SQLALCHEMY_POOL_MAX_OVERFLOW', 10))
+
+    # SQLite settings applied to every new connection, left to SQLite's defaults when empty. WAL lets readers run while
+    # a write is in progress, and with synchronous=NORMAL commits no longer wait for the disk, only checkpoints do.
+    SQLITE_JOURNAL_MODE = environ.get('SQLITE_JOURNAL_MODE', '')
+    SQLITE_SYNCHRONOUS = environ.get('SQLITE_SYNCHRONOUS', '')
+    SQLITE_MMAP_SIZE = environ.get('SQLITE_MMAP_SIZE', '')
+    SQLITE_CACHE_SIZE = environ.get('SQLITE_CACHE_SIZE', '')
+    SQLITE_TEMP_STORE = environ.get('SQLITE_TEMP_STORE', '')
+
+    # How book listings load authors and publishers: 'lazy', 'selectin' or 'joined', or 'rows' for read-only rows
+    SQLALCHEMY_LOADING_STRATEGY = environ.get('SQLALCHEMY_LOADING_STRATEGY', 'selectin')
+
+    # Seconds before cached counts are re-read from the database, to pick up writes made by other processes
+    REPOSITORY_CACHE_TTL = float(environ.get('REPOSITORY_CACHE_TTL', 60))
+
     echo_string = environ.get('SQLALCHEMY_ECHO')
     SQLALCHEMY_ECHO = False
     if echo_string.lower().strip() == "true":
@@ -1,14 +1,24 @@
 """Initialize Flask app."""
 from pathlib import Path
 
+import click
 from flask import Flask
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, clear_mappers
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool, StaticPool
 
 import library.adapters.repository as repo
-from library.adapters import database_repository, memory_repository, repository_populate
-from library.adapters.orm import metadata, map_model_to_tables
+from library.adapters import database_repository, memory_repository, columnar_repository, repository_populate, snapshot
+from library.adapters.csv_data_importer import write_hashed_users_file
+from library.adapters.orm import metadata, map_model_to_tables, create_missing_indexes, create_text_search, \
+    set_sqlite_pragmas, SQLITE_PRAGMAS
+from library.authentication import hashing
+from library.utilities import recommendation_pool, preload
+
+# 'null' opens a connection for every request. 'queue' keeps a pool of connections, each checked out by one thread at a
+# time, which is what makes check_same_thread=False safe. 'static' shares a single connection between all threads and
+# is only meant for in-memory databases.
+POOL_CLASSES = {'null': NullPool, 'queue': QueuePool, 'static': StaticPool}
 
 
 def create_app(test_config=None):
@@ -24,49 +34,118 @@ def create_app(test_config=None):
         app.config.from_mapping(test_config)
         data_path = app.config['TEST_DATA_PATH']
 
-    # Here the "magic" of our repository pattern happens. We can easily switch between in memory data and
-    # persistent database data storage for our application.
-
-    if app.config['REPOSITORY'] == 'memory':
-        # Create the MemoryRepository implementation for a memory-based repository.
-        repo.repo_instance = memory_repository.MemoryRepository()
-        # fill the content of the repository from the provided csv files
-        repository_populate.populate(data_path, repo.repo_instance)
+    # In preload mode the catalogue is built once, by the server process that forks the workers, and shared with them.
+    preloading = app.config['PRELOAD_CATALOGUE']
+    if preloading:
+        preload.begin()
+
+    try:
+        # Here the "magic" of our repository pattern happens. We can easily switch between in memory data and
+        # persistent database data storage for our application.
+
+        if app.config['REPOSITORY'] == 'memory':
+            # Create the MemoryRepository implementation for a memory-based repository.
+            repo.repo_instance = memory_repository.MemoryRepository()
+            # fill the content of the repository from the provided csv files, sorting and indexing them in one pass
+            repository_populate.populate(data_path, repo.repo_instance, bulk=True)
+        elif app.config['REPOSITORY'] == 'columnar':
+            # The ColumnarRepository keeps the book catalogue column-wise, which takes far less memory for large
+            # datasets. It is opened from a snapshot when there is one, which spares reading the data files and hashing
+            # passwords.
+            snapshot_path = app.config['SNAPSHOT_PATH']
+            if snapshot_path and Path(snapshot_path).exists():
+                repo.repo_instance = snapshot.open_snapshot(snapshot_path)
+            else:
+                repo.repo_instance = columnar_repository.ColumnarRepository()
+                repository_populate.populate(data_path, repo.repo_instance, bulk=True)
+        else:
+            # Configure database.
+            database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+
+            # We create a comparatively simple SQLite database, which is based on a single file (see .env for URI).
+            # For example the file database could be located locally and relative to the application in covid-19.db,
+            # leading to a URI of "sqlite:///covid-19.db".
+            # Note that create_engine does not establish any actual DB connection directly!
+            database_echo = app.config['SQLALCHEMY_ECHO']
+            # SQLite connections are shared between threads, see POOL_CLASSES.
+            pool = app.config['SQLALCHEMY_POOL']
+            if pool not in POOL_CLASSES:
+                raise ValueError(f'Unknown connection pool {pool!r}')
+            pool_options = {}
+            if pool == 'queue':
+                pool_options = {'pool_size': int(app.config['SQLALCHEMY_POOL_SIZE']),
+                                'max_overflow': int(app.config['SQLALCHEMY_POOL_MAX_OVERFLOW'])}
+            database_engine = create_engine(database_uri, connect_args={"check_same_thread": False},
+                                            poolclass=POOL_CLASSES[pool], echo=database_echo, **pool_options)
+            # Journal mode, durability and cache settings for every new connection, see the SQLITE_ settings in
+            # config.py.
+            set_sqlite_pragmas(database_engine, {name: app.config[f'SQLITE_{name.upper()}'] for name in SQLITE_PRAGMAS})
+
+            # Create the database session factory using sessionmaker (this has to be done once, in a global manner)
+            session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
+            # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
+            repo.repo_instance = database_repository.SqlAlchemyRepository(
+                session_factory, loading_strategy=app.config['SQLALCHEMY_LOADING_STRATEGY'],
+                cache_ttl=float(app.config['REPOSITORY_CACHE_TTL']))
+
+            if app.config['TESTING'] == 'True' or len(database_engine.table_names()) == 0:
+                print("REPOPULATING DATABASE...")
+                # For testing, or first-time use of the web application, reinitialise the database.
+                clear_mappers()
+                metadata.create_all(database_engine)  # Conditionally create database tables.
+                for table in reversed(metadata.sorted_tables):  # Remove any data from the tables.
+                    database_engine.execute(table.delete())
+
+                # Generate mappings that map domain model classes to the database tables.
+                map_model_to_tables()
+
+                repository_populate.populate(data_path, repo.repo_instance, bulk=True)
+                print("REPOPULATING DATABASE... FINISHED")
+
+            else:
+                # Add any indexes missing from an existing database.
+                create_missing_indexes(database_engine)
+                create_text_search(database_engine)
+                # Solely generate mappings that map domain model classes to the database tables.
+                map_model_to_tables()
+
+            if preloading:
+                # Pooled connections opened while loading must not be inherited, and shared, by the forked workers.
+                database_engine.dispose()
+    finally:
+        if preloading:
+            # The collector is turned back on even when building the catalogue failed.
+            preload.end()
+
+    def start_background_work():
+        # Pre-sample the random recommendations shown on most pages, and keep refreshing them in the background.
+        if recommendation_pool.pool_instance is not None:
+            recommendation_pool.pool_instance.stop()
+            recommendation_pool.pool_instance = None
+        if int(app.config['RECOMMENDATION_POOL_SIZE']) > 0:
+            pool = recommendation_pool.RecommendationPool(
+                repo.repo_instance, sample_size=int(app.config['RECOMMENDATION_SAMPLE_SIZE']),
+                pool_size=int(app.config['RECOMMENDATION_POOL_SIZE']),
+                refresh_interval=float(app.config['RECOMMENDATION_POOL_REFRESH']))
+            pool.refresh()
+            pool.start()
+            recommendation_pool.pool_instance = pool
+
+        # Hash passwords on a pool of workers, with a bound on the sign-ins waiting for them.
+        if hashing.executor_instance is not None:
+            hashing.executor_instance.shutdown()
+            hashing.executor_instance = None
+        if app.config['HASHING_EXECUTOR'] != 'inline':
+            hashing.executor_instance = hashing.HashingExecutor(
+                kind=app.config['HASHING_EXECUTOR'], workers=app.config['HASHING_WORKERS'],
+                max_pending=int(app.config['HASHING_MAX_PENDING']),
+                queue_timeout=float(app.config['HASHING_QUEUE_TIMEOUT']))
+
+    if preloading:
+        preload.finish(start_background_work)
     else:
-        # Configure database.
-        database_uri = app.config['SQLALCHEMY_DATABASE_URI']
-
-        # We create a comparatively simple SQLite database, which is based on a single file (see .env for URI).
-        # For example the file database could be located locally and relative to the application in covid-19.db,
-        # leading to a URI of "sqlite:///covid-19.db".
-        # Note that create_engine does not establish any actual DB connection directly!
-        database_echo = app.config['SQLALCHEMY_ECHO']
-        # Please do not change the settings for connect_args and poolclass!
-        database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
-                                        echo=database_echo)
-
-        # Create the database session factory using sessionmaker (this has to be done once, in a global manner)
-        session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
-        # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
-        repo.repo_instance = database_repository.SqlAlchemyRepository(session_factory)
-
-        if app.config['TESTING'] == 'True' or len(database_engine.table_names()) == 0:
-            print("REPOPULATING DATABASE...")
-            # For testing, or first-time use of the web application, reinitialise the database.
-            clear_mappers()
-            metadata.create_all(database_engine)  # Conditionally create database tables.
-            for table in reversed(metadata.sorted_tables):  # Remove any data from the tables.
-                database_engine.execute(table.delete())
-
-            # Generate mappings that map domain model classes to the database tables.
-            map_model_to_tables()
-
-            repository_populate.populate(data_path, repo.repo_instance)
-            print("REPOPULATING DATABASE... FINISHED")
+        start_background_work()
 
-        else:
-            # Solely generate mappings that map domain model classes to the database tables.
-            map_model_to_tables()
     # Build the application - these steps require an application context.
     with app.app_context():
         # Register blueprints.
@@ -85,6 +164,26 @@ def create_app(test_config=None):
         from .utilities import utilities
         app.register_blueprint(utilities.utilities_blueprint)
 
+        @app.cli.command('write-snapshot')
+        @click.argument('path', required=False)
+        def write_snapshot_command(path):
+            """Write the catalogue in the data files to a snapshot for the columnar repository."""
+            path = path or app.config['SNAPSHOT_PATH']
+            if not path:
+                raise click.UsageError('Give a path, or set SNAPSHOT_PATH.')
+            catalogue = columnar_repository.ColumnarRepository()
+            repository_populate.populate(data_path, catalogue, bulk=True)
+            snapshot.write_snapshot(catalogue, path)
+            click.echo(f'Wrote {catalogue.get_number_of_books()} books to {path}')
+
+        @app.cli.command('hash-users')
+        @click.argument('destination', required=False)
+        def hash_users_command(destination):
+            """Replace the plaintext passwords of the users file with password hashes."""
+            destination = destination or Path(data_path) / 'users.csv'
+            write_hashed_users_file(data_path, destination)
+            click.echo(f'Wrote hashed users to {destination}')
+
         # Register a callback the makes sure that database sessions are associated with http requests
         # We reset the session inside the database repository before a new flask request is generated
         @app.before_request
@@ -92,6 +191,13 @@ def create_app(test_config=None):
             if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
                 repo.repo_instance.reset_session()
 
+        if preloading:
+            # A server that does not fork, such as flask run, serves requests from the process that built the
+            # catalogue, where the background work is started on the first request.
+            @app.before_request
+            def start_background_work_without_fork():
+                preload.start_worker_once()
+
         # Register a tear-down method that will be called after each request has been processed.
         @app.teardown_appcontext
         def shutdown_session(exception=None):
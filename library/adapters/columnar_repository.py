@@ -0,0 +1,493 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from math import isnan
+
+from library.adapters.facet_index import FacetIndex, FacetedQuery, FacetedPage
+from library.adapters.prefix_index import PrefixIndex
+from library.adapters.repository import AbstractRepository
+from library.adapters.text_index import TextIndex
+from library.domain.model import Book, Author, User, Publisher, Review, ReadingList
+
+# Missing values of the integer columns, every one of them holds non-negative numbers otherwise.
+NULL = -1
+
+# The columns of the catalogue and their array type codes. Book and author columns have one entry per row, the
+# book_authors column holds the author rows of book row i at book_author_offsets[i]:book_author_offsets[i + 1].
+ARRAY_COLUMNS = {
+    'book_id': 'q', 'book_title': 'l', 'book_publisher': 'l', 'book_release_year': 'l', 'book_ebook': 'b',
+    'book_num_pages': 'l', 'book_ratings_count': 'q', 'book_average_rating': 'd', 'book_text_reviews_count': 'q',
+    'book_author_offsets': 'q', 'book_authors': 'l', 'sorted_book_ids': 'q', 'sorted_book_rows': 'l',
+    'author_id': 'q', 'author_average_rating': 'd', 'author_text_reviews_count': 'q', 'author_ratings_count': 'q',
+    'author_listed': 'b', 'sorted_author_ids': 'q', 'sorted_author_rows': 'l',
+}
+STRING_COLUMNS = ('book_description', 'book_image_url', 'book_isbn', 'book_link', 'titles', 'publisher_names',
+                  'author_name', 'user_name', 'user_password')
+# Indexes from a key (author id, publisher name position or release year) to the book rows holding it.
+POSTINGS = ('books_by_author', 'books_by_publisher', 'books_by_release_year')
+
+
+class StringTable:
+    """ Stores every distinct string once, rows refer to a string by its position in the table. """
+
+    def __init__(self, strings=None):
+        self.__strings = list() if strings is None else strings
+        # Built on first use, so that opening a table that is only read stays cheap.
+        self.__positions = None
+
+    @property
+    def strings(self):
+        return self.__strings
+
+    def __index(self) -> dict:
+        if self.__positions is None:
+            self.__positions = {string: position for position, string in enumerate(self.__strings)}
+        return self.__positions
+
+    def add(self, string: str) -> int:
+        if string is None:
+            return NULL
+        positions = self.__index()
+        position = positions.get(string)
+        if position is None:
+            if not isinstance(self.__strings, list):
+                self.__strings = list(self.__strings)
+            position = len(self.__strings)
+            self.__strings.append(string)
+            positions[string] = position
+        return position
+
+    def position(self, string: str) -> int:
+        return self.__index().get(string, NULL)
+
+    def __getitem__(self, position: int) -> str:
+        return None if position == NULL else self.__strings[position]
+
+    def __len__(self):
+        return len(self.__strings)
+
+
+def _appendable(column):
+    """ Returns a column that can grow, copying a read-only one (such as a view of a snapshot) if needed. """
+    if isinstance(column, (array, list, dict)):
+        return column
+    if isinstance(column, memoryview):
+        appendable = array(column.format)
+        appendable.frombytes(column.cast('B'))
+        return appendable
+    if hasattr(column, 'items'):
+        return {key: _appendable(rows) for key, rows in column.items()}
+    return list(column)
+
+
+class ColumnarRepository(AbstractRepository):
+    """ A read-optimised memory repository that keeps the book catalogue column-wise.
+
+    Every book and author is a row: numbers live in typed arrays, titles and publisher names in string tables, and
+    the authors of all books in one array sliced by per-row offsets. Book and Author objects are only built for the
+    rows that are returned, so they are views: changing one doesn't change the catalogue.
+
+    The columns can be given to the initializer, which is how library.adapters.snapshot opens a catalogue without
+    copying it. Columns and indexes only need to support reading until the catalogue is added to.
+    """
+
+    def __init__(self, columns: dict = None):
+        self.__columns = dict()
+        for name, typecode in ARRAY_COLUMNS.items():
+            self.__columns[name] = array(typecode)
+        self.__columns['book_author_offsets'].append(0)
+        for name in STRING_COLUMNS:
+            self.__columns[name] = list()
+        for name in POSTINGS:
+            self.__columns[name] = dict()
+        self.__can_grow = True
+        if columns is not None:
+            self.__columns.update(columns)
+            self.__can_grow = False
+
+        self.__titles = StringTable(self.__columns.pop('titles'))
+        self.__publisher_names = StringTable(self.__columns.pop('publisher_names'))
+        self.__users = dict()
+        self.__users_lower_index = dict()
+        for user_name, password in zip(self.__columns.pop('user_name'), self.__columns.pop('user_password')):
+            self.add_user(User(user_name, password))
+
+        # Rows are usually added in id order, anything else marks the order as stale and it is sorted again the next
+        # time it is needed, together with the rows of each author, publisher and release year.
+        self.__books_are_stale = False
+        self.__authors_are_stale = False
+        self.__author_rows_by_id = None
+        # Built on the first text search, suggestion or faceted query, and kept up to date from then on.
+        self.__text_index = None
+        self.__facet_index = None
+        self.__title_index = None
+        self.__author_name_index = None
+        self.__publishers_index = dict()
+        self.__reviews = dict()
+        self.__reading_list = dict()
+
+    def columns(self) -> dict:
+        """ Returns the columns and indexes of the catalogue, and the users, by name. """
+        self.__book_order()
+        self.__author_order()
+        columns = dict(self.__columns)
+        columns['titles'] = self.__titles.strings
+        columns['publisher_names'] = self.__publisher_names.strings
+        columns['user_name'] = list(self.__users)
+        columns['user_password'] = [user.password for user in self.__users.values()]
+        return columns
+
+    def __prepare_to_grow(self):
+        if not self.__can_grow:
+            for name, column in self.__columns.items():
+                self.__columns[name] = _appendable(column)
+            self.__can_grow = True
+        if self.__author_rows_by_id is None:
+            self.__author_rows_by_id = {author_id: row for row, author_id in enumerate(self.__columns['author_id'])}
+
+    def add_user(self, user: User):
+        self.__users.setdefault(user.user_name, user)
+        if user.user_name is not None:
+            self.__users_lower_index.setdefault(user.user_name.lower(), user)
+
+    def get_user(self, user_name, case_insensitive: bool = False) -> User:
+        if case_insensitive:
+            if not isinstance(user_name, str):
+                return None
+            return self.__users_lower_index.get(user_name.lower())
+        return self.__users.get(user_name)
+
+    def bulk_load(self, books, authors, users):
+        for book in books:
+            self.add_book(book)
+        for user in users:
+            self.add_user(user)
+        for author in authors:
+            self.add_author(author)
+
+    def add_book(self, book: Book):
+        self.__prepare_to_grow()
+        columns = self.__columns
+        row = len(columns['book_id'])
+        columns['book_id'].append(book.book_id)
+        columns['book_title'].append(self.__titles.add(book.title))
+        publisher_position = self.__publisher_names.add(book.publisher.name if book.publisher is not None else None)
+        columns['book_publisher'].append(publisher_position)
+        columns['book_release_year'].append(NULL if book.release_year is None else book.release_year)
+        columns['book_ebook'].append(NULL if book.ebook is None else int(book.ebook))
+        columns['book_num_pages'].append(NULL if book.num_pages is None else book.num_pages)
+        columns['book_ratings_count'].append(NULL if book.ratings_count is None else book.ratings_count)
+        columns['book_average_rating'].append(float('nan') if book.average_rating is None else book.average_rating)
+        columns['book_text_reviews_count'].append(NULL if book.text_reviews_count is None else
+                                                  book.text_reviews_count)
+        columns['book_description'].append(book.description)
+        columns['book_image_url'].append(book.image_url)
+        columns['book_isbn'].append(book.isbn)
+        columns['book_link'].append(book.link)
+
+        for author in book.authors:
+            author_row = self.__author_rows_by_id.get(author.unique_id)
+            if author_row is None:
+                author_row = self.__add_author_row(author)
+            columns['book_authors'].append(author_row)
+            columns['books_by_author'].setdefault(author.unique_id, array('l')).append(row)
+        columns['book_author_offsets'].append(len(columns['book_authors']))
+        if publisher_position != NULL:
+            columns['books_by_publisher'].setdefault(publisher_position, array('l')).append(row)
+        if book.release_year is not None:
+            columns['books_by_release_year'].setdefault(book.release_year, array('l')).append(row)
+
+        if self.__text_index is not None:
+            self.__add_to_text_index(row)
+        if self.__title_index is not None:
+            self.__add_to_title_index(row)
+        if self.__facet_index is not None:
+            self.__add_to_facet_index(row)
+
+        sorted_ids = columns['sorted_book_ids']
+        if not self.__books_are_stale and (not sorted_ids or book.book_id >= sorted_ids[-1]):
+            sorted_ids.append(book.book_id)
+            columns['sorted_book_rows'].append(row)
+        else:
+            self.__books_are_stale = True
+
+    def __book_order(self):
+        columns = self.__columns
+        if self.__books_are_stale:
+            book_ids = columns['book_id']
+            rows = sorted(range(len(book_ids)), key=book_ids.__getitem__)
+            columns['sorted_book_rows'] = array('l', rows)
+            columns['sorted_book_ids'] = array('q', (book_ids[row] for row in rows))
+            for name in POSTINGS:
+                for key, rows in columns[name].items():
+                    columns[name][key] = array('l', sorted(rows, key=book_ids.__getitem__))
+            self.__books_are_stale = False
+        return columns['sorted_book_ids'], columns['sorted_book_rows']
+
+    def __book_at(self, row: int) -> Book:
+        columns = self.__columns
+        book = Book(columns['book_id'][row], self.__titles[columns['book_title'][row]])
+        publisher_name = self.__publisher_names[columns['book_publisher'][row]]
+        if publisher_name is not None:
+            book.publisher = self.get_publisher(publisher_name)
+        offsets = columns['book_author_offsets']
+        for author_row in columns['book_authors'][offsets[row]:offsets[row + 1]]:
+            book.add_author(self.__author_at(author_row))
+        if columns['book_release_year'][row] != NULL:
+            book.release_year = columns['book_release_year'][row]
+        if columns['book_ebook'][row] != NULL:
+            book.ebook = bool(columns['book_ebook'][row])
+        if columns['book_num_pages'][row] != NULL:
+            book.num_pages = columns['book_num_pages'][row]
+        if columns['book_ratings_count'][row] != NULL:
+            book.ratings_count = columns['book_ratings_count'][row]
+        if not isnan(columns['book_average_rating'][row]):
+            book.average_rating = columns['book_average_rating'][row]
+        if columns['book_text_reviews_count'][row] != NULL:
+            book.text_reviews_count = columns['book_text_reviews_count'][row]
+        book.description = columns['book_description'][row]
+        book.image_url = columns['book_image_url'][row]
+        book.isbn = columns['book_isbn'][row]
+        book.link = columns['book_link'][row]
+        return book
+
+    def __books_at(self, rows):
+        return [self.__book_at(row) for row in rows]
+
+    def __row_of(self, book_id: int) -> int:
+        sorted_ids, sorted_rows = self.__book_order()
+        # The last row added with a given id wins, as it does in the MemoryRepository.
+        position = bisect_right(sorted_ids, book_id) - 1
+        if position < 0 or sorted_ids[position] != book_id:
+            return NULL
+        return sorted_rows[position]
+
+    def get_book(self, book_id: int) -> Book:
+        row = self.__row_of(book_id)
+        return None if row == NULL else self.__book_at(row)
+
+    def get_number_of_books(self) -> int:
+        return len(self.__columns['book_id'])
+
+    def get_books_by_indices(self, indices):
+        sorted_rows = self.__book_order()[1]
+        return self.__books_at(sorted_rows[index] for index in indices)
+
+    def get_books(self, offset: int, page_size: int):
+        sorted_rows = self.__book_order()[1]
+        return self.__books_at(sorted_rows[offset * page_size:(offset + 1) * page_size])
+
+    def get_books_after(self, book_id: int, limit: int):
+        sorted_ids, sorted_rows = self.__book_order()
+        start = 0 if book_id is None else bisect_right(sorted_ids, book_id)
+        return self.__books_at(sorted_rows[start:start + limit])
+
+    def get_books_before(self, book_id: int, limit: int):
+        sorted_ids, sorted_rows = self.__book_order()
+        end = bisect_left(sorted_ids, book_id)
+        return self.__books_at(sorted_rows[max(0, end - limit):end])
+
+    def __page_of_postings(self, name: str, key, offset: int, limit: int):
+        # Sorting the book order stale rows first leaves the rows of every key in book id order, so a page is a slice.
+        self.__book_order()
+        rows = self.__columns[name].get(key)
+        if not rows:
+            return []
+        return self.__books_at(rows[offset:] if limit is None else rows[offset:offset + limit])
+
+    def get_books_by_publisher(self, publisher_name: str, offset: int = 0, limit: int = None):
+        return self.__page_of_postings('books_by_publisher', self.__publisher_names.position(publisher_name), offset,
+                                       limit)
+
+    def get_books_by_release_year(self, release_year: int, offset: int = 0, limit: int = None):
+        return self.__page_of_postings('books_by_release_year', release_year, offset, limit)
+
+    def get_books_by_author_id(self, author_id: int, offset: int = 0, limit: int = None):
+        return self.__page_of_postings('books_by_author', author_id, offset, limit)
+
+    def __add_to_text_index(self, row: int):
+        columns = self.__columns
+        offsets = columns['book_author_offsets']
+        author_names = [columns['author_name'][author_row]
+                        for author_row in columns['book_authors'][offsets[row]:offsets[row + 1]]]
+        average_rating = columns['book_average_rating'][row]
+        self.__text_index.add(columns['book_id'][row], self.__titles[columns['book_title'][row]], author_names,
+                              columns['book_description'][row], None if isnan(average_rating) else average_rating)
+
+    def search_books(self, query: str, offset: int, limit: int):
+        if self.__text_index is None:
+            self.__text_index = TextIndex()
+            for row in range(len(self.__columns['book_id'])):
+                self.__add_to_text_index(row)
+        return self.__books_at(self.__row_of(book_id) for book_id in self.__text_index.search(query, offset, limit))
+
+    def __add_to_facet_index(self, row: int):
+        columns = self.__columns
+        offsets = columns['book_author_offsets']
+        author_ids = [columns['author_id'][author_row]
+                      for author_row in columns['book_authors'][offsets[row]:offsets[row + 1]]]
+        publisher_position = columns['book_publisher'][row]
+
+        def value(name):
+            return None if columns[name][row] == NULL else columns[name][row]
+
+        average_rating = columns['book_average_rating'][row]
+        self.__facet_index.add(columns['book_id'][row], self.__titles[columns['book_title'][row]],
+                               None if publisher_position == NULL else self.__publisher_names[publisher_position],
+                               author_ids, value('book_release_year'), value('book_ebook'), value('book_num_pages'),
+                               None if isnan(average_rating) else average_rating, value('book_ratings_count'))
+
+    def get_books_by_facets(self, query: FacetedQuery, offset: int, limit: int) -> FacetedPage:
+        if self.__facet_index is None:
+            self.__facet_index = FacetIndex()
+            for row in range(len(self.__columns['book_id'])):
+                self.__add_to_facet_index(row)
+        book_ids, total, facet_counts = self.__facet_index.query(query, offset, limit)
+        return FacetedPage(self.__books_at(self.__row_of(book_id) for book_id in book_ids), total, facet_counts)
+
+    def __add_to_title_index(self, row: int):
+        columns = self.__columns
+        ratings_count = columns['book_ratings_count'][row]
+        self.__title_index.add(columns['book_id'][row], self.__titles[columns['book_title'][row]],
+                               None if ratings_count == NULL else ratings_count)
+
+    def get_title_suggestions(self, prefix: str, limit: int):
+        if self.__title_index is None:
+            self.__title_index = PrefixIndex()
+            for row in range(len(self.__columns['book_id'])):
+                self.__add_to_title_index(row)
+        return self.__title_index.complete(prefix, limit)
+
+    def __add_to_author_name_index(self, row: int):
+        columns = self.__columns
+        self.__author_name_index.add(columns['author_id'][row], columns['author_name'][row],
+                                     columns['author_ratings_count'][row])
+
+    def get_author_suggestions(self, prefix: str, limit: int):
+        if self.__author_name_index is None:
+            self.__author_name_index = PrefixIndex()
+            # Authors only known from the books they wrote are not listed, and not suggested either.
+            for row, listed in enumerate(self.__columns['author_listed']):
+                if listed:
+                    self.__add_to_author_name_index(row)
+        return self.__author_name_index.complete(prefix, limit)
+
+    def __add_author_row(self, author: Author) -> int:
+        columns = self.__columns
+        row = len(columns['author_id'])
+        columns['author_id'].append(author.unique_id)
+        columns['author_name'].append(author.full_name)
+        columns['author_average_rating'].append(author.average_rating)
+        columns['author_text_reviews_count'].append(author.text_reviews_count)
+        columns['author_ratings_count'].append(author.ratings_count)
+        columns['author_listed'].append(0)
+        self.__author_rows_by_id[author.unique_id] = row
+        return row
+
+    def add_author(self, author: Author) -> Author:
+        self.__prepare_to_grow()
+        columns = self.__columns
+        row = self.__author_rows_by_id.get(author.unique_id)
+        if row is None:
+            row = self.__add_author_row(author)
+        else:
+            columns['author_name'][row] = author.full_name
+            columns['author_average_rating'][row] = author.average_rating
+            columns['author_text_reviews_count'][row] = author.text_reviews_count
+            columns['author_ratings_count'][row] = author.ratings_count
+        if not columns['author_listed'][row]:
+            columns['author_listed'][row] = 1
+            sorted_ids = columns['sorted_author_ids']
+            if not self.__authors_are_stale and (not sorted_ids or author.unique_id >= sorted_ids[-1]):
+                sorted_ids.append(author.unique_id)
+                columns['sorted_author_rows'].append(row)
+            else:
+                self.__authors_are_stale = True
+        if self.__author_name_index is not None:
+            self.__add_to_author_name_index(row)
+        return author
+
+    def __author_order(self):
+        columns = self.__columns
+        if self.__authors_are_stale:
+            author_ids = columns['author_id']
+            rows = sorted((row for row, listed in enumerate(columns['author_listed']) if listed),
+                          key=author_ids.__getitem__)
+            columns['sorted_author_rows'] = array('l', rows)
+            columns['sorted_author_ids'] = array('q', (author_ids[row] for row in rows))
+            self.__authors_are_stale = False
+        return columns['sorted_author_ids'], columns['sorted_author_rows']
+
+    def __author_at(self, row: int) -> Author:
+        columns = self.__columns
+        author = Author(columns['author_id'][row], columns['author_name'][row])
+        author.average_rating = columns['author_average_rating'][row]
+        author.text_reviews_count = columns['author_text_reviews_count'][row]
+        author.ratings_count = columns['author_ratings_count'][row]
+        return author
+
+    def __authors_at(self, rows):
+        return [self.__author_at(row) for row in rows]
+
+    def get_author(self, author_id: int) -> Author:
+        sorted_ids, sorted_rows = self.__author_order()
+        position = bisect_left(sorted_ids, author_id)
+        if position == len(sorted_ids) or sorted_ids[position] != author_id:
+            return None
+        return self.__author_at(sorted_rows[position])
+
+    def get_authors(self, offset: int, page_size: int):
+        sorted_rows = self.__author_order()[1]
+        return self.__authors_at(sorted_rows[offset * page_size:(offset + 1) * page_size])
+
+    def get_authors_after(self, author_id: int, limit: int):
+        sorted_ids, sorted_rows = self.__author_order()
+        start = 0 if author_id is None else bisect_right(sorted_ids, author_id)
+        return self.__authors_at(sorted_rows[start:start + limit])
+
+    def get_authors_before(self, author_id: int, limit: int):
+        sorted_ids, sorted_rows = self.__author_order()
+        end = bisect_left(sorted_ids, author_id)
+        return self.__authors_at(sorted_rows[max(0, end - limit):end])
+
+    def get_number_of_authors(self) -> int:
+        return len(self.__author_order()[0])
+
+    def add_publisher(self, publisher: Publisher) -> Publisher:
+        self.__publisher_names.add(publisher.name)
+        self.__publishers_index[publisher.name] = publisher
+        return publisher
+
+    def get_publisher(self, publisher_name: str) -> Publisher:
+        # Any publisher of a book in the catalogue is known, whether or not it was added itself. Publishers are few, so
+        # their views are kept.
+        publisher = self.__publishers_index.get(publisher_name)
+        if publisher is None and self.__publisher_names.position(publisher_name) != NULL:
+            publisher = self.__publishers_index.setdefault(publisher_name, Publisher(publisher_name))
+        return publisher
+
+    def add_review(self, review: Review):
+        # call parent class first, add_review relies on implementation of code common to all derived classes
+        super().add_review(review)
+        book = review.book
+        row = self.__row_of(book.book_id)
+        if row != NULL:
+            text_reviews_counts = self.__columns['book_text_reviews_count']
+            text_reviews_counts[row] = max(text_reviews_counts[row], 0) + 1
+        self.__reviews.setdefault(book.book_id, []).append(review)
+
+    def get_reviews_by_book_id(self, book_id: int):
+        return self.__reviews.get(book_id)
+
+    def add_reading_list(self, reading_list: ReadingList, existing: bool):
+        if not existing:
+            self.__reading_list.setdefault(reading_list.user.user_name, []).append(reading_list)
+
+    def get_reading_list_by_user(self, shelf: str, user: User):
+        reading_lists = self.__reading_list.get(user.user_name, [])
+        return [rl for rl in reading_lists if rl.shelf == shelf]
+
+    def get_reading_list_by_user_and_book_id(self, user: User, book_id: int) -> ReadingList:
+        for rl in self.__reading_list.get(user.user_name, []):
+            if rl.book.book_id == book_id:
+                return rl
+        return None
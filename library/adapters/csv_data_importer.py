@@ -1,4 +1,5 @@
 import csv
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 from werkzeug.security import generate_password_hash
@@ -7,17 +8,29 @@ from library.adapters.jsondatareader import BooksJSONReader
 from library.domain.model import User
 
 
-def load_books_and_authors(data_path: Path):
+def make_books_json_reader(data_path: Path):
     books_file_name = 'comic_books_excerpt.json'
     authors_file_name = 'book_authors_excerpt.json'
 
-    path_to_books_file = str(data_path / books_file_name)
-    path_to_authors_file = str(data_path / authors_file_name)
-    reader = BooksJSONReader(path_to_books_file, path_to_authors_file)
+    path_to_books_file = str(Path(data_path) / books_file_name)
+    path_to_authors_file = str(Path(data_path) / authors_file_name)
+    return BooksJSONReader(path_to_books_file, path_to_authors_file)
+
+
+def load_books_and_authors(data_path: Path):
+    reader = make_books_json_reader(data_path)
     reader.read_json_files()
     return reader.dataset_of_books, reader.dataset_of_authors
 
 
+def stream_books_and_authors(data_path: Path):
+    # Only the authors are materialised (books need them to resolve their author ids), the books are returned as a
+    # generator that parses the books file lazily.
+    reader = make_books_json_reader(data_path)
+    reader.read_authors()
+    return reader.iter_books(), reader.dataset_of_authors
+
+
 def read_csv_file(filename: str):
     with open(filename, encoding='utf-8-sig') as infile:
         reader = csv.reader(infile)
@@ -32,15 +45,64 @@ def read_csv_file(filename: str):
             yield row
 
 
+# Hashing fewer passwords than this is quicker than starting worker processes.
+PARALLEL_HASHING_THRESHOLD = 16
+
+
+def generate_password_hashes(passwords: list) -> list:
+    # generate_password_hash is deliberately slow, so spread large batches over all CPUs.
+    if len(passwords) < PARALLEL_HASHING_THRESHOLD:
+        return [generate_password_hash(password) for password in passwords]
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(generate_password_hash, passwords, chunksize=8))
+
+
+def users_file_name(data_path: Path) -> str:
+    return str(Path(data_path) / "users.csv")
+
+
+def read_users_file(data_path: Path):
+    users_filename = users_file_name(data_path)
+    with open(users_filename, encoding='utf-8-sig') as infile:
+        headers = [header.strip() for header in next(csv.reader(infile))]
+    return headers, list(read_csv_file(users_filename))
+
+
 def load_users(data_path: Path):
-    users = list()
+    # Seed files may hold a password_hash column in place of (or alongside) the plaintext password column, in which
+    # case nothing needs hashing. Rows without a hash have their plaintext password hashed.
+    headers, rows = read_users_file(data_path)
+    user_name_column = headers.index('username')
+    hash_column = headers.index('password_hash') if 'password_hash' in headers else None
+    password_column = headers.index('password') if 'password' in headers else None
+    if hash_column is None and password_column is None:
+        raise ValueError(f'{users_file_name(data_path)} has neither a password nor a password_hash column')
+
+    password_hashes = [row[hash_column] if hash_column is not None else '' for row in rows]
+    unhashed_rows = [index for index, password_hash in enumerate(password_hashes) if password_hash == '']
+    if unhashed_rows and password_column is None:
+        raise ValueError(f'{users_file_name(data_path)} has users without a password_hash and no password column')
+    new_hashes = generate_password_hashes([rows[index][password_column] for index in unhashed_rows])
+    for index, password_hash in zip(unhashed_rows, new_hashes):
+        password_hashes[index] = password_hash
 
-    users_filename = str(Path(data_path) / "users.csv")
-    for data_row in read_csv_file(users_filename):
+    users = list()
+    for data_row, password_hash in zip(rows, password_hashes):
         user = User(
-            user_name=data_row[1],
-            password=generate_password_hash(data_row[2])
+            user_name=data_row[user_name_column],
+            password=password_hash
         )
         users.append(user)
     return users
 
+
+def write_hashed_users_file(data_path: Path, destination: Path):
+    """ Writes the users of data_path to the users file destination, with hashed passwords only. """
+    headers, rows = read_users_file(data_path)
+    id_column = headers.index('id')
+    users = load_users(data_path)
+    with open(destination, 'w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        writer.writerow(['id', 'username', 'password_hash'])
+        for data_row, user in zip(rows, users):
+            writer.writerow([data_row[id_column], user.user_name, user.password])
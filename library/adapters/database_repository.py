@@ -1,13 +1,29 @@
-from sqlalchemy import and_
+import time
+from array import array
+from collections import Counter
+
+from sqlalchemy import and_, or_, func, select, text
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy.orm import scoped_session
+from sqlalchemy.orm import scoped_session, selectinload, joinedload
 
+from library.adapters.facet_index import FacetedQuery, FacetedPage, make_facet_counts, MAX_PUBLISHER_COUNTS
+from library.adapters.orm import publishers_table, authors_table, books_table, book_authors_table, users_table
+from library.adapters.prefix_index import PrefixIndex
+from library.adapters.read_model import BookRow, AuthorRow, PublisherRow
 from library.adapters.repository import AbstractRepository
+from library.adapters.text_index import FIELD_WEIGHTS, RATING_BOOST, make_match_query
 from flask import _app_ctx_stack
 
 from library.domain.model import Review, Book, Publisher, Author, User, ReadingList
 
 
+# The columns read into BookRows and AuthorRows, in the order of their fields. A BookRow's publisher is read from the
+# publisher name and its authors by a second query.
+BOOK_ROW_COLUMNS = [books_table.c[name] for name in BookRow._fields if name not in ('publisher', 'authors')] + \
+                   [books_table.c.publisher_name]
+AUTHOR_ROW_COLUMNS = [authors_table.c[name] for name in AuthorRow._fields]
+
+
 class SessionContextManager:
     def __init__(self, session_factory):
         self.__session_factory = session_factory
@@ -31,19 +47,80 @@ class SessionContextManager:
 
     def reset_session(self):
         # this method can be used e.g. to allow Flask to start a new session for each http request,
-        # via the 'before_request' callback
-        self.close_current_session()
-        self.__session = scoped_session(self.__session_factory, scopefunc=_app_ctx_stack.__ident_func__)
+        # via the 'before_request' callback. The registry is kept, and only the session of the calling thread is
+        # closed and dropped from it, so the next use starts a new one and other threads' sessions are left alone.
+        self.__session.remove()
 
     def close_current_session(self):
-        if not self.__session is None:
-            self.__session.close()
+        # Dropping the closed session from the registry keeps it from holding one session per thread ever served.
+        self.__session.remove()
+
+
+def book_to_row(book: Book):
+    return {
+        'book_id': book.book_id,
+        'title': book.title,
+        'release_year': book.release_year,
+        'description': book.description,
+        'ebook': bool(book.ebook),
+        'num_pages': book.num_pages,
+        'image_url': book.image_url,
+        'isbn': book.isbn,
+        'link': book.link,
+        'ratings_count': book.ratings_count,
+        'average_rating': book.average_rating,
+        'text_reviews_count': book.text_reviews_count,
+        'publisher_name': book.publisher.name if book.publisher is not None else None,
+    }
+
+
+def author_to_row(author: Author):
+    return {
+        'unique_id': author.unique_id,
+        'full_name': author.full_name,
+        'average_rating': author.average_rating,
+        'text_reviews_count': author.text_reviews_count,
+        'ratings_count': author.ratings_count,
+    }
+
+
+def user_to_row(user: User):
+    return {
+        'user_name': user.user_name,
+        'password': user.password,
+    }
 
 
 class SqlAlchemyRepository(AbstractRepository):
 
-    def __init__(self, session_factory):
+    # How the authors and publisher of books returned by the listing queries are loaded. 'lazy' issues one query per
+    # book and relationship when the template touches them, the other strategies load them up front. 'rows' skips the
+    # ORM altogether and returns read-only BookRows and AuthorRows, for the listing pages that only display them.
+    loading_strategies = ('lazy', 'selectin', 'joined', 'rows')
+
+    def __init__(self, session_factory, loading_strategy: str = 'selectin', cache_ttl: float = None):
+        if loading_strategy not in self.loading_strategies:
+            raise ValueError(f'Unknown loading strategy {loading_strategy}')
         self._session_cm = SessionContextManager(session_factory)
+        self._loading_strategy = loading_strategy
+        # The caches below are kept up to date by the add_* methods. Writes made behind the repository's back (e.g. by
+        # another process) are picked up after invalidate_caches, or at the latest cache_ttl seconds later.
+        self._cache_ttl = cache_ttl
+        self.invalidate_caches()
+
+    def invalidate_caches(self):
+        # Ordered vector of all book ids, used to turn positions into ids without loading the books table.
+        self._book_ids = None
+        self._number_of_books = None
+        self._number_of_authors = None
+        # Prefix indexes of titles and author names, built from the tables on the first suggestion.
+        self._title_index = None
+        self._author_name_index = None
+        self._caches_expire_at = None if self._cache_ttl is None else time.monotonic() + self._cache_ttl
+
+    def _expire_caches(self):
+        if self._caches_expire_at is not None and time.monotonic() >= self._caches_expire_at:
+            self.invalidate_caches()
 
     def close_session(self):
         self._session_cm.close_current_session()
@@ -56,7 +133,13 @@ class SqlAlchemyRepository(AbstractRepository):
             scm.session.add(user)
             scm.commit()
 
-    def get_user(self, user_name) -> User:
+    def get_user(self, user_name, case_insensitive: bool = False) -> User:
+        if case_insensitive:
+            if not isinstance(user_name, str):
+                return None
+            return self._session_cm.session.query(User).filter(
+                func.lower(User._User__user_name) == user_name.lower()).order_by(User.id).first()
+
         user = None
         try:
             user = self._session_cm.session.query(User).filter(User._User__user_name == user_name).one()
@@ -66,10 +149,67 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return user
 
+    def bulk_load(self, books, authors, users, batch_size: int = 1000):
+        # Bypass the ORM unit of work and write plain rows with executemany, flushing a batch of books (together
+        # with the publishers and authors they introduce) at a time. The tables are expected to be empty.
+        seen_publishers = set()
+        seen_authors = set()
+        publisher_rows, author_rows, book_rows, link_rows = [], [], [], []
+
+        with self._session_cm as scm:
+            def flush():
+                for table, rows in ((publishers_table, publisher_rows), (authors_table, author_rows),
+                                    (books_table, book_rows), (book_authors_table, link_rows)):
+                    if rows:
+                        scm.session.execute(table.insert(), rows)
+                        rows.clear()
+
+            for book in books:
+                if book.publisher is not None and book.publisher.name not in seen_publishers:
+                    seen_publishers.add(book.publisher.name)
+                    publisher_rows.append({'name': book.publisher.name})
+                for author in book.authors:
+                    if author.unique_id not in seen_authors:
+                        seen_authors.add(author.unique_id)
+                        author_rows.append(author_to_row(author))
+                    link_rows.append({'book_id': book.book_id, 'author_id': author.unique_id})
+                book_rows.append(book_to_row(book))
+                if len(book_rows) >= batch_size:
+                    flush()
+
+            for author in authors:
+                if author.unique_id not in seen_authors:
+                    seen_authors.add(author.unique_id)
+                    author_rows.append(author_to_row(author))
+                    if len(author_rows) >= batch_size:
+                        flush()
+            flush()
+
+            user_rows = [user_to_row(user) for user in users]
+            if user_rows:
+                scm.session.execute(users_table.insert(), user_rows)
+            scm.commit()
+        self.invalidate_caches()
+
     def add_book(self, book: Book):
         with self._session_cm as scm:
+            # Adding a book that is already stored inserts nothing, and must leave the caches as they are.
+            new_book = scm.session.get(Book, book.book_id) is None
             scm.session.add(book)
             scm.commit()
+        if not new_book:
+            return
+        self._book_ids = None
+        if self._number_of_books is not None:
+            self._number_of_books += 1
+        if len(book.authors) > 0:
+            # New authors may have been inserted along with the book.
+            self._number_of_authors = None
+        if self._title_index is not None:
+            self._title_index.add(book.book_id, book.title, book.ratings_count)
+        if self._author_name_index is not None:
+            for author in book.authors:
+                self._author_name_index.add(author.unique_id, author.full_name, author.ratings_count)
 
     def get_book(self, book_id: int) -> Book:
         book = None
@@ -81,37 +221,188 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return book
 
+    def _get_books(self, refine):
+        """ Returns the books selected by refine, which adds the criteria, ordering and limits to a select statement.
+
+        With the 'rows' strategy refine is given a Core select of the books table and the books are returned as
+        BookRows, otherwise it is given a query of mapped Books.
+        """
+        session = self._session_cm.session
+        if self._loading_strategy == 'rows':
+            return self._book_rows(session.execute(refine(select(*BOOK_ROW_COLUMNS))).all())
+
+        query = session.query(Book)
+        if self._loading_strategy == 'selectin':
+            query = query.options(selectinload(Book._Book__authors), selectinload(Book._Book__publisher))
+        elif self._loading_strategy == 'joined':
+            query = query.options(joinedload(Book._Book__authors), joinedload(Book._Book__publisher))
+        return refine(query).all()
+
+    def _book_rows(self, rows):
+        authors = dict()
+        if rows:
+            statement = select(book_authors_table.c.book_id, *AUTHOR_ROW_COLUMNS).join(
+                authors_table, authors_table.c.unique_id == book_authors_table.c.author_id).where(
+                book_authors_table.c.book_id.in_([row.book_id for row in rows])).order_by(book_authors_table.c.id)
+            for book_id, *author in self._session_cm.session.execute(statement):
+                authors.setdefault(book_id, []).append(AuthorRow(*author))
+
+        # Rows are unpacked by position, which is much cheaper than reading their columns by name, see
+        # BOOK_ROW_COLUMNS.
+        return [BookRow(book_id, *columns, PublisherRow(publisher_name) if publisher_name is not None else None,
+                        tuple(authors.get(book_id, ())))
+                for book_id, *columns, publisher_name in rows]
+
+    def load_relationships(self, books):
+        """ Loads the authors and publisher of the mapped books up front, whatever the loading strategy. """
+        book_ids = [book.book_id for book in books if isinstance(book, Book)]
+        if book_ids:
+            self._session_cm.session.query(Book).options(
+                selectinload(Book._Book__authors), selectinload(Book._Book__publisher)).populate_existing().filter(
+                Book._Book__book_id.in_(book_ids)).all()
+
     def get_books_by_indices(self, indices):
-        books = self._session_cm.session.query(Book).order_by(Book._Book__book_id).all()
-        result = list()
-        for index in indices:
-            if index < len(books):
-                result.append(books[index])
-        return result
+        self._expire_caches()
+        if self._book_ids is None:
+            book_ids = self._session_cm.session.query(Book._Book__book_id).order_by(Book._Book__book_id).all()
+            self._book_ids = array('q', (row[0] for row in book_ids))
 
-    def get_books(self, offset: int, page_size: int):
-        books = self._session_cm.session.query(Book).order_by(Book._Book__book_id).limit(page_size).offset(offset).all()
-        return books
+        selected_ids = [self._book_ids[index] for index in indices if index < len(self._book_ids)]
+        return self._get_books_in_order(selected_ids)
 
-    def get_books_by_publisher(self, publisher_name: str):
-        books = self._session_cm.session.query(Book).filter(Book.publisher_name == publisher_name).all()
-        return books
+    def _get_books_in_order(self, book_ids):
+        books = self._get_books(lambda statement: statement.where(books_table.c.book_id.in_(book_ids)))
+        books_by_id = {book.book_id: book for book in books}
+        return [books_by_id[book_id] for book_id in book_ids if book_id in books_by_id]
 
-    def get_books_by_release_year(self, release_year: int):
-        books = self._session_cm.session.query(Book).filter(Book._Book__release_year == release_year).all()
+    def get_books(self, offset: int, page_size: int):
+        books = self._get_books(lambda statement: statement.order_by(books_table.c.book_id).limit(page_size).offset(
+            offset * page_size))
         return books
 
-    def get_books_by_author_id(self, author_id: int):
-        book_ids = self._session_cm.session.execute('SELECT book_id FROM book_authors WHERE author_id = :author_id',
-                                                    {'author_id': author_id}).fetchall()
-        book_ids = [id[0] for id in book_ids]
+    def get_books_after(self, book_id: int, limit: int):
+        def refine(statement):
+            if book_id is not None:
+                statement = statement.where(books_table.c.book_id > book_id)
+            return statement.order_by(books_table.c.book_id).limit(limit)
 
-        books = self._session_cm.session.query(Book).filter(Book._Book__book_id.in_(book_ids)).all()
+        books = self._get_books(refine)
         return books
 
+    def get_books_before(self, book_id: int, limit: int):
+        books = self._get_books(lambda statement: statement.where(books_table.c.book_id < book_id).order_by(
+            books_table.c.book_id.desc()).limit(limit))
+        return books[::-1]
+
+    def _page_of_books(self, refine, offset: int, limit: int):
+        return self._get_books(lambda statement: refine(statement).order_by(books_table.c.book_id).limit(
+            limit).offset(offset))
+
+    def get_books_by_publisher(self, publisher_name: str, offset: int = 0, limit: int = None):
+        return self._page_of_books(lambda statement: statement.where(books_table.c.publisher_name == publisher_name),
+                                   offset, limit)
+
+    def get_books_by_release_year(self, release_year: int, offset: int = 0, limit: int = None):
+        return self._page_of_books(lambda statement: statement.where(books_table.c.release_year == release_year),
+                                   offset, limit)
+
+    def get_books_by_author_id(self, author_id: int, offset: int = 0, limit: int = None):
+        return self._page_of_books(lambda statement: statement.join(
+            book_authors_table, book_authors_table.c.book_id == books_table.c.book_id).where(
+            book_authors_table.c.author_id == author_id), offset, limit)
+
+    def search_books(self, query: str, offset: int, limit: int):
+        match_query = make_match_query(query)
+        if match_query == '':
+            return []
+        # bm25() is lower for better matches, so scaling it up by the rating boost ranks better rated books first.
+        rows = self._session_cm.session.execute(text(
+            "SELECT books.book_id FROM books_fts JOIN books ON books.book_id = books_fts.rowid "
+            "WHERE books_fts MATCH :match_query "
+            f"ORDER BY bm25(books_fts, {FIELD_WEIGHTS['title']}, {FIELD_WEIGHTS['authors']}, "
+            f"{FIELD_WEIGHTS['description']}) * (1 + {RATING_BOOST} * coalesce(books.average_rating, 0)) "
+            "LIMIT :limit OFFSET :offset"), {'match_query': match_query, 'limit': limit, 'offset': offset})
+        return self._get_books_in_order([row[0] for row in rows])
+
+    def _facet_condition(self, query: FacetedQuery):
+        columns = books_table.c
+        conditions = []
+        if query.publisher_names:
+            conditions.append(columns.publisher_name.in_(query.publisher_names))
+        if query.author_ids:
+            conditions.append(columns.book_id.in_(
+                select(book_authors_table.c.book_id).where(book_authors_table.c.author_id.in_(query.author_ids))))
+        if query.ebook is not None:
+            conditions.append(columns.ebook == bool(query.ebook))
+        for column, low, high in ((columns.release_year, query.release_year_min, query.release_year_max),
+                                  (columns.num_pages, query.num_pages_min, query.num_pages_max),
+                                  (columns.average_rating, query.min_rating, None)):
+            bounds = []
+            if low is not None:
+                bounds.append(column >= low)
+            if high is not None:
+                bounds.append(column <= high)
+            if bounds:
+                conditions.append(and_(*bounds))
+        if not conditions:
+            return None
+        return and_(*conditions) if query.operator == 'and' else or_(*conditions)
+
+    def get_books_by_facets(self, query: FacetedQuery, offset: int, limit: int) -> FacetedPage:
+        condition = self._facet_condition(query)
+
+        def grouped_counts(column, order_by=None, limit=None):
+            statement = select(column, func.count()).group_by(column)
+            if condition is not None:
+                statement = statement.where(condition)
+            if order_by is not None:
+                statement = statement.order_by(*order_by).limit(limit)
+            return Counter(dict(self._session_cm.session.execute(statement).all()))
+
+        columns = books_table.c
+        publisher_counts = grouped_counts(columns.publisher_name, (func.count().desc(), columns.publisher_name),
+                                          MAX_PUBLISHER_COUNTS + 1)
+        release_year_counts = grouped_counts(columns.release_year)
+        ebook_counts = grouped_counts(columns.ebook)
+        # Every book has an ebook flag, so the ebook counts add up to the number of matching books.
+        total = sum(ebook_counts.values())
+
+        sort_column = columns[query.sort_by]
+        order_by = (sort_column.desc(), columns.book_id.desc()) if query.descending else (sort_column, columns.book_id)
+
+        def refine(statement):
+            if condition is not None:
+                statement = statement.where(condition)
+            return statement.order_by(*order_by).limit(limit).offset(offset)
+
+        books = self._get_books(refine)
+        return FacetedPage(books, total, make_facet_counts(publisher_counts, release_year_counts, ebook_counts))
+
+    def _build_prefix_index(self, table, id_column: str, name_column: str) -> PrefixIndex:
+        index = PrefixIndex()
+        rows = self._session_cm.session.execute(
+            select(table.c[id_column], table.c[name_column], table.c.ratings_count))
+        for item_id, name, ratings_count in rows:
+            index.add(item_id, name, ratings_count)
+        return index
+
+    def get_title_suggestions(self, prefix: str, limit: int):
+        self._expire_caches()
+        if self._title_index is None:
+            self._title_index = self._build_prefix_index(books_table, 'book_id', 'title')
+        return self._title_index.complete(prefix, limit)
+
+    def get_author_suggestions(self, prefix: str, limit: int):
+        self._expire_caches()
+        if self._author_name_index is None:
+            self._author_name_index = self._build_prefix_index(authors_table, 'unique_id', 'full_name')
+        return self._author_name_index.complete(prefix, limit)
+
     def get_number_of_books(self) -> int:
-        count = self._session_cm.session.query(Book).count()
-        return count
+        self._expire_caches()
+        if self._number_of_books is None:
+            self._number_of_books = self._session_cm.session.query(func.count(Book._Book__book_id)).scalar()
+        return self._number_of_books
 
     def add_author(self, author: Author) -> Author:
         existing_author = self.get_author(author.unique_id)
@@ -119,6 +410,10 @@ class SqlAlchemyRepository(AbstractRepository):
             with self._session_cm as scm:
                 scm.session.merge(author)
                 scm.commit()
+            if self._number_of_authors is not None:
+                self._number_of_authors += 1
+            if self._author_name_index is not None:
+                self._author_name_index.add(author.unique_id, author.full_name, author.ratings_count)
             return author
         else:
             return existing_author
@@ -134,14 +429,36 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return author
 
+    def _get_authors(self, refine):
+        # Authors as AuthorRows with the 'rows' strategy, as mapped Authors otherwise, see _get_books.
+        if self._loading_strategy == 'rows':
+            return [AuthorRow(*row) for row in self._session_cm.session.execute(refine(select(*AUTHOR_ROW_COLUMNS)))]
+        return refine(self._session_cm.session.query(Author)).all()
+
     def get_authors(self, offset: int, page_size: int):
-        authors = self._session_cm.session.query(Author).order_by(Author._Author__unique_id).limit(page_size).offset(
-            offset).all()
+        authors = self._get_authors(lambda statement: statement.order_by(authors_table.c.unique_id).limit(
+            page_size).offset(offset * page_size))
         return authors
 
+    def get_authors_after(self, author_id: int, limit: int):
+        def refine(statement):
+            if author_id is not None:
+                statement = statement.where(authors_table.c.unique_id > author_id)
+            return statement.order_by(authors_table.c.unique_id).limit(limit)
+
+        authors = self._get_authors(refine)
+        return authors
+
+    def get_authors_before(self, author_id: int, limit: int):
+        authors = self._get_authors(lambda statement: statement.where(authors_table.c.unique_id < author_id).order_by(
+            authors_table.c.unique_id.desc()).limit(limit))
+        return authors[::-1]
+
     def get_number_of_authors(self) -> int:
-        count = self._session_cm.session.query(Author).count()
-        return count
+        self._expire_caches()
+        if self._number_of_authors is None:
+            self._number_of_authors = self._session_cm.session.query(func.count(Author._Author__unique_id)).scalar()
+        return self._number_of_authors
 
     def add_publisher(self, publisher: Publisher):
         existing_publisher = self.get_publisher(publisher.name)
@@ -0,0 +1,343 @@
+"""Faceted filtering of books over bitmap indexes.
+
+A set of books is a bitmap: a Python int whose bit i is set when the book added i-th belongs to the set, so combining
+filters is a few operations on big integers. Publisher, author and ebook filters look up the rows of each value,
+kept as a sorted array while they are sparse and as a bitmap once dense, as roaring bitmaps do. Release year, page
+count and rating ranges are answered by bit-sliced indexes: one bitmap per bit of the values, from which the rows
+with a value at least or at most a bound are computed in as many steps as the values have bits.
+"""
+import math
+import re
+from array import array
+from collections import Counter
+
+NULL = -1
+# Sets of rows holding more than one row in DENSE_FRACTION of the catalogue are kept as bitmaps.
+DENSE_FRACTION = 64
+# Publishers are many, only those with the most matching books are counted.
+MAX_PUBLISHER_COUNTS = 10
+# Ratings are indexed as whole hundredths.
+RATING_SCALE = 100
+
+_NON_ZERO_BYTES = re.compile(rb'[^\x00]')
+_BITS_OF_BYTE = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+class FacetedQuery:
+    """ The filters and order of a faceted book listing.
+
+    Within a facet the values given are alternatives (any of the publishers), across facets the filters are combined
+    with operator, 'and' or 'or'. Ranges include both ends and either end can be left open with None. A query without
+    filters matches every book.
+    """
+
+    operators = ('and', 'or')
+    sort_keys = ('book_id', 'title', 'release_year', 'num_pages', 'average_rating', 'ratings_count')
+
+    def __init__(self, publisher_names=(), author_ids=(), release_year_min: int = None, release_year_max: int = None,
+                 ebook: bool = None, num_pages_min: int = None, num_pages_max: int = None, min_rating: float = None,
+                 operator: str = 'and', sort_by: str = 'book_id', descending: bool = False):
+        if operator not in self.operators:
+            raise ValueError(f'Unknown operator {operator!r}')
+        if sort_by not in self.sort_keys:
+            raise ValueError(f'Unknown sort key {sort_by!r}')
+        if min_rating is not None and not math.isfinite(min_rating):
+            raise ValueError(f'Minimum rating must be finite, not {min_rating!r}')
+        self.publisher_names = tuple(publisher_names)
+        self.author_ids = tuple(author_ids)
+        self.release_year_min = release_year_min
+        self.release_year_max = release_year_max
+        self.ebook = ebook
+        self.num_pages_min = num_pages_min
+        self.num_pages_max = num_pages_max
+        self.min_rating = min_rating
+        self.operator = operator
+        self.sort_by = sort_by
+        self.descending = descending
+
+    @property
+    def has_filters(self) -> bool:
+        return bool(self.publisher_names or self.author_ids or self.ebook is not None or self.min_rating is not None or
+                    self.release_year_min is not None or self.release_year_max is not None or
+                    self.num_pages_min is not None or self.num_pages_max is not None)
+
+
+class FacetedPage:
+    """ A page of the books matching a FacetedQuery, with the number of matching books and per-facet counts.
+
+    facet_counts maps 'publisher' to (name, count) pairs of the publishers with the most matching books, 'release_year'
+    to (year, count) pairs by year and 'ebook' to (ebook, count) pairs, leaving out values without matching books.
+    """
+
+    def __init__(self, books: list, total: int, facet_counts: dict):
+        self.books = books
+        self.total = total
+        self.facet_counts = facet_counts
+
+
+def make_facet_counts(publisher_counts: Counter, release_year_counts: Counter, ebook_counts: Counter) -> dict:
+    return {
+        'publisher': sorted(((name, count) for name, count in publisher_counts.items() if count and name is not None),
+                            key=lambda item: (-item[1], item[0]))[:MAX_PUBLISHER_COUNTS],
+        'release_year': sorted((year, count) for year, count in release_year_counts.items()
+                               if count and year is not None),
+        'ebook': [(ebook, ebook_counts[ebook]) for ebook in (True, False) if ebook_counts[ebook]],
+    }
+
+
+if hasattr(int, 'bit_count'):
+    bit_count = int.bit_count
+else:
+    def bit_count(bitmap: int) -> int:
+        # Before Python 3.10 the bits are counted in the binary representation.
+        return bin(bitmap).count('1')
+
+
+def insertion_point(order, key, sort_key) -> int:
+    """ Returns where a row with key goes in order, a list of rows sorted by sort_key, before rows with equal keys. """
+    low, high = 0, len(order)
+    while low < high:
+        middle = (low + high) // 2
+        if sort_key(order[middle]) < key:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def rows_of(bitmap: int):
+    """ Yields the rows set in bitmap, in increasing order. """
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for match in _NON_ZERO_BYTES.finditer(data):
+        base = match.start() << 3
+        for bit in _BITS_OF_BYTE[data[match.start()]]:
+            yield base + bit
+
+
+def bitmap_of(rows) -> int:
+    rows = list(rows)
+    if not rows:
+        return 0
+    data = bytearray((max(rows) >> 3) + 1)
+    for row in rows:
+        data[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(data, 'little')
+
+
+class _BitSlices:
+    """ A bit-sliced index of non-negative integer values. """
+
+    def __init__(self, values):
+        self.__bits = max((value.bit_length() for value in values), default=0)
+        exists = bytearray((len(values) >> 3) + 1)
+        slices = [bytearray(len(exists)) for _ in range(self.__bits)]
+        for row, value in enumerate(values):
+            if value != NULL:
+                byte, mask = row >> 3, 1 << (row & 7)
+                exists[byte] |= mask
+                while value:
+                    bit = value.bit_length() - 1
+                    slices[bit][byte] |= mask
+                    value ^= 1 << bit
+        self.__exists = int.from_bytes(exists, 'little')
+        self.__slices = [int.from_bytes(bit_slice, 'little') for bit_slice in slices]
+
+    def add(self, row: int, value: int) -> bool:
+        """ Adds the value of a new row, returns False when the value needs more bits than the index has. """
+        if value == NULL:
+            return True
+        if value.bit_length() > self.__bits:
+            return False
+        self.__exists |= 1 << row
+        for bit in range(self.__bits):
+            if value >> bit & 1:
+                self.__slices[bit] |= 1 << row
+        return True
+
+    def at_least(self, bound: int) -> int:
+        if bound <= 0:
+            return self.__exists
+        if bound.bit_length() > self.__bits:
+            return 0
+        greater, equal = 0, self.__exists
+        for bit in reversed(range(self.__bits)):
+            if bound >> bit & 1:
+                equal &= self.__slices[bit]
+            else:
+                greater |= equal & self.__slices[bit]
+                equal &= ~self.__slices[bit]
+        return greater | equal
+
+    def at_most(self, bound: int) -> int:
+        if bound < 0:
+            return 0
+        if bound.bit_length() > self.__bits:
+            return self.__exists
+        less, equal = 0, self.__exists
+        for bit in reversed(range(self.__bits)):
+            if bound >> bit & 1:
+                less |= equal & ~self.__slices[bit]
+                equal &= self.__slices[bit]
+            else:
+                equal &= ~self.__slices[bit]
+        return less | equal
+
+
+class FacetIndex:
+    """ Bitmap indexes over the facets of the books of a repository, answering FacetedQuery with the ids of a page of
+    matching books.
+
+    The bit-sliced indexes and sort orders are built on the first query that needs them and kept up to date as books
+    are added from then on.
+    """
+
+    def __init__(self):
+        self.__book_ids = array('q')
+        self.__titles = list()
+        self.__publishers = list()
+        self.__release_years = array('q')
+        self.__num_pages = array('q')
+        self.__ratings = array('q')
+        self.__ratings_counts = array('q')
+        self.__rows = {'publisher': dict(), 'author': dict(), 'release_year': dict(), 'ebook': dict()}
+        # Bitmaps of the dense sets of rows in self.__rows.
+        self.__bitmaps = dict()
+        self.__slices = dict()
+        self.__orders = dict()
+
+    def __len__(self):
+        return len(self.__book_ids)
+
+    def add(self, book_id: int, title: str, publisher_name: str, author_ids, release_year: int, ebook: bool,
+            num_pages: int, average_rating: float, ratings_count: int):
+        row = len(self.__book_ids)
+        self.__book_ids.append(book_id)
+        self.__titles.append(title)
+        self.__publishers.append(publisher_name)
+        self.__release_years.append(NULL if release_year is None else release_year)
+        self.__num_pages.append(NULL if num_pages is None else num_pages)
+        self.__ratings.append(NULL if average_rating is None else round(average_rating * RATING_SCALE))
+        self.__ratings_counts.append(NULL if ratings_count is None else ratings_count)
+
+        for facet, value in (('publisher', publisher_name), ('release_year', release_year), ('ebook', bool(ebook)),
+                             *(('author', author_id) for author_id in author_ids)):
+            if value is not None:
+                self.__rows[facet].setdefault(value, array('l')).append(row)
+                if (facet, value) in self.__bitmaps:
+                    self.__bitmaps[facet, value] |= 1 << row
+
+        if self.__slices:
+            for facet, values in self.__range_values().items():
+                # A value too large for the bit slices built so far has them built again on the next query.
+                if facet in self.__slices and not self.__slices[facet].add(row, values[row]):
+                    del self.__slices[facet]
+        for sort_by, order in self.__orders.items():
+            sort_key = self.__sort_key(sort_by)
+            order.insert(insertion_point(order, sort_key(row), sort_key), row)
+
+    def __range_values(self):
+        return {'release_year': self.__release_years, 'num_pages': self.__num_pages, 'rating': self.__ratings}
+
+    def __sort_key(self, sort_by: str):
+        book_ids = self.__book_ids
+        if sort_by == 'book_id':
+            return book_ids.__getitem__
+        values = {'title': self.__titles, 'release_year': self.__release_years, 'num_pages': self.__num_pages,
+                  'average_rating': self.__ratings, 'ratings_count': self.__ratings_counts}[sort_by]
+        return lambda row: (values[row], book_ids[row])
+
+    def __values_bitmap(self, facet: str, values) -> int:
+        bitmap = 0
+        for value in values:
+            rows = self.__rows[facet].get(value)
+            if rows is None:
+                continue
+            if (facet, value) in self.__bitmaps:
+                bitmap |= self.__bitmaps[facet, value]
+            elif len(rows) * DENSE_FRACTION > len(self.__book_ids):
+                bitmap |= self.__bitmaps.setdefault((facet, value), bitmap_of(rows))
+            else:
+                bitmap |= bitmap_of(rows)
+        return bitmap
+
+    def __range_bitmap(self, facet: str, low: int, high: int) -> int:
+        if facet not in self.__slices:
+            self.__slices[facet] = _BitSlices(self.__range_values()[facet])
+        slices = self.__slices[facet]
+        if low is None:
+            return slices.at_most(high)
+        if high is None:
+            return slices.at_least(low)
+        return slices.at_least(low) & slices.at_most(high)
+
+    def __filter_bitmaps(self, query: FacetedQuery):
+        if query.publisher_names:
+            yield self.__values_bitmap('publisher', query.publisher_names)
+        if query.author_ids:
+            yield self.__values_bitmap('author', query.author_ids)
+        if query.ebook is not None:
+            yield self.__values_bitmap('ebook', (bool(query.ebook),))
+        if query.release_year_min is not None or query.release_year_max is not None:
+            yield self.__range_bitmap('release_year', query.release_year_min, query.release_year_max)
+        if query.num_pages_min is not None or query.num_pages_max is not None:
+            yield self.__range_bitmap('num_pages', query.num_pages_min, query.num_pages_max)
+        if query.min_rating is not None:
+            # Ratings go from 0 to 5: bounds outside that range match the same books as 0 or 6, which can be scaled.
+            yield self.__range_bitmap('rating', round(min(max(query.min_rating, 0), 6) * RATING_SCALE), None)
+
+    def __facet_counts(self, bitmap: int) -> dict:
+        rows = self.__rows
+        if bitmap is None:
+            return make_facet_counts(*(Counter({value: len(rows[facet][value]) for value in rows[facet]})
+                                       for facet in ('publisher', 'release_year', 'ebook')))
+        ebook_counts = Counter({ebook: bit_count(bitmap & self.__values_bitmap('ebook', (ebook,)))
+                                for ebook in rows['ebook']})
+        publishers = self.__publishers
+        release_years = self.__release_years
+        publisher_counts = Counter()
+        release_year_counts = Counter()
+        for row in rows_of(bitmap):
+            publisher_counts[publishers[row]] += 1
+            release_year_counts[release_years[row]] += 1
+        release_year_counts.pop(NULL, None)
+        return make_facet_counts(publisher_counts, release_year_counts, ebook_counts)
+
+    def __page(self, bitmap: int, total: int, query: FacetedQuery, offset: int, limit: int):
+        sort_key = self.__sort_key(query.sort_by)
+        if total * DENSE_FRACTION <= len(self.__book_ids):
+            # Few books match: sorting them is quicker than looking for them along the whole order.
+            rows = sorted(rows_of(bitmap), key=sort_key, reverse=query.descending)
+            return [self.__book_ids[row] for row in rows[offset:offset + limit]]
+
+        if query.sort_by not in self.__orders:
+            self.__orders[query.sort_by] = array('l', sorted(range(len(self.__book_ids)), key=sort_key))
+        order = self.__orders[query.sort_by]
+        data = bitmap.to_bytes((len(self.__book_ids) >> 3) + 1, 'little')
+        book_ids = []
+        for row in (reversed(order) if query.descending else order):
+            if data[row >> 3] >> (row & 7) & 1:
+                if offset > 0:
+                    offset -= 1
+                else:
+                    book_ids.append(self.__book_ids[row])
+                    if len(book_ids) == limit:
+                        break
+        return book_ids
+
+    def query(self, query: FacetedQuery, offset: int, limit: int):
+        """ Returns the ids of a page of the books matching query, their number and the facet counts. """
+        if not query.has_filters:
+            bitmap = (1 << len(self.__book_ids)) - 1
+            return self.__page(bitmap, len(self.__book_ids), query, offset, limit), len(self.__book_ids), \
+                self.__facet_counts(None)
+
+        bitmap = None
+        for filter_bitmap in self.__filter_bitmaps(query):
+            if bitmap is None:
+                bitmap = filter_bitmap
+            elif query.operator == 'and':
+                bitmap &= filter_bitmap
+            else:
+                bitmap |= filter_bitmap
+        total = bit_count(bitmap)
+        return self.__page(bitmap, total, query, offset, limit), total, self.__facet_counts(bitmap)
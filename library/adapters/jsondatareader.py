@@ -1,5 +1,5 @@
 import json
-from typing import List
+from typing import List, Iterator
 
 from library.domain.model import Publisher, Author, Book
 
@@ -11,6 +11,8 @@ class BooksJSONReader:
         self.__authors_file_name = authors_file_name
         self.__dataset_of_books = []
         self.__dataset_of_authors = []
+        self.__authors_index = dict()
+        self.__number_of_unresolved_author_ids = 0
 
     @property
     def dataset_of_books(self) -> List[Book]:
@@ -20,34 +22,34 @@ class BooksJSONReader:
     def dataset_of_authors(self) -> List[Author]:
         return self.__dataset_of_authors
 
+    @property
+    def number_of_unresolved_author_ids(self) -> int:
+        return self.__number_of_unresolved_author_ids
+
+    @staticmethod
+    def iter_json_lines(file_name: str) -> Iterator[dict]:
+        with open(file_name, encoding='UTF-8') as jsonfile:
+            for line in jsonfile:
+                yield json.loads(line)
+
     def read_books_file(self) -> list:
-        books_json = []
-        with open(self.__books_file_name, encoding='UTF-8') as books_jsonfile:
-            for line in books_jsonfile:
-                book_entry = json.loads(line)
-                books_json.append(book_entry)
-        return books_json
+        return list(self.iter_json_lines(self.__books_file_name))
 
     def read_authors_file(self) -> list:
-        authors_json = []
-        with open(self.__authors_file_name, encoding='UTF-8') as authors_jsonfile:
-            for line in authors_jsonfile:
-                author_entry = json.loads(line)
-                authors_json.append(author_entry)
-        return authors_json
+        return list(self.iter_json_lines(self.__authors_file_name))
 
-    def read_json_files(self):
-        authors_json = self.read_authors_file()
-        for author_json in authors_json:
+    def iter_authors(self) -> Iterator[Author]:
+        for author_json in self.iter_json_lines(self.__authors_file_name):
             author = Author(int(author_json['author_id']), author_json['name'])
             author.average_rating = float(author_json['average_rating'])
             author.text_reviews_count = int(author_json['text_reviews_count'])
             author.ratings_count = int(author_json['ratings_count'])
-            self.__dataset_of_authors.append(author)
+            yield author
 
-        books_json = self.read_books_file()
-
-        for book_json in books_json:
+    def iter_books(self) -> Iterator[Book]:
+        # Books are built one line at a time, so only the current line is held in memory. Their authors are resolved
+        # through an id index of dataset_of_authors, which has to be read first (see read_authors).
+        for book_json in self.iter_json_lines(self.__books_file_name):
             book_instance = Book(int(book_json['book_id']), book_json['title'])
             book_instance.publisher = Publisher(book_json['publisher'])
             if book_json['publication_year'] != '':
@@ -73,14 +75,20 @@ class BooksJSONReader:
             # extract the author ids:
             list_of_authors_ids = book_json['authors']
             for author_id in list_of_authors_ids:
+                author = self.__authors_index.get(int(author_id['author_id']))
+                if author is not None:
+                    book_instance.add_author(author)
+                else:
+                    # The author is missing from the authors file, keep count rather than failing the import.
+                    self.__number_of_unresolved_author_ids += 1
+
+            yield book_instance
 
-                numerical_id = int(author_id['author_id'])
-                # We assume book authors are available in the authors file,
-                # otherwise more complex handling is required.
-                author_name = None
-                for author in self.dataset_of_authors:
-                    if author.unique_id == numerical_id:
-                        book_instance.add_author(author)
-                        break
+    def read_authors(self):
+        for author in self.iter_authors():
+            self.__dataset_of_authors.append(author)
+            self.__authors_index.setdefault(author.unique_id, author)
 
-            self.__dataset_of_books.append(book_instance)
+    def read_json_files(self):
+        self.read_authors()
+        self.__dataset_of_books.extend(self.iter_books())
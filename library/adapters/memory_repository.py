@@ -1,54 +1,130 @@
 import csv
 from bisect import insort_left
+from operator import attrgetter
 from pathlib import Path
 
 from werkzeug.security import generate_password_hash
 
+from library.adapters.facet_index import FacetIndex, FacetedQuery, FacetedPage
 from library.adapters.jsondatareader import BooksJSONReader
+from library.adapters.prefix_index import PrefixIndex
 from library.adapters.repository import AbstractRepository
+from library.adapters.sorted_blocks import SortedBlocks, BLOCK_SIZE
+from library.adapters.text_index import TextIndex
 from library.domain.model import Book, Author, User, Publisher, Review, ReadingList
 
+book_id_of = attrgetter('book_id')
+author_id_of = attrgetter('unique_id')
+
+
+def index_book(index: dict, key, book: Book):
+    # Lists of books sharing a key are kept sorted by book id. Small lists are plain lists; once one reaches a block's
+    # length it is moved into SortedBlocks so that inserting into a large publisher or year stays cheap.
+    books = index.get(key)
+    if books is None:
+        index[key] = [book]
+    elif isinstance(books, SortedBlocks):
+        books.add(book)
+    elif len(books) < BLOCK_SIZE:
+        insort_left(books, book)
+    else:
+        books = index[key] = SortedBlocks(books, key=book_id_of)
+        books.add(book)
+
 
 class MemoryRepository(AbstractRepository):
     def __init__(self):
-        self.__users = list()
-        self.__books = list()
+        self.__users = dict()
+        self.__users_lower_index = dict()
+        self.__books = SortedBlocks(key=book_id_of)
         self.__books_index = dict()
-        self.__authors = list()
+        self.__authors = SortedBlocks(key=author_id_of)
         self.__authors_index = dict()
         self.__publishers = set()
         self.__publishers_index = dict()
         self.__author_books_index = dict()
         self.__publisher_books_index = dict()
         self.__release_year_books_index = dict()
+        self.__text_index = TextIndex()
+        self.__title_index = PrefixIndex()
+        self.__facet_index = FacetIndex()
+        self.__author_name_index = PrefixIndex()
         self.__reviews = dict()
         self.__reading_list = dict()
 
     def add_user(self, user: User):
-        self.__users.append(user)
-
-    def get_user(self, user_name) -> User:
-        return next((user for user in self.__users if user.user_name == user_name), None)
+        # Users are keyed by user name, which is what User equality is based on. The first user added under a given
+        # name is the one returned by get_user.
+        self.__users.setdefault(user.user_name, user)
+        if user.user_name is not None:
+            self.__users_lower_index.setdefault(user.user_name.lower(), user)
+
+    def get_user(self, user_name, case_insensitive: bool = False) -> User:
+        if case_insensitive:
+            if not isinstance(user_name, str):
+                return None
+            return self.__users_lower_index.get(user_name.lower())
+        return self.__users.get(user_name)
+
+    def bulk_load(self, books, authors, users):
+        if len(self.__books) or len(self.__authors):
+            # Merging into a populated repository is left to the per-row path.
+            for book in books:
+                publisher = self.add_publisher(Publisher(book.publisher.name))
+                publisher.add_book(book)
+                book.publisher = publisher
+                self.add_book(book)
+            for user in users:
+                self.add_user(user)
+            for author in authors:
+                self.add_author(author)
+            return
+
+        # Everything is appended and sorted once, then the secondary indexes are built in a single pass in book id
+        # order, so each list of books sharing a key is built by appending rather than by sorted insertion.
+        self.__books = SortedBlocks(books, key=book_id_of)
+        for book in self.__books:
+            publisher = self.add_publisher(Publisher(book.publisher.name))
+            publisher.add_book(book)
+            book.publisher = publisher
+            self.__books_index[book.book_id] = book
+            for author in book.authors:
+                self.__author_books_index.setdefault(author.unique_id, []).append(book)
+            self.__publisher_books_index.setdefault(publisher.name, []).append(book)
+            if book.release_year is not None:
+                self.__release_year_books_index.setdefault(book.release_year, []).append(book)
+            self.__index_book(book)
+        for index in (self.__author_books_index, self.__publisher_books_index, self.__release_year_books_index):
+            for key, books_of_key in index.items():
+                if len(books_of_key) >= BLOCK_SIZE:
+                    index[key] = SortedBlocks(books_of_key, key=book_id_of)
+
+        for user in users:
+            self.add_user(user)
+
+        self.__authors = SortedBlocks(authors, key=author_id_of)
+        for author in self.__authors:
+            self.__authors_index[author.unique_id] = author
+            self.__author_name_index.add(author.unique_id, author.full_name, author.ratings_count)
 
     def add_book(self, book: Book):
-        insort_left(self.__books, book)
+        self.__books.add(book)
         self.__books_index[book.book_id] = book
         for author in book.authors:
-            if self.__author_books_index.get(author.unique_id):
-                self.__author_books_index[author.unique_id].append(book)
-            else:
-                self.__author_books_index[author.unique_id] = [book]
+            index_book(self.__author_books_index, author.unique_id, book)
         if book.publisher is not None:
-            if self.__publisher_books_index.get(book.publisher.name):
-                self.__publisher_books_index[book.publisher.name].append(book)
-            else:
-                self.__publisher_books_index[book.publisher.name] = [book]
-
+            index_book(self.__publisher_books_index, book.publisher.name, book)
         if book.release_year is not None:
-            if self.__release_year_books_index.get(book.release_year):
-                self.__release_year_books_index[book.release_year].append(book)
-            else:
-                self.__release_year_books_index[book.release_year] = [book]
+            index_book(self.__release_year_books_index, book.release_year, book)
+        self.__index_book(book)
+
+    def __index_book(self, book: Book):
+        self.__text_index.add(book.book_id, book.title, [author.full_name for author in book.authors],
+                              book.description, book.average_rating)
+        self.__title_index.add(book.book_id, book.title, book.ratings_count)
+        self.__facet_index.add(book.book_id, book.title, book.publisher.name if book.publisher is not None else None,
+                               [author.unique_id for author in book.authors], book.release_year, book.ebook,
+                               book.num_pages, book.average_rating, book.ratings_count)
 
     def get_book(self, book_id: int) -> Book:
         book = None
@@ -70,21 +146,46 @@ class MemoryRepository(AbstractRepository):
     def get_books(self, offset: int, page_size: int):
         return self.__books[offset * page_size:(offset + 1) * page_size]
 
-    def get_books_by_publisher(self, publisher_name: str):
-        books = self.__publisher_books_index.get(publisher_name)
-        return books if books else []
+    def get_books_after(self, book_id: int, limit: int):
+        start = 0 if book_id is None else self.__books.bisect_right(book_id)
+        return self.__books[start:start + limit]
 
-    def get_books_by_release_year(self, release_year: int):
-        books = self.__release_year_books_index.get(release_year)
-        return books if books else []
+    def get_books_before(self, book_id: int, limit: int):
+        end = self.__books.bisect_left(book_id)
+        return self.__books[max(0, end - limit):end]
 
-    def get_books_by_author_id(self, author_id: int):
-        books = self.__author_books_index.get(author_id)
-        return books if books else []
+    def get_books_by_publisher(self, publisher_name: str, offset: int = 0, limit: int = None):
+        return self.__page_of(self.__publisher_books_index.get(publisher_name), offset, limit)
+
+    def get_books_by_release_year(self, release_year: int, offset: int = 0, limit: int = None):
+        return self.__page_of(self.__release_year_books_index.get(release_year), offset, limit)
+
+    def get_books_by_author_id(self, author_id: int, offset: int = 0, limit: int = None):
+        return self.__page_of(self.__author_books_index.get(author_id), offset, limit)
+
+    @staticmethod
+    def __page_of(books, offset: int, limit: int):
+        if not books:
+            return []
+        return books[offset:] if limit is None else books[offset:offset + limit]
+
+    def search_books(self, query: str, offset: int, limit: int):
+        return [self.__books_index[book_id] for book_id in self.__text_index.search(query, offset, limit)]
+
+    def get_books_by_facets(self, query: FacetedQuery, offset: int, limit: int) -> FacetedPage:
+        book_ids, total, facet_counts = self.__facet_index.query(query, offset, limit)
+        return FacetedPage([self.__books_index[book_id] for book_id in book_ids], total, facet_counts)
+
+    def get_title_suggestions(self, prefix: str, limit: int):
+        return self.__title_index.complete(prefix, limit)
+
+    def get_author_suggestions(self, prefix: str, limit: int):
+        return self.__author_name_index.complete(prefix, limit)
 
     def add_author(self, author: Author) -> Author:
-        insort_left(self.__authors, author)
+        self.__authors.add(author)
         self.__authors_index[author.unique_id] = author
+        self.__author_name_index.add(author.unique_id, author.full_name, author.ratings_count)
         return author
 
     def get_author(self, author_id: int) -> Book:
@@ -100,6 +201,14 @@ class MemoryRepository(AbstractRepository):
     def get_authors(self, offset: int, page_size: int):
         return self.__authors[offset * page_size:(offset + 1) * page_size]
 
+    def get_authors_after(self, author_id: int, limit: int):
+        start = 0 if author_id is None else self.__authors.bisect_right(author_id)
+        return self.__authors[start:start + limit]
+
+    def get_authors_before(self, author_id: int, limit: int):
+        end = self.__authors.bisect_left(author_id)
+        return self.__authors[max(0, end - limit):end]
+
     def get_number_of_authors(self) -> int:
         return len(self.__authors)
 
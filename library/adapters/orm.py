@@ -1,5 +1,6 @@
 # global variable giving access to the MetaData (schema) information of the database
-from sqlalchemy import MetaData, Table, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, JSON
+from sqlalchemy import MetaData, Table, Column, Integer, String, Float, DateTime, ForeignKey, Boolean, JSON, Index, \
+    func, event
 from sqlalchemy.orm import mapper, relationship, backref
 
 from library.domain import model
@@ -12,13 +13,16 @@ users_table = Table(
     Column('user_name', String(255), unique=True, nullable=False),
     Column('password', String(255), nullable=False)
 )
+Index('ix_users_user_name_lower', func.lower(users_table.c.user_name))
 
 reading_lists_table = Table(
     'user_reading_lists', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('shelf', String(255), nullable=False),
     Column('book_id', ForeignKey('books.book_id')),
-    Column('user_id', ForeignKey('users.id'))
+    Column('user_id', ForeignKey('users.id')),
+    Index('ix_user_reading_lists_user_id_book_id', 'user_id', 'book_id'),
+    Index('ix_user_reading_lists_user_id_shelf', 'user_id', 'shelf'),
 )
 
 publishers_table = Table(
@@ -50,13 +54,25 @@ books_table = Table(
     Column('average_rating', Float, nullable=True),
     Column('text_reviews_count', Integer, nullable=True),
     Column('publisher_name', ForeignKey('publishers.name')),
+    # SQLite appends the book id (the rowid) to every index entry, so these two also list the books of a publisher or
+    # release year in book id order, and a page of them is read without sorting.
+    Index('ix_books_release_year', 'release_year'),
+    Index('ix_books_publisher_name', 'publisher_name'),
+    # Compound indexes for faceted queries, which filter on a publisher or the ebook flag together with a range of
+    # release years.
+    Index('ix_books_publisher_name_release_year', 'publisher_name', 'release_year'),
+    Index('ix_books_ebook_release_year', 'ebook', 'release_year'),
+    Index('ix_books_num_pages', 'num_pages'),
+    Index('ix_books_average_rating', 'average_rating'),
 )
 
 book_authors_table = Table(
     'book_authors', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
     Column('book_id', ForeignKey('books.book_id')),
-    Column('author_id', ForeignKey('authors.unique_id'))
+    Column('author_id', ForeignKey('authors.unique_id')),
+    Index('ix_book_authors_author_id_book_id', 'author_id', 'book_id'),
+    Index('ix_book_authors_book_id', 'book_id'),
 )
 
 reviews_table = Table(
@@ -66,9 +82,98 @@ reviews_table = Table(
     Column('timestamp', DateTime, nullable=False),
     Column('user_id', ForeignKey('users.id')),
     Column('book_id', ForeignKey('books.book_id')),
+    Index('ix_reviews_book_id', 'book_id'),
 )
 
 
+# SQLite FTS5 index over the titles, author names and descriptions of the books (rowid is the book id). The triggers
+# keep it in step with the books, book_authors and authors tables, whichever order their rows are written in.
+BOOK_AUTHOR_NAMES = "coalesce((SELECT group_concat(authors.full_name, ' ') FROM book_authors JOIN authors " \
+                    "ON authors.unique_id = book_authors.author_id WHERE book_authors.book_id = {book_id}), '')"
+TEXT_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(title, authors, description)",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_insert_book AFTER INSERT ON books BEGIN "
+    "DELETE FROM books_fts WHERE rowid = new.book_id; "
+    "INSERT INTO books_fts (rowid, title, authors, description) VALUES (new.book_id, new.title, "
+    f"{BOOK_AUTHOR_NAMES.format(book_id='new.book_id')}, coalesce(new.description, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_update_book AFTER UPDATE OF title, description ON books BEGIN "
+    "UPDATE books_fts SET title = new.title, description = coalesce(new.description, '') "
+    "WHERE rowid = new.book_id; END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_delete_book AFTER DELETE ON books BEGIN "
+    "DELETE FROM books_fts WHERE rowid = old.book_id; END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_insert_book_author AFTER INSERT ON book_authors BEGIN "
+    f"UPDATE books_fts SET authors = {BOOK_AUTHOR_NAMES.format(book_id='new.book_id')} "
+    "WHERE rowid = new.book_id; END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_delete_book_author AFTER DELETE ON book_authors BEGIN "
+    f"UPDATE books_fts SET authors = {BOOK_AUTHOR_NAMES.format(book_id='old.book_id')} "
+    "WHERE rowid = old.book_id; END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_insert_author AFTER INSERT ON authors BEGIN "
+    f"UPDATE books_fts SET authors = {BOOK_AUTHOR_NAMES.format(book_id='books_fts.rowid')} "
+    "WHERE rowid IN (SELECT book_id FROM book_authors WHERE author_id = new.unique_id); END",
+    "CREATE TRIGGER IF NOT EXISTS books_fts_update_author AFTER UPDATE OF full_name ON authors BEGIN "
+    f"UPDATE books_fts SET authors = {BOOK_AUTHOR_NAMES.format(book_id='books_fts.rowid')} "
+    "WHERE rowid IN (SELECT book_id FROM book_authors WHERE author_id = new.unique_id); END",
+)
+
+
+def _create_text_search(connection):
+    if connection.dialect.name != 'sqlite':
+        return
+    exists = connection.exec_driver_sql("SELECT count(*) FROM sqlite_master WHERE name = 'books_fts'").scalar()
+    for statement in TEXT_SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        # Index the books of a database created before the text search was added.
+        connection.exec_driver_sql(
+            "INSERT INTO books_fts (rowid, title, authors, description) SELECT book_id, title, "
+            f"{BOOK_AUTHOR_NAMES.format(book_id='books.book_id')}, coalesce(description, '') FROM books")
+
+
+def create_text_search(engine):
+    with engine.begin() as connection:
+        _create_text_search(connection)
+
+
+@event.listens_for(metadata, 'after_create')
+def _after_create(target, connection, **kw):
+    _create_text_search(connection)
+
+
+@event.listens_for(metadata, 'before_drop')
+def _before_drop(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("DROP TABLE IF EXISTS books_fts")
+
+
+def create_missing_indexes(engine):
+    # Migration step for databases created before the indexes were declared, metadata.create_all only adds them
+    # together with new tables. The SQLite catalogue is read directly, as the inspector does not report indexes on
+    # expressions.
+    existing_indexes = {row[0] for row in engine.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
+
+
+# Settings applied to every new SQLite connection by set_sqlite_pragmas, named as in config.py without 'SQLITE_'.
+SQLITE_PRAGMAS = ('journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store')
+
+
+def set_sqlite_pragmas(engine, pragmas: dict):
+    """ Runs 'PRAGMA name = value' for each of pragmas on every connection engine opens, skipping empty values. """
+    pragmas = {name: value for name, value in pragmas.items() if value not in (None, '')}
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+
 def map_model_to_tables():
     mapper(model.User, users_table, properties={
         '_User__user_name': users_table.c.user_name,
@@ -0,0 +1,113 @@
+import heapq
+from array import array
+from bisect import bisect_left
+
+# The most completions a single lookup returns.
+MAX_COMPLETIONS = 10
+# The best completions of prefixes matching more names than this are cached, so that the short prefixes typed first
+# don't scan a large part of the index every time.
+CACHE_THRESHOLD = 256
+# Names added since the last lookup are inserted one by one below this number, above it the index is sorted again.
+MERGE_THRESHOLD = 64
+
+
+def normalize(name: str) -> str:
+    return ' '.join(name.casefold().split()) if name else ''
+
+
+def _insert_completion(completions: list, weight: int, item_id: int, name: str):
+    for position, (other_weight, other_id, _) in enumerate(completions):
+        if other_id == item_id:
+            if other_weight >= weight:
+                return
+            del completions[position]
+            break
+    position = 0
+    while position < len(completions) and completions[position][0] >= weight:
+        position += 1
+    completions.insert(position, (weight, item_id, name))
+    del completions[MAX_COMPLETIONS:]
+
+
+class PrefixIndex:
+    """ Completes prefixes of names, such as book titles or author names, most popular first.
+
+    Names are kept normalized and sorted in parallel arrays with the ids and weights of their items, so the names
+    starting with a prefix form a contiguous range found by bisection. Names added between lookups are buffered and
+    merged in on the next lookup.
+
+    Items are expected to be added once. An item added again under another name or weight is completed by whichever
+    of its entries ranks best.
+    """
+
+    def __init__(self):
+        self.__keys = list()
+        self.__names = list()
+        self.__ids = array('q')
+        self.__weights = array('q')
+        self.__pending = list()
+        self.__best_completions = dict()
+
+    def add(self, item_id: int, name: str, weight: int):
+        key = normalize(name)
+        if key == '':
+            return
+        weight = weight or 0
+        self.__pending.append((key, item_id, name, weight))
+        # The cached completions of the prefixes of the new name are kept up to date rather than computed again.
+        for length in range(1, len(key) + 1):
+            completions = self.__best_completions.get(key[:length])
+            if completions is not None:
+                _insert_completion(completions, weight, item_id, name)
+
+    def __len__(self):
+        return len(self.__keys) + len(self.__pending)
+
+    def __merge(self):
+        pending, self.__pending = self.__pending, list()
+        if len(pending) < MERGE_THRESHOLD:
+            for key, item_id, name, weight in pending:
+                position = bisect_left(self.__keys, key)
+                self.__keys.insert(position, key)
+                self.__names.insert(position, name)
+                self.__ids.insert(position, item_id)
+                self.__weights.insert(position, weight)
+            return
+
+        entries = sorted(list(zip(self.__keys, self.__ids, self.__names, self.__weights)) + pending)
+        self.__keys = [entry[0] for entry in entries]
+        self.__ids = array('q', (entry[1] for entry in entries))
+        self.__names = [entry[2] for entry in entries]
+        self.__weights = array('q', (entry[3] for entry in entries))
+
+    def __complete(self, start: int, end: int, limit: int):
+        ids = self.__ids
+        completions = []
+        seen = set()
+        # Twice as many candidates as needed leaves room for items that were added more than once.
+        for position in heapq.nlargest(2 * limit, range(start, end), key=self.__weights.__getitem__):
+            if ids[position] not in seen:
+                seen.add(ids[position])
+                completions.append((self.__weights[position], ids[position], self.__names[position]))
+                if len(completions) == limit:
+                    break
+        return completions
+
+    def complete(self, prefix: str, limit: int = MAX_COMPLETIONS):
+        """ Returns the ids and names of up to limit items whose name starts with prefix, heaviest first. """
+        prefix = normalize(prefix)
+        if prefix == '' or limit <= 0:
+            return []
+        if self.__pending:
+            self.__merge()
+
+        limit = min(limit, MAX_COMPLETIONS)
+        completions = self.__best_completions.get(prefix)
+        if completions is None:
+            start = bisect_left(self.__keys, prefix)
+            # Every key starting with prefix sorts before prefix followed by the highest code point.
+            end = bisect_left(self.__keys, prefix + '\U0010ffff', start)
+            completions = self.__complete(start, end, MAX_COMPLETIONS)
+            if end - start > CACHE_THRESHOLD:
+                self.__best_completions[prefix] = completions
+        return [(item_id, name) for _, item_id, name in completions[:limit]]
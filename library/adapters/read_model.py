@@ -0,0 +1,36 @@
+from typing import NamedTuple, Optional, Tuple
+
+
+class PublisherRow(NamedTuple):
+    name: str
+
+
+class AuthorRow(NamedTuple):
+    """ An author as listed on a page, with the attributes of Author that the templates read. """
+    unique_id: int
+    full_name: str
+    average_rating: float = None
+    text_reviews_count: int = None
+    ratings_count: int = None
+
+
+class BookRow(NamedTuple):
+    """ A book as listed on a page, with the attributes of Book that the templates read.
+
+    Rows are built straight from query results, without the session tracking them, and cannot be changed. Pages that
+    write, such as the review form, get the mapped Book instead.
+    """
+    book_id: int
+    title: str
+    release_year: Optional[int]
+    description: Optional[str]
+    ebook: bool
+    num_pages: Optional[int]
+    image_url: Optional[str]
+    isbn: Optional[str]
+    link: Optional[str]
+    ratings_count: Optional[int]
+    average_rating: Optional[float]
+    text_reviews_count: Optional[int]
+    publisher: Optional[PublisherRow]
+    authors: Tuple[AuthorRow, ...]
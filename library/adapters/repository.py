@@ -1,5 +1,6 @@
 import abc
 
+from library.adapters.facet_index import FacetedQuery, FacetedPage
 from library.domain.model import User, Book, Author, Publisher, Review, ReadingList
 
 repo_instance = None
@@ -19,13 +20,22 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_user(self, user_name) -> User:
+    def get_user(self, user_name, case_insensitive: bool = False) -> User:
         """ Returns the User named user_name from the repository.
 
+        If case_insensitive is True, user names are compared ignoring case.
         If there is no User with the given user_name, this method returns None.
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def bulk_load(self, books, authors, users):
+        """ Adds all Books (with their Publishers and Authors), Authors and Users to the repository in one go.
+
+        This is meant for populating an empty repository, implementations may batch the work as they see fit.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def add_book(self, book: Book):
         """ Adds a Book to the repository. """
@@ -56,25 +66,81 @@ class AbstractRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_books_by_publisher(self, publisher_name: str):
+    def get_books_after(self, book_id: int, limit: int):
+        """ Returns up to limit Books whose book id follows book_id, ordered by book id.
+
+        If book_id is None, the Books are taken from the start of the catalogue.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_books_before(self, book_id: int, limit: int):
+        """ Returns up to limit Books whose book id immediately precedes book_id, ordered by book id. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_books_by_publisher(self, publisher_name: str, offset: int = 0, limit: int = None):
         """ Returns a list of Book, whose publisher name match the given publisher_name, from the repository.
 
+        The Books are ordered by book id. offset Books are skipped and at most limit Books are returned, all of them
+        when limit is None.
         If there are no matches, this method returns an empty list.
         """
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_books_by_release_year(self, release_year: int):
+    def get_books_by_release_year(self, release_year: int, offset: int = 0, limit: int = None):
         """ Returns a list of Book, whose release year match the given release_year, from the repository.
 
+        The Books are ordered by book id. offset Books are skipped and at most limit Books are returned, all of them
+        when limit is None.
         If there are no matches, this method returns an empty list.
         """
         raise NotImplementedError
 
     @abc.abstractmethod
-    def get_books_by_author_id(self, author_id: int):
+    def get_books_by_author_id(self, author_id: int, offset: int = 0, limit: int = None):
         """ Returns a list of Book, whose author id match the given author_id, from the repository.
 
+        The Books are ordered by book id. offset Books are skipped and at most limit Books are returned, all of them
+        when limit is None.
+        If there are no matches, this method returns an empty list.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def search_books(self, query: str, offset: int, limit: int):
+        """ Returns a list of Book matching any word of query, most relevant first.
+
+        Books are matched on their title, author names and description and ranked by BM25, boosted by their average
+        rating (see library.adapters.text_index). offset Books are skipped and at most limit Books are returned.
+        If there are no matches, this method returns an empty list.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_books_by_facets(self, query: FacetedQuery, offset: int, limit: int) -> FacetedPage:
+        """ Returns a FacetedPage of the Books matching query, in the order it asks for.
+
+        offset Books are skipped and at most limit Books are returned. The page also holds the number of matching
+        Books and, for the publisher, release year and ebook facets, how many of them have each value.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_title_suggestions(self, prefix: str, limit: int):
+        """ Returns (book id, title) pairs of up to limit Books whose title starts with prefix, most rated first.
+
+        Case and repeated spaces are ignored (see library.adapters.prefix_index).
+        If there are no matches, this method returns an empty list.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_author_suggestions(self, prefix: str, limit: int):
+        """ Returns (unique id, full name) pairs of up to limit Authors whose name starts with prefix, most rated
+        first.
+
         If there are no matches, this method returns an empty list.
         """
         raise NotImplementedError
@@ -105,6 +171,19 @@ class AbstractRepository(abc.ABC):
         """
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def get_authors_after(self, author_id: int, limit: int):
+        """ Returns up to limit Authors whose unique id follows author_id, ordered by unique id.
+
+        If author_id is None, the Authors are taken from the start.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_authors_before(self, author_id: int, limit: int):
+        """ Returns up to limit Authors whose unique id immediately precedes author_id, ordered by unique id. """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_number_of_authors(self) -> int:
         """ Returns the number of Authors in the repository. """
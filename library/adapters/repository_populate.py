@@ -1,12 +1,17 @@
 from pathlib import Path
 
-from library.adapters.csv_data_importer import load_books_and_authors, load_users
+from library.adapters.csv_data_importer import stream_books_and_authors, load_users
 from library.adapters.repository import AbstractRepository
 from library.domain.model import Publisher
 
 
-def populate(data_path: Path, repo: AbstractRepository):
-    books, authors = load_books_and_authors(data_path)
+def populate(data_path: Path, repo: AbstractRepository, bulk: bool = False):
+    books, authors = stream_books_and_authors(data_path)
+
+    if bulk:
+        # Hand everything to the repository at once, so it can batch the inserts.
+        repo.bulk_load(books, authors, load_users(data_path))
+        return
 
     # add books
     for book in books:
@@ -0,0 +1,162 @@
+"""A compiled, memory-mapped file holding the catalogue of a ColumnarRepository.
+
+The file holds every column and index of the repository as raw arrays, followed by a JSON header describing them.
+Opening a snapshot maps the file and hands the repository memoryviews of it, so nothing is parsed or copied: pages
+are read in as they are used, and forked worker processes share them.
+"""
+import json
+import mmap
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+
+from library.adapters.columnar_repository import ColumnarRepository
+
+MAGIC = b'LIBSNAP1'
+# Sections start at multiples of the largest item size, so that the memoryviews cast from them are aligned.
+ALIGNMENT = 8
+
+
+class SnapshotException(Exception):
+    pass
+
+
+class PackedStrings:
+    """ A read-only sequence of optional strings, stored back to back as UTF-8. """
+
+    def __init__(self, data: memoryview, offsets: memoryview, nulls: memoryview):
+        self.__data = data
+        self.__offsets = offsets
+        self.__nulls = nulls
+
+    def __len__(self):
+        return len(self.__nulls)
+
+    def __getitem__(self, index: int) -> str:
+        if self.__nulls[index]:
+            return None
+        return str(self.__data[self.__offsets[index]:self.__offsets[index + 1]], 'utf-8')
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+
+class Postings:
+    """ A read-only index from integer keys to rows, the rows of keys[i] are rows[offsets[i]:offsets[i + 1]]. """
+
+    def __init__(self, keys: memoryview, offsets: memoryview, rows: memoryview):
+        self.__keys = keys
+        self.__offsets = offsets
+        self.__rows = rows
+
+    def get(self, key):
+        position = bisect_left(self.__keys, key)
+        if position == len(self.__keys) or self.__keys[position] != key:
+            return None
+        return self.__rows[self.__offsets[position]:self.__offsets[position + 1]]
+
+    def items(self):
+        for position, key in enumerate(self.__keys):
+            yield key, self.__rows[self.__offsets[position]:self.__offsets[position + 1]]
+
+    def __len__(self):
+        return len(self.__keys)
+
+
+class _SnapshotWriter:
+    def __init__(self, file):
+        self.__file = file
+
+    def __align(self):
+        padding = -self.__file.tell() % ALIGNMENT
+        self.__file.write(bytes(padding))
+
+    def write_array(self, values) -> dict:
+        if isinstance(values, memoryview):
+            typecode = values.format
+        else:
+            typecode = values.typecode
+        self.__align()
+        offset = self.__file.tell()
+        self.__file.write(values)
+        return {'typecode': typecode, 'itemsize': array(typecode).itemsize, 'offset': offset, 'count': len(values)}
+
+    def write_strings(self, strings) -> dict:
+        offsets = array('q', [0])
+        nulls = array('b')
+        self.__align()
+        data_offset = self.__file.tell()
+        for string in strings:
+            if string is not None:
+                self.__file.write(string.encode('utf-8'))
+            offsets.append(self.__file.tell() - data_offset)
+            nulls.append(string is None)
+        data = {'typecode': 'B', 'itemsize': 1, 'offset': data_offset, 'count': offsets[-1]}
+        return {'kind': 'strings', 'data': data, 'offsets': self.write_array(offsets),
+                'nulls': self.write_array(nulls)}
+
+    def write_postings(self, postings) -> dict:
+        keys = array('q', sorted(key for key, _ in postings.items()))
+        offsets = array('q', [0])
+        rows = array('l')
+        for key in keys:
+            rows.extend(postings.get(key))
+            offsets.append(len(rows))
+        return {'kind': 'postings', 'keys': self.write_array(keys), 'offsets': self.write_array(offsets),
+                'rows': self.write_array(rows)}
+
+    def write_column(self, column) -> dict:
+        if isinstance(column, (array, memoryview)):
+            return dict(kind='array', **self.write_array(column))
+        if hasattr(column, 'items'):
+            return self.write_postings(column)
+        return self.write_strings(column)
+
+
+def write_snapshot(repo: ColumnarRepository, path):
+    """ Writes the catalogue and users of repo to a snapshot file at path. """
+    path = Path(path)
+    temporary_path = path.with_name(path.name + '.tmp')
+    with open(temporary_path, 'wb') as file:
+        file.write(MAGIC)
+        writer = _SnapshotWriter(file)
+        columns = {name: writer.write_column(column) for name, column in repo.columns().items()}
+        header = json.dumps({'byteorder': sys.byteorder, 'columns': columns}).encode('utf-8')
+        file.write(header)
+        file.write(len(header).to_bytes(8, 'little'))
+    # Workers opening the snapshot never see a partly written file.
+    temporary_path.replace(path)
+
+
+def _view(file_view: memoryview, section: dict) -> memoryview:
+    if array(section['typecode']).itemsize != section['itemsize']:
+        raise SnapshotException('Snapshot was written on a platform with different array item sizes')
+    start = section['offset']
+    return file_view[start:start + section['count'] * section['itemsize']].cast(section['typecode'])
+
+
+def open_snapshot(path) -> ColumnarRepository:
+    """ Returns a ColumnarRepository reading its catalogue from the snapshot file at path. """
+    with open(path, 'rb') as file:
+        # A private mapping: pages are shared until a process writes to them, as when a review count changes.
+        file_view = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY))
+
+    if bytes(file_view[:len(MAGIC)]) != MAGIC:
+        raise SnapshotException(f'{path} is not a catalogue snapshot')
+    header_length = int.from_bytes(file_view[-8:], 'little')
+    header = json.loads(bytes(file_view[-8 - header_length:-8]))
+    if header['byteorder'] != sys.byteorder:
+        raise SnapshotException('Snapshot was written on a platform with a different byte order')
+
+    columns = dict()
+    for name, section in header['columns'].items():
+        if section['kind'] == 'array':
+            columns[name] = _view(file_view, section)
+        elif section['kind'] == 'strings':
+            columns[name] = PackedStrings(_view(file_view, section['data']), _view(file_view, section['offsets']),
+                                          _view(file_view, section['nulls']))
+        else:
+            columns[name] = Postings(_view(file_view, section['keys']), _view(file_view, section['offsets']),
+                                     _view(file_view, section['rows']))
+    return ColumnarRepository(columns)
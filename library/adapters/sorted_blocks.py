@@ -0,0 +1,95 @@
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain
+
+# Blocks are split in two when they grow past twice this size.
+BLOCK_SIZE = 1000
+
+
+class SortedBlocks:
+    """ A sequence kept sorted by key, stored as a list of sorted blocks.
+
+    Adding an item finds its block by bisecting the last keys of the blocks and inserts it there, which moves at most
+    a block's worth of items rather than everything after it, as inserting into one sorted list does. Positions are
+    found through the running lengths of the blocks, recomputed after items are added. The keys of each block are kept
+    alongside it, so that bisecting a block compares keys without calling key on its items.
+    """
+
+    def __init__(self, items=(), key=None):
+        self.__key = key if key is not None else (lambda item: item)
+        items = sorted(items, key=self.__key)
+        keys = [self.__key(item) for item in items]
+        self.__blocks = [items[start:start + BLOCK_SIZE] for start in range(0, len(items), BLOCK_SIZE)]
+        self.__keys = [keys[start:start + BLOCK_SIZE] for start in range(0, len(keys), BLOCK_SIZE)]
+        self.__maxes = [block_keys[-1] for block_keys in self.__keys]
+        self.__length = len(items)
+        self.__offsets = None
+
+    def __len__(self):
+        return self.__length
+
+    def __iter__(self):
+        return chain.from_iterable(self.__blocks)
+
+    def add(self, item):
+        """ Inserts item after any items with the same key. """
+        key = self.__key(item)
+        if not self.__blocks:
+            self.__blocks.append([item])
+            self.__keys.append([key])
+            self.__maxes.append(key)
+        else:
+            index = min(bisect_right(self.__maxes, key), len(self.__blocks) - 1)
+            block = self.__blocks[index]
+            block_keys = self.__keys[index]
+            position = bisect_right(block_keys, key)
+            block.insert(position, item)
+            block_keys.insert(position, key)
+            self.__maxes[index] = block_keys[-1]
+            if len(block) > 2 * BLOCK_SIZE:
+                self.__blocks[index:index + 1] = [block[:BLOCK_SIZE], block[BLOCK_SIZE:]]
+                self.__keys[index:index + 1] = [block_keys[:BLOCK_SIZE], block_keys[BLOCK_SIZE:]]
+                self.__maxes.insert(index, block_keys[BLOCK_SIZE - 1])
+        self.__length += 1
+        self.__offsets = None
+
+    def __block_offsets(self):
+        if self.__offsets is None:
+            self.__offsets = [0, *accumulate(len(block) for block in self.__blocks)]
+        return self.__offsets
+
+    def __getitem__(self, index):
+        offsets = self.__block_offsets()
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.__length)
+            if step != 1:
+                return list(self)[index]
+            items = []
+            block_index = bisect_right(offsets, start) - 1
+            while start < stop:
+                block = self.__blocks[block_index]
+                block_start = offsets[block_index]
+                items.extend(block[start - block_start:stop - block_start])
+                start = offsets[block_index + 1]
+                block_index += 1
+            return items
+
+        if index < 0:
+            index += self.__length
+        if not 0 <= index < self.__length:
+            raise IndexError('SortedBlocks index out of range')
+        block_index = bisect_right(offsets, index) - 1
+        return self.__blocks[block_index][index - offsets[block_index]]
+
+    def bisect_left(self, key) -> int:
+        """ Returns the position of the first item whose key is not less than key. """
+        index = bisect_left(self.__maxes, key)
+        if index == len(self.__blocks):
+            return self.__length
+        return self.__block_offsets()[index] + bisect_left(self.__keys[index], key)
+
+    def bisect_right(self, key) -> int:
+        """ Returns the position of the first item whose key is greater than key. """
+        index = bisect_right(self.__maxes, key)
+        if index == len(self.__blocks):
+            return self.__length
+        return self.__block_offsets()[index] + bisect_right(self.__keys[index], key)
@@ -0,0 +1,105 @@
+import heapq
+import math
+import re
+from array import array
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# BM25 parameters.
+K1 = 1.2
+B = 0.75
+# A word in the title counts for more than one in the author names, and that for more than one in the description.
+FIELD_WEIGHTS = {'title': 3.0, 'authors': 2.0, 'description': 1.0}
+# The relevance of a book is scaled by 1 + RATING_BOOST * average_rating, so better rated books come first among
+# similarly relevant ones.
+RATING_BOOST = 0.1
+
+
+def tokenize(text: str):
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def make_match_query(query: str) -> str:
+    """ Returns an SQLite FTS5 query matching any of the words of query, or '' when there are none. """
+    return ' OR '.join(f'"{token}"' for token in dict.fromkeys(tokenize(query)))
+
+
+class TextIndex:
+    """ An inverted index over the titles, author names and descriptions of books, ranked by BM25.
+
+    Documents are numbered in the order they are added. Each word maps to the numbers of the documents holding it and
+    its field-weighted frequency in each of them.
+    """
+
+    def __init__(self):
+        self.__book_ids = array('q')
+        self.__lengths = array('d')
+        self.__ratings = array('d')
+        self.__total_length = 0.0
+        self.__postings = dict()
+        # BM25 weights of the postings, which depend on the average document length, and the documents of a word
+        # ranked by them. Computed when a word is first searched for, and dropped whenever a document is added.
+        self.__impacts = dict()
+        self.__rankings = dict()
+
+    def add(self, book_id: int, title: str, author_names, description: str, average_rating: float):
+        frequencies = dict()
+        length = 0.0
+        for field, text in (('title', title), ('authors', ' '.join(author_names)), ('description', description)):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokenize(text):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+                length += weight
+
+        document = len(self.__book_ids)
+        self.__book_ids.append(book_id)
+        self.__lengths.append(length)
+        self.__ratings.append(average_rating or 0.0)
+        self.__total_length += length
+        for token, frequency in frequencies.items():
+            postings = self.__postings.get(token)
+            if postings is None:
+                postings = self.__postings[token] = (array('l'), array('d'))
+            postings[0].append(document)
+            postings[1].append(frequency)
+        self.__impacts.clear()
+        self.__rankings.clear()
+
+    def __len__(self):
+        return len(self.__book_ids)
+
+    def __impacts_of(self, token: str):
+        impacts = self.__impacts.get(token)
+        if impacts is None:
+            documents, frequencies = self.__postings[token]
+            number_of_documents = len(self.__book_ids)
+            average_length = self.__total_length / number_of_documents
+            idf = math.log(1 + (number_of_documents - len(documents) + 0.5) / (len(documents) + 0.5))
+            lengths = self.__lengths
+            impacts = array('d', (idf * frequency * (K1 + 1) /
+                                  (frequency + K1 * (1 - B + B * lengths[document] / average_length))
+                                  for document, frequency in zip(documents, frequencies)))
+            self.__impacts[token] = impacts
+        return impacts
+
+    def __rank(self, scores, limit: int):
+        ratings = self.__ratings
+        return heapq.nlargest(limit, scores,
+                              key=lambda document: scores[document] * (1 + RATING_BOOST * ratings[document]))
+
+    def search(self, query: str, offset: int, limit: int):
+        """ Returns the ids of the books matching any word of query, most relevant first. """
+        tokens = [token for token in dict.fromkeys(tokenize(query)) if token in self.__postings]
+        if len(tokens) == 1:
+            # Most searches are for a single word, whose ranking is kept so that common words are not scored again.
+            ranked = self.__rankings.get(tokens[0])
+            if ranked is None:
+                scores = dict(zip(self.__postings[tokens[0]][0], self.__impacts_of(tokens[0])))
+                ranked = self.__rankings[tokens[0]] = array('l', self.__rank(scores, len(scores)))
+            return [self.__book_ids[document] for document in ranked[offset:offset + limit]]
+
+        scores = dict()
+        for token in tokens:
+            for document, impact in zip(self.__postings[token][0], self.__impacts_of(token)):
+                scores[document] = scores.get(document, 0.0) + impact
+        return [self.__book_ids[document] for document in self.__rank(scores, offset + limit)[offset:]]
@@ -1,6 +1,6 @@
 from functools import wraps
 
-from flask import Blueprint, render_template, redirect, url_for, session
+from flask import Blueprint, render_template, redirect, url_for, session, jsonify, current_app, abort
 from flask_wtf import FlaskForm
 from password_validator import PasswordValidator
 from wtforms import StringField, PasswordField, SubmitField
@@ -8,7 +8,7 @@ from wtforms.validators import DataRequired, Length, ValidationError
 
 import library.adapters.repository as repo
 # Configure Blueprint.
-from library.authentication import services
+from library.authentication import services, hashing
 
 authentication_blueprint = Blueprint(
     'authentication_bp', __name__, url_prefix='/authentication')
@@ -80,6 +80,22 @@ def login():
     )
 
 
+@authentication_blueprint.errorhandler(hashing.HashingBusyException)
+def hashing_busy(exception):
+    # Shed the load rather than queueing logins without bound, clients can retry shortly.
+    return 'Too many sign-ins at the moment - please try again in a few seconds', 503, {'Retry-After': '1'}
+
+
+@authentication_blueprint.route('/hashing_metrics')
+def hashing_metrics():
+    # Only exposed where HASHING_METRICS is set, as the endpoint reveals the server's load to anyone.
+    if not current_app.config['HASHING_METRICS']:
+        abort(404)
+    if hashing.executor_instance is None:
+        return jsonify({})
+    return jsonify(hashing.executor_instance.metrics())
+
+
 @authentication_blueprint.route('/logout')
 def logout():
     session.clear()
@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug import security
+
+executor_instance = None
+
+
+class HashingBusyException(Exception):
+    pass
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+class HashingExecutor:
+    """ Runs password hashing and checking on a pool of workers, away from the request threads.
+
+    At most max_pending hashes can be waiting for or running on the workers. Beyond that, a request gives up after
+    waiting queue_timeout seconds for a place and HashingBusyException is raised, which the views turn into a 503.
+    """
+
+    kinds = ('process', 'thread')
+
+    def __init__(self, kind: str = 'process', workers: int = None, max_pending: int = 32, queue_timeout: float = 0):
+        if kind not in self.kinds:
+            raise ValueError(f'Unknown hashing executor kind {kind!r}')
+        pool_class = ProcessPoolExecutor if kind == 'process' else ThreadPoolExecutor
+        self.__executor = pool_class(max_workers=workers)
+        self.__places = threading.BoundedSemaphore(max_pending)
+        self.__queue_timeout = queue_timeout
+        self.__lock = threading.Lock()
+        self.__queue_depth = 0
+        self.__max_queue_depth = 0
+        self.__rejected = 0
+        self.__completed = 0
+        self.__total_hash_time = 0.0
+        self.__max_hash_time = 0.0
+        self.__total_wait_time = 0.0
+
+    def __run(self, function, *args):
+        start = time.perf_counter()
+        if not self.__places.acquire(timeout=self.__queue_timeout):
+            with self.__lock:
+                self.__rejected += 1
+            raise HashingBusyException
+        try:
+            with self.__lock:
+                self.__queue_depth += 1
+                self.__max_queue_depth = max(self.__max_queue_depth, self.__queue_depth)
+            result, hash_time = self.__executor.submit(_timed, function, *args).result()
+        finally:
+            with self.__lock:
+                self.__queue_depth -= 1
+            self.__places.release()
+
+        with self.__lock:
+            self.__completed += 1
+            self.__total_hash_time += hash_time
+            self.__max_hash_time = max(self.__max_hash_time, hash_time)
+            self.__total_wait_time += time.perf_counter() - start
+        return result
+
+    def generate_password_hash(self, password: str) -> str:
+        return self.__run(security.generate_password_hash, password)
+
+    def check_password_hash(self, password_hash: str, password: str) -> bool:
+        return self.__run(security.check_password_hash, password_hash, password)
+
+    def metrics(self) -> dict:
+        with self.__lock:
+            completed = max(self.__completed, 1)
+            return {
+                'queue_depth': self.__queue_depth,
+                'max_queue_depth': self.__max_queue_depth,
+                'completed': self.__completed,
+                'rejected': self.__rejected,
+                'mean_hash_time': self.__total_hash_time / completed,
+                'max_hash_time': self.__max_hash_time,
+                'mean_wait_time': self.__total_wait_time / completed,
+            }
+
+    def shutdown(self):
+        self.__executor.shutdown(wait=False)
+
+
+def generate_password_hash(password: str) -> str:
+    if executor_instance is None:
+        return security.generate_password_hash(password)
+    return executor_instance.generate_password_hash(password)
+
+
+def check_password_hash(password_hash: str, password: str) -> bool:
+    if executor_instance is None:
+        return security.check_password_hash(password_hash, password)
+    return executor_instance.check_password_hash(password_hash, password)
@@ -1,6 +1,5 @@
-from werkzeug.security import generate_password_hash, check_password_hash
-
 from library.adapters.repository import AbstractRepository
+from library.authentication.hashing import generate_password_hash, check_password_hash
 from library.domain.model import User
 
 
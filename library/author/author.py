@@ -11,23 +11,19 @@ author_blueprint = Blueprint(
 
 @author_blueprint.route('/authors', methods=['GET'])
 def author_list():
-    cursor = request.args.get('cursor')
     next_authors_url = None
     prev_authors_url = None
 
-    if cursor is None:
-        cursor = 0
-    else:
-        cursor = int(cursor)
-
-    if cursor > 0:
-        prev_authors_url = url_for('author_bp.author_list', cursor=cursor - 1)
-    if (cursor + 1) * services.default_page_size < services.get_number_of_authors(repo.repo_instance):
-        next_authors_url = url_for('author_bp.author_list', cursor=cursor + 1)
+    selected_authors, prev_cursor, next_cursor = services.get_authors_page(repo.repo_instance,
+                                                                           request.args.get('cursor'))
+    if prev_cursor is not None:
+        prev_authors_url = url_for('author_bp.author_list', cursor=prev_cursor)
+    if next_cursor is not None:
+        next_authors_url = url_for('author_bp.author_list', cursor=next_cursor)
 
     return render_template(
         'author/author.html',
-        selected_authors=services.get_authors(repo.repo_instance, cursor),
+        selected_authors=selected_authors,
         prev_authors_url=prev_authors_url,
         next_authors_url=next_authors_url
     )
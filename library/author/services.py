@@ -1,4 +1,5 @@
 from library.adapters.repository import AbstractRepository
+from library.utilities.services import get_keyset_page
 
 default_page_size = 30
 
@@ -7,5 +8,10 @@ def get_authors(repo: AbstractRepository, offset: int = 0):
     return repo.get_authors(offset, default_page_size)
 
 
+def get_authors_page(repo: AbstractRepository, cursor: str = None):
+    return get_keyset_page(repo.get_authors_after, repo.get_authors_before, lambda author: author.unique_id, cursor,
+                           default_page_size)
+
+
 def get_number_of_authors(repo: AbstractRepository):
     return repo.get_number_of_authors()
@@ -1,11 +1,14 @@
+import math
+
 from better_profanity import profanity
-from flask import Blueprint, render_template, request, url_for, session, redirect
+from flask import Blueprint, render_template, request, url_for, session, redirect, jsonify
 from flask_wtf import FlaskForm
 from wtforms import TextAreaField, HiddenField, SubmitField, RadioField
 from wtforms.validators import DataRequired, Length, ValidationError
 
 import library.adapters.repository as repo
 import library.book.services as services
+from library.adapters.facet_index import FacetedQuery
 from library.authentication.authentication import login_required
 from library.domain.model import ShelfName
 from library.utilities import utilities
@@ -19,6 +22,8 @@ def book_list():
     selected_books = []
     next_authors_url = None
     prev_authors_url = None
+    facet_links = None
+    total = None
     # Read query parameters.
     search_type = request.args.get('search_type')
     if search_type == 'book':
@@ -47,30 +52,65 @@ def book_list():
     elif search_type == 'author':
         author_id = request.args.get('author_id')
         if author_id:
-            selected_books = services.get_books_by_author_id(repo.repo_instance, int(author_id))
-            recommended_books = utilities.get_selected_books(8)
+            cursor = page_number_cursor()
+            selected_books, has_next = services.get_page_of_books_by_author_id(repo.repo_instance, int(author_id),
+                                                                               cursor)
+            if cursor > 0:
+                prev_authors_url = url_for('book_bp.book_list', author_id=author_id, search_type='author',
+                                           cursor=cursor - 1)
+            if has_next:
+                next_authors_url = url_for('book_bp.book_list', author_id=author_id, search_type='author',
+                                           cursor=cursor + 1)
+    elif search_type == 'text':
+        query = request.args.get('query')
+        if query:
+            cursor = page_number_cursor()
+            selected_books, has_next = services.search_books(repo.repo_instance, query, cursor)
+            if cursor > 0:
+                prev_authors_url = url_for('book_bp.book_list', query=query, search_type='text', cursor=cursor - 1)
+            if has_next:
+                next_authors_url = url_for('book_bp.book_list', query=query, search_type='text', cursor=cursor + 1)
+    elif search_type == 'facets':
+        cursor = page_number_cursor()
+        page, has_next = services.get_faceted_page(repo.repo_instance, make_faceted_query(request.args), cursor)
+        selected_books = page.books
+        facet_links = make_facet_links(page.facet_counts)
+        total = page.total
+        if cursor > 0:
+            prev_authors_url = facets_url(cursor=cursor - 1)
+        if has_next:
+            next_authors_url = facets_url(cursor=cursor + 1)
     elif search_type == 'publisher':
         publisher_name = request.args.get('publisher_name')
         if publisher_name:
-            selected_books = services.get_books_by_publisher(repo.repo_instance, publisher_name)
-            recommended_books = utilities.get_selected_books(8)
+            cursor = page_number_cursor()
+            selected_books, has_next = services.get_page_of_books_by_publisher(repo.repo_instance, publisher_name,
+                                                                               cursor)
+            if cursor > 0:
+                prev_authors_url = url_for('book_bp.book_list', publisher_name=publisher_name,
+                                           search_type='publisher', cursor=cursor - 1)
+            if has_next:
+                next_authors_url = url_for('book_bp.book_list', publisher_name=publisher_name,
+                                           search_type='publisher', cursor=cursor + 1)
     elif search_type == 'release_year':
         release_year = request.args.get('release_year')
         if release_year:
-            selected_books = services.get_books_by_release_year(repo.repo_instance, int(release_year))
-            recommended_books = utilities.get_selected_books(8)
+            cursor = page_number_cursor()
+            selected_books, has_next = services.get_page_of_books_by_release_year(repo.repo_instance,
+                                                                                  int(release_year), cursor)
+            if cursor > 0:
+                prev_authors_url = url_for('book_bp.book_list', release_year=release_year,
+                                           search_type='release_year', cursor=cursor - 1)
+            if has_next:
+                next_authors_url = url_for('book_bp.book_list', release_year=release_year,
+                                           search_type='release_year', cursor=cursor + 1)
     else:
-        cursor = request.args.get('cursor')
-        if cursor is None:
-            cursor = 0
-        else:
-            cursor = int(cursor)
-
-        if cursor > 0:
-            prev_authors_url = url_for('book_bp.book_list', cursor=cursor - 1)
-        if (cursor + 1) * services.default_page_size < services.get_number_of_books(repo.repo_instance):
-            next_authors_url = url_for('book_bp.book_list', cursor=cursor + 1)
-        selected_books = services.get_books(repo.repo_instance, cursor)
+        selected_books, prev_cursor, next_cursor = services.get_books_page(repo.repo_instance,
+                                                                           request.args.get('cursor'))
+        if prev_cursor is not None:
+            prev_authors_url = url_for('book_bp.book_list', cursor=prev_cursor)
+        if next_cursor is not None:
+            next_authors_url = url_for('book_bp.book_list', cursor=next_cursor)
 
     if selected_books is None or selected_books == []:
         return render_template(
@@ -83,10 +123,66 @@ def book_list():
             selected_books=selected_books,
             prev_authors_url=prev_authors_url,
             next_authors_url=next_authors_url,
+            facet_links=facet_links,
+            total=total,
             display_review_input=0
         )
 
 
+def make_faceted_query(args):
+    ebook = args.get('ebook')
+    operator = args.get('match', 'and')
+    sort_by = args.get('sort', 'book_id')
+    min_rating = args.get('min_rating', type=float)
+    if min_rating is not None and not math.isfinite(min_rating):
+        # float() accepts 'nan' and 'inf', which are no rating.
+        min_rating = None
+    return FacetedQuery(
+        publisher_names=args.getlist('publisher'),
+        author_ids=args.getlist('author_id', type=int),
+        release_year_min=args.get('year_from', type=int),
+        release_year_max=args.get('year_to', type=int),
+        ebook=None if ebook not in ('true', 'false') else ebook == 'true',
+        num_pages_min=args.get('pages_from', type=int),
+        num_pages_max=args.get('pages_to', type=int),
+        min_rating=min_rating,
+        operator=operator if operator in FacetedQuery.operators else 'and',
+        sort_by=sort_by if sort_by in FacetedQuery.sort_keys else 'book_id',
+        descending=args.get('order') == 'desc'
+    )
+
+
+def page_number_cursor() -> int:
+    # A page number, starting from the first page when the cursor is missing, malformed or negative.
+    return max(request.args.get('cursor', 0, type=int), 0)
+
+
+def facets_url(**changes):
+    # The current faceted query with some of its arguments changed, starting from the first page unless a cursor is
+    # given.
+    args = request.args.to_dict(flat=False)
+    args.pop('cursor', None)
+    args.update(changes)
+    return url_for('book_bp.book_list', **args)
+
+
+def make_facet_links(facet_counts):
+    return {
+        'Publisher': [(name, count, facets_url(publisher=name)) for name, count in facet_counts['publisher']],
+        'Year': [(year, count, facets_url(year_from=year, year_to=year))
+                 for year, count in facet_counts['release_year']],
+        'Ebook': [('Yes' if ebook else 'No', count, facets_url(ebook='true' if ebook else 'false'))
+                  for ebook, count in facet_counts['ebook']],
+    }
+
+
+@book_blueprint.route('/api/suggest', methods=['GET'])
+def suggest():
+    prefix = request.args.get('q', '')
+    limit = request.args.get('limit', services.MAX_COMPLETIONS, type=int)
+    return jsonify(services.get_suggestions(repo.repo_instance, prefix, limit))
+
+
 @book_blueprint.route('/my_books', methods=['GET', 'POST'])
 @login_required
 def my_books():
@@ -1,8 +1,11 @@
 from datetime import datetime
 
 from config import Config
+from library.adapters.facet_index import FacetedQuery
+from library.adapters.prefix_index import MAX_COMPLETIONS
 from library.adapters.repository import AbstractRepository
 from library.domain.model import User, Book, Review, ShelfName, ReadingList
+from library.utilities.services import get_keyset_page
 
 default_page_size = int(Config.BOOKS_PER_PAGE)
 
@@ -23,6 +26,11 @@ def get_books(repo: AbstractRepository, offset: int = 0):
     return repo.get_books(offset, default_page_size)
 
 
+def get_books_page(repo: AbstractRepository, cursor: str = None):
+    return get_keyset_page(repo.get_books_after, repo.get_books_before, lambda book: book.book_id, cursor,
+                           default_page_size)
+
+
 def get_books_by_publisher(repo: AbstractRepository, publisher_name: str):
     return repo.get_books_by_publisher(publisher_name)
 
@@ -35,6 +43,42 @@ def get_books_by_author_id(repo: AbstractRepository, author_id: int):
     return repo.get_books_by_author_id(author_id)
 
 
+def _get_page(get_books, cursor: int):
+    # Ask for one book more than a page holds, to find out whether there is a next page.
+    books = get_books(cursor * default_page_size, default_page_size + 1)
+    return books[:default_page_size], len(books) > default_page_size
+
+
+def get_page_of_books_by_author_id(repo: AbstractRepository, author_id: int, cursor: int = 0):
+    return _get_page(lambda offset, limit: repo.get_books_by_author_id(author_id, offset, limit), cursor)
+
+
+def get_page_of_books_by_publisher(repo: AbstractRepository, publisher_name: str, cursor: int = 0):
+    return _get_page(lambda offset, limit: repo.get_books_by_publisher(publisher_name, offset, limit), cursor)
+
+
+def get_page_of_books_by_release_year(repo: AbstractRepository, release_year: int, cursor: int = 0):
+    return _get_page(lambda offset, limit: repo.get_books_by_release_year(release_year, offset, limit), cursor)
+
+
+def search_books(repo: AbstractRepository, query: str, cursor: int = 0):
+    return _get_page(lambda offset, limit: repo.search_books(query, offset, limit), cursor)
+
+
+def get_faceted_page(repo: AbstractRepository, query: FacetedQuery, cursor: int = 0):
+    page = repo.get_books_by_facets(query, cursor * default_page_size, default_page_size)
+    return page, (cursor + 1) * default_page_size < page.total
+
+
+def get_suggestions(repo: AbstractRepository, prefix: str, limit: int = MAX_COMPLETIONS):
+    return {
+        'books': [{'book_id': book_id, 'title': title}
+                  for book_id, title in repo.get_title_suggestions(prefix, limit)],
+        'authors': [{'author_id': author_id, 'full_name': full_name}
+                    for author_id, full_name in repo.get_author_suggestions(prefix, limit)],
+    }
+
+
 def get_number_of_books(repo: AbstractRepository):
     return repo.get_number_of_books()
 
@@ -3,11 +3,16 @@ from datetime import datetime
 from typing import List, Iterable
 
 
+# The domain classes declare __slots__ to keep the memory repository compact. '__dict__' and '__weakref__' stay
+# available (and are only allocated when used) because the SQLAlchemy classical mapper replaces the slot descriptors
+# of mapped attributes and keeps their values in the instance dictionary. Containers that most instances never fill,
+# such as reviews and reading lists, are only allocated when the first item is added.
 class Publisher:
+    __slots__ = ('__name', '__books', '__dict__', '__weakref__')
+
     def __init__(self, publisher_name: str):
         # This makes sure the setter is called here in the initializer/constructor as well.
         self.name = publisher_name
-        self.__books: List[Book] = list()
 
     @property
     def name(self) -> str:
@@ -24,10 +29,16 @@ class Publisher:
 
     @property
     def books(self) -> Iterable['Book']:
-        return iter(self.__books)
+        try:
+            return iter(self.__books)
+        except AttributeError:
+            return iter(())
 
     def add_book(self, book: 'Book'):
-        self.__books.append(book)
+        try:
+            self.__books.append(book)
+        except AttributeError:
+            self.__books = [book]
 
     def __repr__(self):
         return f'<Publisher {self.name}>'
@@ -45,6 +56,8 @@ class Publisher:
 
 
 class Author:
+    __slots__ = ('__unique_id', '__full_name', '__average_rating', '__text_reviews_count', '__ratings_count',
+                 '__books', '__dict__', '__weakref__')
 
     def __init__(self, author_id: int, author_full_name: str):
         if not isinstance(author_id, int):
@@ -60,7 +73,6 @@ class Author:
         self.__average_rating = 0.0
         self.__text_reviews_count = 0
         self.__ratings_count = 0
-        self.__books: List[Book] = list()
 
     @property
     def unique_id(self) -> int:
@@ -117,10 +129,16 @@ class Author:
 
     @property
     def books(self) -> Iterable['Article']:
-        return iter(self.__books)
+        try:
+            return iter(self.__books)
+        except AttributeError:
+            return iter(())
 
     def add_book(self, book: 'Book'):
-        self.__books.append(book)
+        try:
+            self.__books.append(book)
+        except AttributeError:
+            self.__books = [book]
 
     def __repr__(self):
         return f'<Author {self.full_name}, author id = {self.unique_id}>'
@@ -138,6 +156,9 @@ class Author:
 
 
 class Book:
+    __slots__ = ('__book_id', '__title', '__description', '__publisher', '__authors', '__release_year', '__ebook',
+                 '__num_pages', '__image_url', '__isbn', '__link', '__ratings_count', '__average_rating',
+                 '__text_reviews_count', '__reviews', '__reading_lists', '__dict__', '__weakref__')
 
     def __init__(self, book_id: int, book_title: str):
         if not isinstance(book_id, int):
@@ -164,8 +185,6 @@ class Book:
         self.__ratings_count = None
         self.__average_rating = None
         self.__text_reviews_count = None
-        self.__reviews: List[Review] = list()
-        self.__reading_lists: List[ReadingList] = list()
 
     @property
     def book_id(self) -> int:
@@ -311,17 +330,29 @@ class Book:
 
     @property
     def reviews(self) -> Iterable['Review']:
-        return iter(self.__reviews)
+        try:
+            return iter(self.__reviews)
+        except AttributeError:
+            return iter(())
 
     def add_review(self, review: 'Review'):
-        self.__reviews.append(review)
+        try:
+            self.__reviews.append(review)
+        except AttributeError:
+            self.__reviews = [review]
 
     @property
     def reading_lists(self) -> dict:
-        return self.__reading_lists
+        try:
+            return self.__reading_lists
+        except AttributeError:
+            return ()
 
     def add_reading_list(self, reading_list: 'ReadingList'):
-        self.__reading_lists.append(reading_list)
+        try:
+            self.__reading_lists.append(reading_list)
+        except AttributeError:
+            self.__reading_lists = [reading_list]
 
     def __repr__(self):
         return f'<Book {self.title}, book id = {self.book_id}>'
@@ -351,6 +382,8 @@ class ShelfName(enum.Enum):
 
 
 class User:
+    __slots__ = ('__user_name', '__password', '__reading_lists', '__reviews', '__dict__', '__weakref__')
+
     def __init__(self, user_name: str, password: str):
         if user_name == "" or not isinstance(user_name, str):
             self.__user_name = None
@@ -362,10 +395,6 @@ class User:
         else:
             self.__password = password
 
-        self.__reading_lists: List[ReadingList] = list()
-
-        self.__reviews: List[Review] = list()
-
     @property
     def user_name(self) -> str:
         return self.__user_name
@@ -376,17 +405,29 @@ class User:
 
     @property
     def reading_lists(self) -> dict:
-        return self.__reading_lists
+        try:
+            return self.__reading_lists
+        except AttributeError:
+            return ()
 
     def add_reading_list(self, reading_list: 'ReadingList'):
-        self.__reading_lists.append(reading_list)
+        try:
+            self.__reading_lists.append(reading_list)
+        except AttributeError:
+            self.__reading_lists = [reading_list]
 
     @property
     def reviews(self) -> Iterable['Review']:
-        return iter(self.__reviews)
+        try:
+            return iter(self.__reviews)
+        except AttributeError:
+            return iter(())
 
     def add_review(self, review: 'Review'):
-        self.__reviews.append(review)
+        try:
+            self.__reviews.append(review)
+        except AttributeError:
+            self.__reviews = [review]
 
     def __repr__(self) -> str:
         return f'<User {self.__user_name}>'
@@ -404,6 +445,8 @@ class User:
 
 
 class Review:
+    __slots__ = ('__user', '__book', '__review', '__review_text', '__timestamp', '__dict__', '__weakref__')
+
     def __init__(self, user: User, book: Book, review: str):
         if isinstance(user, User):
             self.__user = user
@@ -446,6 +489,8 @@ class Review:
 
 
 class ReadingList:
+    __slots__ = ('__user', '__book', '__shelf', '__dict__', '__weakref__')
+
     def __init__(self, user: User, book: Book, shelf: ShelfName):
         if isinstance(user, User):
             self.__user = user
@@ -0,0 +1,52 @@
+import gc
+import os
+import threading
+
+# Run once in each process serving requests from the catalogue, see finish().
+worker_start = None
+_worker_start_lock = threading.Lock()
+
+
+def begin():
+    """ Stops the cyclic garbage collector while the catalogue is built. """
+    gc.disable()
+
+
+def end():
+    """ Restarts the collector stopped by begin(), also when building the catalogue failed. """
+    gc.enable()
+
+
+def finish(start_worker=None):
+    """ Freezes the objects built since begin() and arranges for start_worker to run in the processes serving requests.
+
+    Worker processes forked by a preloading server share the catalogue's memory pages until they write to them. The
+    collector writes to every object it tracks on each full collection, which would copy all of those pages into
+    every worker. Frozen objects are left out of collections, so only the objects a worker actually uses are copied.
+    Threads and process pools do not survive a fork, so they are started by start_worker in the workers instead, or
+    by start_worker_once() in this process if it serves requests itself.
+    """
+    global worker_start
+    gc.freeze()
+    end()
+    worker_start = start_worker
+
+
+def start_worker_once():
+    """ Runs the start_worker given to finish(), unless it already ran in this process or in the one it was forked from.
+    """
+    global worker_start
+    with _worker_start_lock:
+        start, worker_start = worker_start, None
+    if start is not None:
+        start()
+
+
+def _after_fork_in_child():
+    global _worker_start_lock
+    # The lock may have been held by another thread of the parent when it forked.
+    _worker_start_lock = threading.Lock()
+    start_worker_once()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
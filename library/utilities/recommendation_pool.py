@@ -0,0 +1,82 @@
+import logging
+import threading
+
+import library.utilities.services as services
+from library.adapters.database_repository import SqlAlchemyRepository
+from library.adapters.repository import AbstractRepository
+
+pool_instance = None
+
+
+class RecommendationPool:
+    """ A rotating set of pre-sampled random book lists, so that pages can show recommendations without querying.
+
+    The samples are fully hydrated (authors and publisher loaded) and are replaced as a whole by refresh(), either
+    on demand or every refresh_interval seconds from a background thread.
+    """
+
+    def __init__(self, repo: AbstractRepository, sample_size: int = 12, pool_size: int = 8,
+                 refresh_interval: float = 0):
+        self.__repo = repo
+        self.__sample_size = sample_size
+        self.__pool_size = pool_size
+        self.__refresh_interval = refresh_interval
+        self.__samples = []
+        self.__next_sample = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__lock = threading.Lock()
+        self.__stop_event = threading.Event()
+        self.__thread = None
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    def take(self, quantity: int):
+        samples = self.__samples
+        if len(samples) == 0 or quantity > self.__sample_size:
+            with self.__lock:
+                self.__misses += 1
+            return services.get_random_books(quantity, self.__repo)
+
+        with self.__lock:
+            sample = samples[self.__next_sample % len(samples)]
+            self.__next_sample += 1
+            self.__hits += 1
+        return sample[:quantity]
+
+    def refresh(self):
+        samples = [self.__hydrate(services.get_random_books(self.__sample_size, self.__repo))
+                   for _ in range(self.__pool_size)]
+        if isinstance(self.__repo, SqlAlchemyRepository):
+            # Detach the sampled books from this thread's session, they are shared by all request threads.
+            self.__repo.close_session()
+        self.__samples = samples
+
+    def start(self):
+        if self.__refresh_interval > 0 and self.__thread is None:
+            self.__thread = threading.Thread(target=self.__refresh_periodically, name='recommendation-pool',
+                                             daemon=True)
+            self.__thread.start()
+
+    def stop(self):
+        self.__stop_event.set()
+
+    def __refresh_periodically(self):
+        while not self.__stop_event.wait(self.__refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the previous samples and try again on the next tick.
+                logging.getLogger(__name__).exception('Refreshing the recommendation pool failed')
+
+    def __hydrate(self, books):
+        # Mapped books are shared by all request threads once detached, so nothing may be left to load lazily.
+        if isinstance(self.__repo, SqlAlchemyRepository):
+            self.__repo.load_relationships(books)
+        return books
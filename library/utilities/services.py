@@ -1,3 +1,5 @@
+import base64
+import binascii
 import random
 
 from library.adapters.repository import AbstractRepository
@@ -16,3 +18,44 @@ def get_random_books(quantity, repo: AbstractRepository):
 
     return books
 
+
+def encode_cursor(direction: str, key: int) -> str:
+    # Cursors are opaque to the browser, they only carry the direction and the id the page starts after/ends before.
+    return base64.urlsafe_b64encode(f'{direction}:{key}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """ Returns the (direction, key) pair of a cursor, or ('after', None) for a missing or malformed cursor. """
+    if cursor:
+        try:
+            direction, key = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split(':')
+            if direction in ('after', 'before'):
+                return direction, int(key)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            pass  # Ignore malformed cursors and start from the first page.
+    return 'after', None
+
+
+def get_keyset_page(get_after, get_before, get_key, cursor: str, page_size: int):
+    """ Returns a page of items together with the cursors of the previous and next pages (None at either end).
+
+    get_after and get_before are the repository methods returning the items following/preceding a key, get_key
+    extracts that key from an item. One extra item is fetched to find out whether the page has a neighbour.
+    """
+    direction, key = decode_cursor(cursor)
+    if direction == 'before':
+        items = get_before(key, page_size + 1)
+        has_prev = len(items) > page_size
+        items = items[-page_size:] if page_size > 0 else []
+        has_next = True
+    else:
+        items = get_after(key, page_size + 1)
+        has_next = len(items) > page_size
+        items = items[:page_size]
+        has_prev = key is not None
+
+    if len(items) == 0:
+        return items, None, None
+    prev_cursor = encode_cursor('before', get_key(items[0])) if has_prev else None
+    next_cursor = encode_cursor('after', get_key(items[-1])) if has_next else None
+    return items, prev_cursor, next_cursor
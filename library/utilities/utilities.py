@@ -3,11 +3,15 @@ from flask import Blueprint, url_for
 
 import library.adapters.repository as repo
 import library.utilities.services as services
+from library.utilities import recommendation_pool
 
 utilities_blueprint = Blueprint('utilities_bp', __name__)
 
 
 def get_selected_books(quantity=6):
+    if recommendation_pool.pool_instance is not None:
+        return recommendation_pool.pool_instance.take(quantity)
+
     books = services.get_random_books(quantity, repo.repo_instance)
 
     return books
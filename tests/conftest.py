@@ -1,6 +1,7 @@
 import pytest
 
 from library import create_app
+from library.adapters.columnar_repository import ColumnarRepository
 from library.adapters.memory_repository import MemoryRepository
 from library.adapters.repository_populate import populate
 
@@ -18,6 +19,13 @@ def in_memory_repo():
     return repo
 
 
+@pytest.fixture
+def columnar_repo():
+    repo = ColumnarRepository()
+    populate(TEST_DATA_PATH, repo, bulk=True)
+    return repo
+
+
 @pytest.fixture
 def client():
     my_app = create_app({
@@ -30,6 +38,33 @@ def client():
     return my_app.test_client()
 
 
+@pytest.fixture
+def columnar_client():
+    my_app = create_app({
+        'TESTING': True,
+        'TEST_DATA_PATH': TEST_DATA_PATH,
+        'WTF_CSRF_ENABLED': False,
+        'REPOSITORY': 'columnar'
+    })
+
+    return my_app.test_client()
+
+
+@pytest.fixture
+def hashing_client():
+    # Hashes passwords on a thread pool and serves its metrics, whatever .env sets.
+    my_app = create_app({
+        'TESTING': True,
+        'TEST_DATA_PATH': TEST_DATA_PATH,
+        'WTF_CSRF_ENABLED': False,
+        'REPOSITORY': 'memory',
+        'HASHING_EXECUTOR': 'thread',
+        'HASHING_METRICS': True
+    })
+
+    return my_app.test_client()
+
+
 class AuthenticationManager:
     def __init__(self, client):
         self.__client = client
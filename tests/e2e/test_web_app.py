@@ -1,7 +1,15 @@
+import gc
+
 import pytest
 
 from flask import session
 
+from library import create_app
+from library.authentication import hashing, services
+from library.book import services as book_services
+from library.utilities import preload, recommendation_pool
+from utils import get_project_root
+
 
 def test_register(client):
     # Check that we retrieve the register page.
@@ -172,3 +180,117 @@ def test_get_authors(client, auth):
     assert b'Gerard Lelarge' in response.data
     assert b'Jean-Claude Biver' in response.data
     assert b'Lindsey Schussman' in response.data
+
+
+def test_get_books_from_columnar_repository(columnar_client):
+    response = columnar_client.get('/books?author_id=8551671&search_type=author')
+    assert response.status_code == 200
+    assert b'The Switchblade Mamma' in response.data
+
+    response = columnar_client.get('/books?publisher_name=Dargaud&search_type=publisher')
+    assert b'Cruelle' in response.data
+
+
+def test_write_snapshot_command(columnar_client, tmp_path):
+    path = tmp_path / 'catalogue.snapshot'
+    result = columnar_client.application.test_cli_runner().invoke(args=['write-snapshot', str(path)])
+
+    assert result.exit_code == 0
+    assert 'Wrote 3 books' in result.output
+    assert path.exists()
+
+
+def test_login_is_shed_when_hashing_is_saturated(client, monkeypatch):
+    def busy(password_hash, password):
+        raise hashing.HashingBusyException
+
+    monkeypatch.setattr(services, 'check_password_hash', busy)
+    response = client.post('authentication/login', data={'user_name': 'thorke', 'password': 'cLQ^C#oFXloS'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_hashing_metrics(hashing_client):
+    hashing_client.post('authentication/login', data={'user_name': 'thorke', 'password': 'cLQ^C#oFXloS'})
+
+    response = hashing_client.get('/authentication/hashing_metrics')
+    assert response.status_code == 200
+    assert response.json['completed'] == 1
+    assert response.json['queue_depth'] == 0
+
+
+def test_hashing_metrics_are_disabled_by_default(client):
+    assert client.get('/authentication/hashing_metrics').status_code == 404
+
+
+def test_search_books(client):
+    response = client.get('/books?query=switchblade&search_type=text')
+    assert response.status_code == 200
+    assert b'The Switchblade Mamma' in response.data
+    assert b'Cruelle' not in response.data
+
+
+def test_suggest(client):
+    response = client.get('/api/suggest?q=the%20s')
+    assert response.status_code == 200
+    assert response.json == {'books': [{'book_id': 25742454, 'title': 'The Switchblade Mamma'}], 'authors': []}
+
+    response = client.get('/api/suggest?q=l&limit=1')
+    assert response.json['authors'] == [{'author_id': 8551671, 'full_name': 'Lindsey Schussman'}]
+
+
+def test_get_books_by_facets(client):
+    response = client.get('/books?search_type=facets&publisher=N/A&year_to=2015')
+    assert response.status_code == 200
+    assert b'The Breaker New Waves, Vol 11' in response.data
+    assert b'The Switchblade Mamma' not in response.data
+    assert b'1&nbsp;book' in response.data
+
+
+@pytest.mark.parametrize('min_rating', ('nan', 'inf', '-inf', '1e308'))
+def test_get_books_by_facets_ignores_out_of_range_ratings(client, columnar_client, min_rating):
+    for app_client in (client, columnar_client):
+        response = app_client.get(f'/books?search_type=facets&min_rating={min_rating}')
+        assert response.status_code == 200
+
+
+def test_page_through_books_by_publisher(client, monkeypatch):
+    monkeypatch.setattr(book_services, 'default_page_size', 1)
+    response = client.get('/books?publisher_name=N/A&search_type=publisher')
+    assert b'The Breaker New Waves, Vol 11' in response.data
+    assert b'The Switchblade Mamma' not in response.data
+    assert b'cursor=1' in response.data
+
+    response = client.get('/books?publisher_name=N/A&search_type=publisher&cursor=1')
+    assert b'The Switchblade Mamma' in response.data
+    assert b'cursor=0' in response.data
+
+    # Malformed and negative cursors fall back to the first page.
+    for cursor in ('abc', '-1'):
+        response = client.get(f'/books?publisher_name=N/A&search_type=publisher&cursor={cursor}')
+        assert response.status_code == 200
+        assert b'The Breaker New Waves, Vol 11' in response.data
+
+
+def test_preloaded_app_starts_background_work_on_its_first_request_without_a_fork():
+    app = create_app({'TESTING': True, 'TEST_DATA_PATH': get_project_root() / 'tests' / 'data',
+                      'REPOSITORY': 'memory', 'PRELOAD_CATALOGUE': True, 'RECOMMENDATION_POOL_SIZE': 2, 'RECOMMENDATION_POOL_REFRESH': 0})
+    try:
+        assert gc.isenabled()
+        assert preload.worker_start is not None
+        previous_pool = recommendation_pool.pool_instance
+
+        assert app.test_client().get('/').status_code == 200
+        assert recommendation_pool.pool_instance is not None
+        assert recommendation_pool.pool_instance is not previous_pool
+        assert preload.worker_start is None
+    finally:
+        recommendation_pool.pool_instance = None
+        preload.worker_start = None
+        gc.unfreeze()
+
+
+def test_preloading_restarts_the_collector_when_building_the_catalogue_fails(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        create_app({'TESTING': True, 'TEST_DATA_PATH': tmp_path, 'REPOSITORY': 'memory', 'PRELOAD_CATALOGUE': True})
+    assert gc.isenabled()
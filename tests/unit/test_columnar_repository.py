@@ -0,0 +1,188 @@
+import pytest
+
+from library.adapters.columnar_repository import ColumnarRepository, StringTable
+from library.adapters.facet_index import FacetedQuery
+from library.adapters.snapshot import write_snapshot, open_snapshot, SnapshotException
+from library.domain.model import User, Book, Publisher, Author, Review
+
+
+def test_string_table_stores_each_string_once():
+    table = StringTable()
+    assert table.add('Dargaud') == 0
+    assert table.add('N/A') == 1
+    assert table.add('Dargaud') == 0
+    assert len(table) == 2
+    assert table[1] == 'N/A'
+    assert table.position('unknown') == -1
+
+
+def test_repository_returns_the_same_books_as_the_memory_repository(in_memory_repo, columnar_repo):
+    def fields(book):
+        return (book.book_id, book.title, book.description, book.publisher, book.authors, book.release_year,
+                book.ebook, book.num_pages, book.image_url, book.isbn, book.link, book.ratings_count,
+                book.average_rating, book.text_reviews_count)
+
+    assert columnar_repo.get_number_of_books() == in_memory_repo.get_number_of_books()
+    assert [fields(book) for book in columnar_repo.get_books(0, 10)] == \
+           [fields(book) for book in in_memory_repo.get_books(0, 10)]
+    assert fields(columnar_repo.get_book(25742454)) == fields(in_memory_repo.get_book(25742454))
+
+
+def test_repository_can_add_book_out_of_order(columnar_repo):
+    book = Book(1, "Harry Potter")
+    columnar_repo.add_book(book)
+
+    assert columnar_repo.get_book(1) == book
+    assert columnar_repo.get_books_by_indices([0])[0].title == "Harry Potter"
+    assert [book.book_id for book in columnar_repo.get_books_after(None, 2)] == [1, 23272155]
+    assert columnar_repo.get_book(2) is None
+
+
+def test_repository_can_get_books_by_publisher_and_release_year(columnar_repo):
+    assert len(columnar_repo.get_books_by_publisher('N/A')) == 2
+    assert [book.title for book in columnar_repo.get_books_by_publisher('Dargaud')] == ['Cruelle']
+    assert columnar_repo.get_books_by_publisher('unknown') == []
+    assert [book.book_id for book in columnar_repo.get_books_by_release_year(2016)] == [30128855]
+    assert columnar_repo.get_books_by_release_year(1900) == []
+
+
+def test_repository_can_page_through_books_by_author_id():
+    repo = ColumnarRepository()
+    author = Author(123, 'test author')
+    for book_id in (5, 3, 4, 1, 2):
+        book = Book(book_id, f"Book {book_id}")
+        book.add_author(author)
+        repo.add_book(book)
+
+    assert [book.book_id for book in repo.get_books_by_author_id(123)] == [1, 2, 3, 4, 5]
+    assert [book.book_id for book in repo.get_books_by_author_id(123, 2, 2)] == [3, 4]
+    assert repo.get_books_by_author_id(123)[0].authors == [author]
+    assert repo.get_author(123) is None
+    assert repo.get_number_of_authors() == 0
+
+
+def test_repository_can_get_authors_in_unique_id_order():
+    repo = ColumnarRepository()
+    for author_id in (3, 1, 2):
+        repo.add_author(Author(author_id, f'author {author_id}'))
+
+    assert [author.unique_id for author in repo.get_authors(0, 10)] == [1, 2, 3]
+    assert [author.unique_id for author in repo.get_authors_after(1, 1)] == [2]
+    assert [author.unique_id for author in repo.get_authors_before(3, 10)] == [1, 2]
+    assert repo.get_number_of_authors() == 3
+
+
+def test_repository_counts_reviews_in_the_catalogue(columnar_repo):
+    user = columnar_repo.get_user('thorke')
+    book = columnar_repo.get_book(25742454)
+    review = Review(user, book, 'test review')
+    columnar_repo.add_review(review)
+
+    assert columnar_repo.get_reviews_by_book_id(25742454) == [review]
+    assert columnar_repo.get_book(25742454).text_reviews_count == 2
+
+
+def test_repository_can_bulk_load():
+    repo = ColumnarRepository()
+    author = Author(123, 'test author')
+    book = Book(874658, "Harry Potter")
+    book.publisher = Publisher("test")
+    book.add_author(author)
+    user = User('dave', '123456789')
+
+    repo.bulk_load([book], [author], [user])
+
+    assert repo.get_book(874658) == book
+    assert repo.get_book(874658).authors == [author]
+    assert repo.get_author(123).full_name == 'test author'
+    assert repo.get_user('DAVE', case_insensitive=True) is user
+    assert repo.get_books_by_publisher('test')[0].publisher is repo.get_publisher('test')
+
+
+def test_repository_agrees_with_the_memory_repository_on_keyset_pages(in_memory_repo, columnar_repo):
+    for get_page, key in ((lambda repo: repo.get_books_after(23272155, 5), lambda book: book.book_id),
+                          (lambda repo: repo.get_books_before(30128855, 1), lambda book: book.book_id),
+                          (lambda repo: repo.get_authors_after(None, 3), lambda author: author.unique_id)):
+        assert [key(item) for item in get_page(columnar_repo)] == [key(item) for item in get_page(in_memory_repo)]
+
+
+def test_snapshot_holds_the_catalogue_and_users(columnar_repo, tmp_path):
+    write_snapshot(columnar_repo, tmp_path / 'catalogue.snapshot')
+    repo = open_snapshot(tmp_path / 'catalogue.snapshot')
+
+    assert [book.book_id for book in repo.get_books(0, 10)] == [23272155, 25742454, 30128855]
+    book = repo.get_book(25742454)
+    assert book.title == 'The Switchblade Mamma'
+    assert book.authors[0].full_name == 'Lindsey Schussman'
+    assert book.release_year is None and book.ebook is True and book.average_rating == 4.12
+    assert [book.title for book in repo.get_books_by_publisher('Dargaud')] == ['Cruelle']
+    assert [book.book_id for book in repo.get_books_by_release_year(2014)] == [23272155]
+    assert repo.get_number_of_authors() == 5
+    assert repo.get_user('thorke').password == columnar_repo.get_user('thorke').password
+
+
+def test_snapshot_catalogue_can_be_added_to(columnar_repo, tmp_path):
+    write_snapshot(columnar_repo, tmp_path / 'catalogue.snapshot')
+    repo = open_snapshot(tmp_path / 'catalogue.snapshot')
+    book = Book(1, "Harry Potter")
+    book.add_author(Author(8551671, 'Lindsey Schussman'))
+
+    repo.add_book(book)
+    repo.add_review(Review(repo.get_user('thorke'), repo.get_book(30128855), 'test review'))
+
+    assert [book.book_id for book in repo.get_books_by_author_id(8551671)] == [1, 25742454]
+    assert repo.get_number_of_books() == 4
+    assert repo.get_book(30128855).text_reviews_count == 3
+
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / 'catalogue.snapshot'
+    path.write_bytes(bytes(64))
+
+    with pytest.raises(SnapshotException):
+        open_snapshot(path)
+
+
+def test_repository_can_search_books(columnar_repo):
+    books = columnar_repo.search_books('switchblade schussman', 0, 10)
+    assert [book.book_id for book in books] == [25742454]
+
+    columnar_repo.add_book(Book(1, 'Switchblade Stories'))
+    assert [book.book_id for book in columnar_repo.search_books('switchblade', 0, 10)] == [1, 25742454]
+
+
+def test_repository_can_suggest_titles_and_authors(columnar_repo):
+    assert columnar_repo.get_title_suggestions('the', 10) == [(23272155, 'The Breaker New Waves, Vol 11'),
+                                                              (25742454, 'The Switchblade Mamma')]
+    assert columnar_repo.get_author_suggestions('lind', 10) == [(8551671, 'Lindsey Schussman')]
+
+    columnar_repo.add_book(Book(1, 'The Cat'))
+    columnar_repo.add_author(Author(2, 'Lindsey Other'))
+    assert [book_id for book_id, _ in columnar_repo.get_title_suggestions('the', 10)] == [23272155, 25742454, 1]
+    assert len(columnar_repo.get_author_suggestions('lind', 10)) == 2
+
+
+def test_repository_can_get_books_by_facets(columnar_repo, in_memory_repo):
+    for query in (FacetedQuery(), FacetedQuery(ebook=False, release_year_min=2015, operator='or', sort_by='title'),
+                  FacetedQuery(author_ids=[8551671], min_rating=4.5)):
+        page = columnar_repo.get_books_by_facets(query, 0, 10)
+        expected_page = in_memory_repo.get_books_by_facets(query, 0, 10)
+        assert [book.book_id for book in page.books] == [book.book_id for book in expected_page.books]
+        assert (page.total, page.facet_counts) == (expected_page.total, expected_page.facet_counts)
+
+    book = Book(1, 'New')
+    book.ebook = True
+    columnar_repo.add_book(book)
+    assert [book.book_id for book in columnar_repo.get_books_by_facets(FacetedQuery(ebook=True), 0, 10).books] == \
+        [1, 25742454]
+
+
+def test_repository_can_page_through_books_by_publisher_and_release_year(columnar_repo):
+    for book_id in (5, 3, 4, 1, 2):
+        book = Book(book_id, f"Book {book_id}")
+        book.publisher = Publisher('Dargaud')
+        book.release_year = 2016
+        columnar_repo.add_book(book)
+
+    assert [book.book_id for book in columnar_repo.get_books_by_publisher('Dargaud', 0, 3)] == [1, 2, 3]
+    assert [book.book_id for book in columnar_repo.get_books_by_release_year(2016, 4)] == [5, 30128855]
@@ -1,11 +1,14 @@
 import datetime
 from pathlib import Path
 import pytest
+from werkzeug.security import check_password_hash
 
 from utils import get_project_root
 
-from library.domain.model import Publisher, Author, Book, User, Review, ShelfName
+from library.domain.model import Publisher, Author, Book, User, Review, ShelfName, ReadingList
 from library.adapters.jsondatareader import BooksJSONReader
+from library.adapters import csv_data_importer
+from library.adapters.csv_data_importer import load_users, write_hashed_users_file
 
 
 class TestPublisher:
@@ -269,6 +272,19 @@ class TestBook:
         assert str(
             book.authors) == "[<Author J.R.R. Tolkien, author id = 1>, <Author Ernest Hemingway, author id = 3>, <Author J.K. Rowling, author id = 4>]"
 
+    def test_reviews_and_reading_lists_are_allocated_on_first_use(self):
+        book = Book(84765876, "Harry Potter")
+        user = User('Shyamli', 'pw12345')
+        assert list(book.reviews) == []
+        assert list(book.reading_lists) == []
+
+        review = Review(user, None, 'test review')
+        book.add_review(review)
+        reading_list = ReadingList(user, None, ShelfName.READ)
+        book.add_reading_list(reading_list)
+        assert list(book.reviews) == [review]
+        assert book.reading_lists == [reading_list]
+
 
 class TestReview:
 
@@ -393,3 +409,69 @@ class TestBooksJSONReader:
     def test_read_books_from_file_special_characters(self, read_books_and_authors):
         dataset_of_books = read_books_and_authors
         assert dataset_of_books[17].title == "續．星守犬"
+
+    def test_iter_books_streams_books_one_at_a_time(self):
+        data_folder = get_project_root() / Path("library/adapters/data")
+        reader = BooksJSONReader(str(data_folder / 'comic_books_excerpt.json'),
+                                 str(data_folder / 'book_authors_excerpt.json'))
+        reader.read_authors()
+        books = reader.iter_books()
+
+        book = next(books)
+        assert str(book) == "<Book The Switchblade Mamma, book id = 25742454>"
+        assert str(book.authors[0]) == "<Author Lindsey Schussman, author id = 8551671>"
+        assert reader.dataset_of_books == []
+        assert len(list(books)) == 19
+
+    def test_read_books_counts_unresolved_author_ids(self, tmp_path):
+        books_file = tmp_path / 'books.json'
+        authors_file = tmp_path / 'authors.json'
+        authors_file.write_text('{"author_id": "1", "name": "Known Author", "average_rating": "4.0", '
+                                '"text_reviews_count": "1", "ratings_count": "2"}\n', encoding='UTF-8')
+        books_file.write_text('{"book_id": "10", "title": "A Book", "publisher": "", "publication_year": "", '
+                              '"is_ebook": "false", "description": "", "num_pages": "", "image_url": "", '
+                              '"isbn": "", "link": "", "ratings_count": "", "average_rating": "", '
+                              '"text_reviews_count": "", "authors": [{"author_id": "1"}, {"author_id": "2"}]}\n',
+                              encoding='UTF-8')
+        reader = BooksJSONReader(str(books_file), str(authors_file))
+        reader.read_json_files()
+
+        assert [author.unique_id for author in reader.dataset_of_books[0].authors] == [1]
+        assert reader.number_of_unresolved_author_ids == 1
+
+
+class TestUsersFile:
+
+    def test_load_pre_hashed_users(self):
+        users = load_users(get_project_root() / "tests" / "data")
+
+        assert [user.user_name for user in users] == ['thorke', 'fmercury', 'mjackson']
+        assert check_password_hash(users[0].password, 'cLQ^C#oFXloS')
+
+    def test_load_and_hash_plaintext_users(self, tmp_path, monkeypatch):
+        # Hash in worker processes even for this small file.
+        monkeypatch.setattr(csv_data_importer, 'PARALLEL_HASHING_THRESHOLD', 2)
+        (tmp_path / 'users.csv').write_text('id,username,password\n1,thorke,cLQ^C#oFXloS\n2,fmercury,mvNNbc1eLA$i\n',
+                                            encoding='utf-8')
+        users = load_users(tmp_path)
+
+        assert check_password_hash(users[0].password, 'cLQ^C#oFXloS')
+        assert check_password_hash(users[1].password, 'mvNNbc1eLA$i')
+
+    def test_load_users_without_password_columns(self, tmp_path):
+        (tmp_path / 'users.csv').write_text('id,username\n1,thorke\n', encoding='utf-8')
+        with pytest.raises(ValueError, match='neither a password nor a password_hash column'):
+            load_users(tmp_path)
+
+        (tmp_path / 'users.csv').write_text('id,username,password_hash\n1,thorke,\n', encoding='utf-8')
+        with pytest.raises(ValueError, match='no password column'):
+            load_users(tmp_path)
+
+    def test_write_hashed_users_file(self, tmp_path):
+        (tmp_path / 'users.csv').write_text('id,username,password\n7,thorke,cLQ^C#oFXloS\n', encoding='utf-8')
+        write_hashed_users_file(tmp_path, tmp_path / 'users.csv')
+
+        lines = (tmp_path / 'users.csv').read_text(encoding='utf-8').splitlines()
+        assert lines[0] == 'id,username,password_hash'
+        assert lines[1].startswith('7,thorke,pbkdf2:sha256:')
+        assert check_password_hash(load_users(tmp_path)[0].password, 'cLQ^C#oFXloS')
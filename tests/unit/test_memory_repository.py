@@ -1,6 +1,16 @@
+import random
+from bisect import bisect_left, bisect_right
+
 import pytest
 
+from library.adapters.facet_index import FacetIndex, FacetedQuery, bitmap_of, rows_of
+from library.adapters.memory_repository import MemoryRepository
+from library.adapters.prefix_index import PrefixIndex
+from library.adapters.repository_populate import populate
+from library.adapters.sorted_blocks import SortedBlocks, BLOCK_SIZE
+from library.adapters.text_index import TextIndex, make_match_query
 from library.domain.model import User, Book, Publisher, Author, Review
+from utils import get_project_root
 
 
 def test_repository_can_add_a_user(in_memory_repo):
@@ -172,3 +182,267 @@ def test_repository_can_add_review(in_memory_repo):
     assert len(reviews) is 1
     assert reviews[0] is review
     assert book.text_reviews_count is 1
+
+
+def test_repository_can_bulk_load():
+    repo = MemoryRepository()
+    author = Author(123, 'test author')
+    book = Book(874658, "Harry Potter")
+    book.publisher = Publisher("test")
+    book.add_author(author)
+    user = User('dave', '123456789')
+
+    repo.bulk_load([book], [author], [user])
+
+    assert repo.get_book(874658) is book
+    assert repo.get_author(123) is author
+    assert repo.get_user('dave') is user
+    assert repo.get_books_by_publisher('test') == [book]
+    assert repo.get_publisher('test') is book.publisher
+
+
+def test_repository_can_retrieve_a_user_ignoring_case(in_memory_repo):
+    assert in_memory_repo.get_user('FMercury') is None
+    user = in_memory_repo.get_user('FMercury', case_insensitive=True)
+    assert user == User('fmercury', '8734gfe2058v')
+
+    # Names are compared lowercased, as the database repository does, not casefolded.
+    in_memory_repo.add_user(User('Straße', '123456789'))
+    assert in_memory_repo.get_user('STRASSE', case_insensitive=True) is None
+    assert in_memory_repo.get_user('strasse', case_insensitive=True) is None
+
+
+def test_repository_keeps_first_user_with_a_given_name(in_memory_repo):
+    user = User('dave', '123456789')
+    in_memory_repo.add_user(user)
+    in_memory_repo.add_user(User('dave', '987654321'))
+
+    assert in_memory_repo.get_user('dave') is user
+
+
+def test_repository_can_page_through_books_by_author_id(in_memory_repo):
+    author = Author(123, 'test author')
+    for book_id in (5, 3, 4, 1, 2):
+        book = Book(book_id, f"Book {book_id}")
+        book.add_author(author)
+        in_memory_repo.add_book(book)
+
+    assert [book.book_id for book in in_memory_repo.get_books_by_author_id(123)] == [1, 2, 3, 4, 5]
+    assert [book.book_id for book in in_memory_repo.get_books_by_author_id(123, 2, 2)] == [3, 4]
+    assert [book.book_id for book in in_memory_repo.get_books_by_author_id(123, 4, 2)] == [5]
+
+
+def test_repository_can_get_books_after_and_before_a_book_id(in_memory_repo):
+    assert [book.book_id for book in in_memory_repo.get_books_after(None, 2)] == [23272155, 25742454]
+    assert [book.book_id for book in in_memory_repo.get_books_after(23272155, 5)] == [25742454, 30128855]
+    assert [book.book_id for book in in_memory_repo.get_books_before(30128855, 1)] == [25742454]
+    assert in_memory_repo.get_books_before(23272155, 5) == []
+
+
+def test_repository_can_get_authors_after_and_before_an_author_id(in_memory_repo):
+    author_ids = [author.unique_id for author in in_memory_repo.get_authors_after(None, 10)]
+    assert len(author_ids) == 5
+    assert [author.unique_id for author in in_memory_repo.get_authors_after(author_ids[1], 2)] == author_ids[2:4]
+    assert [author.unique_id for author in in_memory_repo.get_authors_before(author_ids[3], 10)] == author_ids[:3]
+
+
+def test_text_index_ranks_title_matches_first():
+    index = TextIndex()
+    index.add(1, 'A garden of roses', [], 'A book about tulips.', 3.0)
+    index.add(2, 'Tulips', ['Ann Gardener'], 'Roses and more roses.', 3.0)
+    index.add(3, 'Cooking', ['Rose Smith'], None, 3.0)
+
+    assert index.search('tulips', 0, 10) == [2, 1]
+    assert index.search('Roses', 0, 10) == [1, 2]
+    assert index.search('roses tulips', 1, 1) == [1]
+    assert index.search('orchids', 0, 10) == []
+    assert len(index) == 3
+
+
+def test_text_index_prefers_better_rated_books():
+    index = TextIndex()
+    index.add(1, 'Dune', [], None, 3.0)
+    index.add(2, 'Dune', [], None, 4.5)
+
+    assert index.search('dune', 0, 10) == [2, 1]
+
+
+def test_make_match_query_quotes_words():
+    assert make_match_query('The "Switchblade" mamma the') == '"the" OR "switchblade" OR "mamma"'
+    assert make_match_query('" *') == ''
+
+
+def test_repository_can_search_books(in_memory_repo):
+    books = in_memory_repo.search_books('switchblade schussman', 0, 10)
+    assert [book.book_id for book in books] == [25742454]
+
+    book = Book(1, 'Switchblade Stories')
+    in_memory_repo.add_book(book)
+    assert [book.book_id for book in in_memory_repo.search_books('switchblade', 0, 10)] == [1, 25742454]
+    assert in_memory_repo.search_books('', 0, 10) == []
+
+
+def test_prefix_index_completes_most_popular_first():
+    index = PrefixIndex()
+    index.add(1, 'Harry Potter', 10)
+    index.add(2, 'harry  and the Hendersons', 50)
+    index.add(3, 'Hamlet', 30)
+    index.add(4, '', 100)
+
+    assert index.complete('ha', 10) == [(2, 'harry  and the Hendersons'), (3, 'Hamlet'), (1, 'Harry Potter')]
+    assert index.complete('HARRY A', 10) == [(2, 'harry  and the Hendersons')]
+    assert index.complete('ha', 1) == [(2, 'harry  and the Hendersons')]
+    assert index.complete('x', 10) == []
+    assert index.complete(' ', 10) == []
+
+
+def test_prefix_index_sees_names_added_after_a_lookup():
+    index = PrefixIndex()
+    for item_id in range(1000):
+        index.add(item_id, f'Book {item_id}', item_id % 100)
+    assert [item_id for item_id, _ in index.complete('book', 2)] == [199, 299]
+
+    index.add(1000, 'Book of books', 500)
+    index.add(99, 'Book 99', 1000)
+    assert index.complete('book', 2) == [(99, 'Book 99'), (1000, 'Book of books')]
+    assert len(index) == 1002
+
+
+def test_repository_can_suggest_titles_and_authors(in_memory_repo):
+    assert in_memory_repo.get_title_suggestions('the', 10) == [(23272155, 'The Breaker New Waves, Vol 11'),
+                                                               (25742454, 'The Switchblade Mamma')]
+    assert in_memory_repo.get_author_suggestions('lind', 10) == [(8551671, 'Lindsey Schussman')]
+
+    book = Book(1, 'The Cat')
+    book.ratings_count = 10 ** 6
+    in_memory_repo.add_book(book)
+    assert in_memory_repo.get_title_suggestions('the', 1) == [(1, 'The Cat')]
+
+
+def test_bitmaps_round_trip_rows():
+    assert list(rows_of(bitmap_of([0, 3, 8, 1000]))) == [0, 3, 8, 1000]
+    assert list(rows_of(0)) == []
+
+
+def test_facet_index_combines_filters():
+    index = FacetIndex()
+    for book_id in range(100):
+        index.add(book_id, f'Book {book_id:02d}', f'Publisher {book_id % 3}', [book_id % 5], 1950 + book_id,
+                  book_id % 2 == 0, None if book_id % 10 == 0 else book_id * 10, book_id / 25, book_id)
+
+    book_ids, total, _ = index.query(FacetedQuery(publisher_names=['Publisher 0'], release_year_min=2040), 0, 100)
+    assert book_ids == [90, 93, 96, 99]
+    assert total == 4
+
+    book_ids, total, _ = index.query(FacetedQuery(num_pages_min=950, num_pages_max=990, ebook=True), 0, 100)
+    assert book_ids == [96, 98]
+    book_ids, total, _ = index.query(FacetedQuery(author_ids=[1], min_rating=3.9, operator='or'), 0, 3)
+    assert book_ids == [1, 6, 11]
+    assert total == 20 + 2
+
+    book_ids, _, _ = index.query(FacetedQuery(sort_by='average_rating', descending=True), 0, 2)
+    assert book_ids == [99, 98]
+    book_ids, _, _ = index.query(FacetedQuery(release_year_max=1951, sort_by='title', descending=True), 1, 5)
+    assert book_ids == [0]
+
+
+def test_facet_index_accepts_any_finite_minimum_rating():
+    index = FacetIndex()
+    index.add(1, 'One', 'A', [], 2000, True, 100, 4.0, 1)
+    index.add(2, 'Two', 'B', [], 2000, False, 200, None, 2)
+
+    assert index.query(FacetedQuery(min_rating=-1.7e308), 0, 10)[:2] == ([1], 1)
+    assert index.query(FacetedQuery(min_rating=1.7e308), 0, 10)[:2] == ([], 0)
+    with pytest.raises(ValueError):
+        FacetedQuery(min_rating=float('nan'))
+
+
+def test_facet_index_counts_facet_values():
+    index = FacetIndex()
+    index.add(1, 'One', 'A', [], 2000, True, 100, 4.0, 1)
+    index.add(2, 'Two', 'B', [], 2000, False, 200, 3.0, 2)
+    index.add(3, 'Three', 'B', [], None, False, 300, 2.0, 3)
+
+    _, _, facet_counts = index.query(FacetedQuery(), 0, 10)
+    assert facet_counts == {'publisher': [('B', 2), ('A', 1)], 'release_year': [(2000, 2)],
+                            'ebook': [(True, 1), (False, 2)]}
+    _, _, facet_counts = index.query(FacetedQuery(num_pages_min=150), 0, 10)
+    assert facet_counts == {'publisher': [('B', 2)], 'release_year': [(2000, 1)], 'ebook': [(False, 2)]}
+
+
+def test_facet_index_follows_added_books():
+    index = FacetIndex()
+    index.add(1, 'One', 'A', [], 2000, False, 100, 4.0, 1)
+    assert index.query(FacetedQuery(num_pages_min=50, sort_by='num_pages'), 0, 10)[0] == [1]
+
+    index.add(2, 'Two', 'A', [], 2001, True, 5000, 4.5, 2)
+    index.add(0, 'Zero', 'A', [], 2002, False, 60, 4.5, 2)
+    assert index.query(FacetedQuery(num_pages_min=50, sort_by='num_pages'), 0, 10)[0] == [0, 1, 2]
+    assert index.query(FacetedQuery(num_pages_min=1000), 0, 10)[0] == [2]
+
+
+def test_repository_can_get_books_by_facets(in_memory_repo):
+    page = in_memory_repo.get_books_by_facets(FacetedQuery(publisher_names=['N/A'], release_year_max=2015), 0, 10)
+    assert [book.book_id for book in page.books] == [23272155]
+    assert page.total == 1
+
+    page = in_memory_repo.get_books_by_facets(FacetedQuery(sort_by='title'), 1, 10)
+    assert [book.book_id for book in page.books] == [23272155, 25742454]
+    assert page.total == 3
+    assert page.facet_counts['publisher'] == [('N/A', 2), ('Dargaud', 1)]
+
+
+def test_repository_can_page_through_books_by_publisher_and_release_year(in_memory_repo):
+    publisher = in_memory_repo.add_publisher(Publisher('test publisher'))
+    for book_id in (5, 3, 4, 1, 2):
+        book = Book(book_id, f"Book {book_id}")
+        book.publisher = publisher
+        book.release_year = 1901
+        in_memory_repo.add_book(book)
+
+    assert [book.book_id for book in in_memory_repo.get_books_by_publisher('test publisher')] == [1, 2, 3, 4, 5]
+    assert [book.book_id for book in in_memory_repo.get_books_by_publisher('test publisher', 2, 2)] == [3, 4]
+    assert [book.book_id for book in in_memory_repo.get_books_by_release_year(1901, 4, 2)] == [5]
+    assert in_memory_repo.get_books_by_release_year(1901, 5, 2) == []
+
+
+def test_sorted_blocks_keeps_items_in_key_order():
+    generator = random.Random(7)
+    values = [generator.randrange(1000) for _ in range(5 * BLOCK_SIZE)]
+    blocks = SortedBlocks(values[:BLOCK_SIZE])
+    for value in values[BLOCK_SIZE:]:
+        blocks.add(value)
+
+    expected = sorted(values)
+    assert len(blocks) == len(expected)
+    assert list(blocks) == expected
+    assert blocks[BLOCK_SIZE + 3] == expected[BLOCK_SIZE + 3]
+    assert blocks[-1] == expected[-1]
+    assert blocks[BLOCK_SIZE - 5:3 * BLOCK_SIZE + 5] == expected[BLOCK_SIZE - 5:3 * BLOCK_SIZE + 5]
+    assert blocks.bisect_left(500) == bisect_left(expected, 500)
+    assert blocks.bisect_right(500) == bisect_right(expected, 500)
+    assert blocks.bisect_right(1000) == len(expected)
+
+
+def test_sorted_blocks_orders_by_key_and_keeps_equal_keys_in_insertion_order():
+    items = [(n % 7, n) for n in range(3 * BLOCK_SIZE)]
+    blocks = SortedBlocks(items[:10], key=lambda item: item[0])
+    for item in items[10:]:
+        blocks.add(item)
+
+    assert list(blocks) == sorted(items, key=lambda item: item[0])
+    assert blocks.bisect_left(3) == sum(1 for key, _ in items if key < 3)
+    assert blocks.bisect_right(3) == sum(1 for key, _ in items if key <= 3)
+
+
+def test_repository_bulk_load_matches_per_row_populate(in_memory_repo):
+    repo = MemoryRepository()
+    populate(get_project_root() / 'tests' / 'data', repo, bulk=True)
+
+    assert repo.get_number_of_books() == in_memory_repo.get_number_of_books()
+    assert repo.get_books(0, 10) == in_memory_repo.get_books(0, 10)
+    assert repo.get_authors(0, 10) == in_memory_repo.get_authors(0, 10)
+    assert repo.get_books_by_publisher('N/A') == in_memory_repo.get_books_by_publisher('N/A')
+    assert repo.get_books_by_author_id(8551671) == in_memory_repo.get_books_by_author_id(8551671)
+    assert repo.search_books('breaker', 0, 10) == in_memory_repo.search_books('breaker', 0, 10)
+    assert repo.get_title_suggestions('the', 10) == in_memory_repo.get_title_suggestions('the', 10)
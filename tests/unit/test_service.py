@@ -1,14 +1,23 @@
+import gc
+import os
+import threading
+import time
 from datetime import date
 
 import pytest
 
+from library.adapters.facet_index import FacetedQuery
 from library.authentication.services import AuthenticationException
 from library.authentication import services as auth_services
+from library.authentication.hashing import HashingExecutor, HashingBusyException
 from library.book import services as book_service
 from library.book.services import NonExistentBookException
 from library.book.services import UnknownUserException
 from library.author import services as author_service
 from library.domain.model import ShelfName
+from library.utilities import preload
+from library.utilities.recommendation_pool import RecommendationPool
+from library.utilities.services import get_keyset_page, encode_cursor, decode_cursor
 
 
 def test_can_add_user(in_memory_repo):
@@ -79,6 +88,38 @@ def test_can_get_books(in_memory_repo):
     assert len(books) == 3
 
 
+def test_can_get_books_page(in_memory_repo):
+    books, prev_cursor, next_cursor = book_service.get_books_page(in_memory_repo)
+    assert len(books) == 3
+    assert prev_cursor is None and next_cursor is None
+
+
+def test_can_page_forwards_and_backwards_with_cursors(in_memory_repo):
+    def get_page(cursor):
+        return get_keyset_page(in_memory_repo.get_books_after, in_memory_repo.get_books_before,
+                               lambda book: book.book_id, cursor, 2)
+
+    books, prev_cursor, next_cursor = get_page(None)
+    assert [book.book_id for book in books] == [23272155, 25742454]
+    assert prev_cursor is None
+
+    books, prev_cursor, next_cursor = get_page(next_cursor)
+    assert [book.book_id for book in books] == [30128855]
+    assert next_cursor is None
+
+    books, prev_cursor, next_cursor = get_page(prev_cursor)
+    assert [book.book_id for book in books] == [23272155, 25742454]
+    assert prev_cursor is None
+    assert next_cursor is not None
+
+
+def test_malformed_cursor_starts_from_first_page(in_memory_repo):
+    assert decode_cursor('not a cursor') == ('after', None)
+    assert decode_cursor(encode_cursor('before', 42)) == ('before', 42)
+    books, prev_cursor, next_cursor = book_service.get_books_page(in_memory_repo, '3')
+    assert len(books) == 3
+
+
 def test_can_get_books_by_publisher(in_memory_repo):
     books = book_service.get_books_by_publisher(in_memory_repo, 'N/A')
     assert len(books) == 2
@@ -111,6 +152,15 @@ A world in which women fight and bets are made upon their bloodshed.Lillian is f
     assert book.publisher.name == 'N/A'
 
 
+def test_can_get_page_of_books_by_author_id(in_memory_repo):
+    books, has_next = book_service.get_page_of_books_by_author_id(in_memory_repo, 8551671)
+    assert [book.book_id for book in books] == [25742454]
+    assert has_next is False
+
+    books, has_next = book_service.get_page_of_books_by_author_id(in_memory_repo, 8551671, 1)
+    assert books == []
+
+
 def test_can_get_number_of_books(in_memory_repo):
     books = book_service.get_number_of_books(in_memory_repo)
     assert books == 3
@@ -160,3 +210,112 @@ def test_can_get_authors(in_memory_repo):
 def test_can_get_number_of_authors(in_memory_repo):
     authors = author_service.get_number_of_authors(in_memory_repo)
     assert authors == 5
+
+
+def test_recommendation_pool_serves_pre_sampled_books(in_memory_repo):
+    pool = RecommendationPool(in_memory_repo, sample_size=2, pool_size=3)
+    assert len(pool.take(2)) == 2
+    assert (pool.hits, pool.misses) == (0, 1)
+
+    pool.refresh()
+    books = pool.take(1)
+    assert len(books) == 1
+    assert in_memory_repo.get_book(books[0].book_id) is books[0]
+    assert (pool.hits, pool.misses) == (1, 1)
+
+    # Asking for more books than a sample holds falls back to sampling the repository.
+    assert len(pool.take(3)) == 2
+    assert (pool.hits, pool.misses) == (1, 2)
+
+
+def test_hashing_executor_hashes_and_checks_passwords():
+    executor = HashingExecutor(kind='thread', workers=1)
+    password_hash = executor.generate_password_hash('abcd1A23')
+
+    assert executor.check_password_hash(password_hash, 'abcd1A23')
+    assert not executor.check_password_hash(password_hash, '0987654321')
+    metrics = executor.metrics()
+    assert (metrics['completed'], metrics['rejected'], metrics['queue_depth']) == (3, 0, 0)
+    assert metrics['mean_hash_time'] > 0
+    executor.shutdown()
+
+
+def test_hashing_executor_rejects_hashes_beyond_its_queue():
+    executor = HashingExecutor(kind='thread', workers=1, max_pending=1)
+    thread = threading.Thread(target=executor.generate_password_hash, args=('abcd1A23',))
+    thread.start()
+    while executor.metrics()['queue_depth'] == 0:
+        time.sleep(0.001)
+
+    with pytest.raises(HashingBusyException):
+        executor.generate_password_hash('abcd1A23')
+    thread.join()
+    assert executor.metrics()['rejected'] == 1
+    assert executor.metrics()['max_queue_depth'] == 1
+    executor.shutdown()
+
+
+def test_preload_freezes_the_catalogue_and_starts_workers_after_a_fork():
+    started = []
+    preload.begin()
+    assert not gc.isenabled()
+    try:
+        preload.finish(lambda: started.append(os.getpid()))
+        assert gc.isenabled()
+        assert gc.get_freeze_count() > 0
+        assert started == []
+
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if started == [os.getpid()] and preload.worker_start is None else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+        # A process serving requests without forking starts its workers itself, once.
+        preload.start_worker_once()
+        preload.start_worker_once()
+        assert started == [os.getpid()]
+    finally:
+        preload.worker_start = None
+        gc.unfreeze()
+
+
+def test_can_search_books(in_memory_repo):
+    books, has_next = book_service.search_books(in_memory_repo, 'cruelle')
+    assert [book.book_id for book in books] == [30128855]
+    assert has_next is False
+
+    books, has_next = book_service.search_books(in_memory_repo, 'cruelle', 1)
+    assert books == []
+    assert has_next is False
+
+
+def test_can_get_suggestions(in_memory_repo):
+    suggestions = book_service.get_suggestions(in_memory_repo, 'Cru')
+    assert suggestions == {'books': [{'book_id': 30128855, 'title': 'Cruelle'}], 'authors': []}
+
+
+def test_can_get_faceted_page(in_memory_repo, monkeypatch):
+    monkeypatch.setattr(book_service, 'default_page_size', 2)
+    page, has_next = book_service.get_faceted_page(in_memory_repo, FacetedQuery())
+    assert [book.book_id for book in page.books] == [23272155, 25742454]
+    assert has_next is True
+
+    page, has_next = book_service.get_faceted_page(in_memory_repo, FacetedQuery(), 1)
+    assert [book.book_id for book in page.books] == [30128855]
+    assert has_next is False
+
+
+def test_can_page_through_books_by_publisher_and_release_year(in_memory_repo, monkeypatch):
+    monkeypatch.setattr(book_service, 'default_page_size', 1)
+    books, has_next = book_service.get_page_of_books_by_publisher(in_memory_repo, 'N/A')
+    assert [book.book_id for book in books] == [23272155]
+    assert has_next is True
+
+    books, has_next = book_service.get_page_of_books_by_publisher(in_memory_repo, 'N/A', 1)
+    assert [book.book_id for book in books] == [25742454]
+    assert has_next is False
+
+    books, has_next = book_service.get_page_of_books_by_release_year(in_memory_repo, 2016)
+    assert [book.book_id for book in books] == [30128855]
+    assert has_next is False
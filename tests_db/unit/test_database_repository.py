@@ -1,5 +1,11 @@
+import pytest
+from sqlalchemy import event, func
+
 from library.adapters.database_repository import SqlAlchemyRepository
-from library.domain.model import User, Book, Publisher, Author, Review
+from library.adapters.facet_index import FacetedQuery
+from library.adapters.read_model import BookRow, AuthorRow
+from library.domain.model import User, Book, Publisher, Author, Review, ReadingList, ShelfName
+from library.utilities.recommendation_pool import RecommendationPool
 
 
 def test_repository_can_add_a_user(session_factory):
@@ -177,3 +183,341 @@ def test_repository_can_add_publisher(session_factory):
     publisher = Publisher('test publisher')
     repo.add_publisher(publisher)
     assert repo.get_publisher(publisher.name) is publisher
+
+
+def test_repository_bulk_load_matches_per_row_populate(bulk_session_factory):
+    repo = SqlAlchemyRepository(bulk_session_factory)
+    assert repo.get_number_of_books() == 3
+    assert repo.get_number_of_authors() == 5
+    assert repo.get_user('fmercury') == User('fmercury', '8734gfe2058v')
+
+    book = repo.get_book(25742454)
+    assert book.title == 'The Switchblade Mamma'
+    assert book.publisher.name == 'N/A'
+    assert book.ebook is True
+    assert [author.full_name for author in book.authors] == ['Lindsey Schussman']
+
+    books = repo.get_books_by_publisher('N/A')
+    assert len(books) == 2
+    assert repo.get_publisher('Dargaud') is not None
+
+
+def test_repository_can_retrieve_a_user_ignoring_case(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert repo.get_user('FMercury') is None
+    user = repo.get_user('FMercury', case_insensitive=True)
+    assert user == User('fmercury', '8734gfe2058v')
+
+
+def test_repository_get_books_by_indices_sees_new_books(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert repo.get_books_by_indices([0])[0].book_id == 23272155
+
+    book = Book(1, "Harry Potter")
+    repo.add_book(book)
+
+    books = repo.get_books_by_indices([0, 3, 4])
+    assert len(books) == 2
+    assert books[0] is book
+    assert books[1].book_id == 30128855
+
+
+@pytest.mark.parametrize('loading_strategy', ('lazy', 'selectin'))
+def test_recommendation_pool_hydrates_books(session_factory, loading_strategy):
+    repo = SqlAlchemyRepository(session_factory, loading_strategy=loading_strategy)
+    pool = RecommendationPool(repo, sample_size=2, pool_size=2)
+    pool.refresh()
+
+    books = pool.take(2)
+    assert len(books) == 2
+    for book in books:
+        # The books are detached from the session, so their authors and publisher must already be loaded.
+        assert [author.full_name for author in book.authors] == [
+            author.full_name for author in repo.get_book(book.book_id).authors]
+        assert book.publisher.name == repo.get_book(book.book_id).publisher.name
+    assert pool.hits == 1
+
+
+@pytest.mark.parametrize(('loading_strategy', 'max_queries'), (
+        ('selectin', 3),
+        ('joined', 1),
+        ('rows', 2),
+))
+def test_repository_book_listing_is_not_n_plus_one(session_factory, loading_strategy, max_queries):
+    repo = SqlAlchemyRepository(session_factory, loading_strategy=loading_strategy)
+    for book_id in range(1, 9):
+        book = Book(book_id, f"Book {book_id}")
+        book.publisher = Publisher(f"Publisher {book_id}")
+        book.add_author(Author(1000 + book_id, f"Author {book_id}"))
+        repo.add_book(book)
+    # Start from an empty identity map, as a new request would.
+    repo.reset_session()
+
+    statements = []
+    engine = session_factory.kw['bind']
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        for book in repo.get_books(0, 8):
+            [author.full_name for author in book.authors]
+            book.publisher.name
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    assert len(statements) <= max_queries
+
+
+def test_repository_can_page_through_books_by_author_id(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    author = Author(123, 'test author')
+    books = [Book(book_id, f"Book {book_id}") for book_id in (5, 3, 4, 1, 2)]
+    for book in books:
+        book.add_author(author)
+        repo.add_book(book)
+
+    assert [book.book_id for book in repo.get_books_by_author_id(123)] == [1, 2, 3, 4, 5]
+    assert [book.book_id for book in repo.get_books_by_author_id(123, 2, 2)] == [3, 4]
+    assert [book.book_id for book in repo.get_books_by_author_id(123, 4, 2)] == [5]
+    assert repo.get_books_by_author_id(8551671)[0].book_id == 25742454
+
+
+def test_repository_lookups_use_indexes(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    user = repo.get_user('thorke')
+    book = repo.get_book(25742454)
+    repo.add_review(Review(user, book, 'test review'))
+    repo.add_reading_list(ReadingList(user, book, ShelfName.READ.value), False)
+    repo.reset_session()
+
+    statements = []
+    engine = session_factory.kw['bind']
+
+    def listener(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        user = repo.get_user('thorke')
+        repo.get_user('THORKE', case_insensitive=True)
+        repo.get_book(25742454)
+        repo.get_books_by_indices([0, 2])
+        repo.get_books_by_publisher('Dargaud')
+        repo.get_books_by_release_year(2016)
+        repo.get_books_by_author_id(8551671)
+        repo.get_author(8551671)
+        repo.get_publisher('Dargaud')
+        repo.get_reviews_by_book_id(25742454)
+        repo.get_reading_list_by_user(ShelfName.READ.value, user)
+        repo.get_reading_list_by_user_and_book_id(user, 25742454)
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    connection = engine.raw_connection()
+    try:
+        for statement, parameters in statements:
+            if 'ORDER BY books.book_id' in statement and 'WHERE' not in statement:
+                continue  # Building the id vector of get_books_by_indices reads the whole primary key on purpose.
+            plan = connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            full_scans = [row[3] for row in plan if row[3].startswith('SCAN') and 'INDEX' not in row[3]]
+            assert full_scans == [], statement
+    finally:
+        connection.close()
+
+
+def test_repository_can_get_books_after_and_before_a_book_id(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert [book.book_id for book in repo.get_books_after(None, 2)] == [23272155, 25742454]
+    assert [book.book_id for book in repo.get_books_after(23272155, 5)] == [25742454, 30128855]
+    assert [book.book_id for book in repo.get_books_before(30128855, 1)] == [25742454]
+    assert repo.get_books_before(23272155, 5) == []
+
+
+def test_repository_can_get_authors_after_and_before_an_author_id(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    author_ids = [author.unique_id for author in repo.get_authors_after(None, 10)]
+    assert len(author_ids) == 5
+    assert [author.unique_id for author in repo.get_authors_after(author_ids[1], 2)] == author_ids[2:4]
+    assert [author.unique_id for author in repo.get_authors_before(author_ids[3], 10)] == author_ids[:3]
+
+
+def test_repository_caches_book_and_author_counts(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert repo.get_number_of_books() == 3
+    assert repo.get_number_of_authors() == 5
+
+    statements = []
+    engine = session_factory.kw['bind']
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        assert repo.get_number_of_books() == 3
+        assert repo.get_number_of_authors() == 5
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert statements == []
+
+    repo.add_book(Book(874658, "Harry Potter"))
+    repo.add_author(Author(123, 'test author'))
+    assert repo.get_number_of_books() == 4
+    assert repo.get_number_of_authors() == 6
+
+    book = Book(874659, "Harry Potter 1")
+    book.add_author(Author(124, 'test author 1'))
+    repo.add_book(book)
+    assert repo.get_number_of_books() == 5
+    assert repo.get_number_of_authors() == 7
+
+
+def test_repository_count_cache_sees_external_writes_after_invalidation(session_factory):
+    repo = SqlAlchemyRepository(session_factory, cache_ttl=0)
+    other_repo = SqlAlchemyRepository(session_factory)
+    assert other_repo.get_number_of_books() == 3
+
+    repo.add_book(Book(874658, "Harry Potter"))
+
+    # A zero time to live re-reads the count on every call.
+    assert repo.get_number_of_books() == 4
+    assert other_repo.get_number_of_books() == 3
+    other_repo.invalidate_caches()
+    assert other_repo.get_number_of_books() == 4
+
+
+def test_repository_can_search_books(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    books = repo.search_books('switchblade schussman', 0, 10)
+    assert [book.book_id for book in books] == [25742454]
+    assert repo.search_books('" *', 0, 10) == []
+
+
+def test_repository_search_follows_new_books_and_authors(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    book = Book(1, 'Switchblade Stories')
+    repo.add_book(book)
+    assert [book.book_id for book in repo.search_books('switchblade', 0, 10)] == [1, 25742454]
+
+    author = Author(1, 'Ursula Quill')
+    book.add_author(author)
+    repo.add_author(author)
+    repo.add_book(book)
+    assert [book.book_id for book in repo.search_books('quill', 0, 10)] == [1]
+
+
+def test_repository_can_search_bulk_loaded_books(bulk_session_factory):
+    repo = SqlAlchemyRepository(bulk_session_factory)
+    assert [book.book_id for book in repo.search_books('cruelle', 0, 10)] == [30128855]
+
+
+def test_repository_can_suggest_titles_and_authors(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert repo.get_title_suggestions('the', 10) == [(23272155, 'The Breaker New Waves, Vol 11'),
+                                                     (25742454, 'The Switchblade Mamma')]
+    assert repo.get_author_suggestions('lind', 10) == [(8551671, 'Lindsey Schussman')]
+
+    book = Book(1, 'The Cat')
+    book.ratings_count = 10 ** 6
+    book.add_author(Author(2, 'Lindsey Other'))
+    repo.add_book(book)
+    assert repo.get_title_suggestions('the', 1) == [(1, 'The Cat')]
+    assert len(repo.get_author_suggestions('lind', 10)) == 2
+
+
+def test_repository_adding_a_stored_book_again_keeps_the_caches(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert repo.get_number_of_books() == 3
+    assert repo.get_title_suggestions('the s', 10) == [(25742454, 'The Switchblade Mamma')]
+
+    repo.add_book(repo.get_book(25742454))
+    assert repo.get_number_of_books() == 3
+    assert repo._session_cm.session.query(func.count(Book._Book__book_id)).scalar() == 3
+    assert repo.get_title_suggestions('the s', 10) == [(25742454, 'The Switchblade Mamma')]
+
+
+def test_repository_can_get_books_by_facets(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    page = repo.get_books_by_facets(FacetedQuery(publisher_names=['N/A'], release_year_max=2015), 0, 10)
+    assert [book.book_id for book in page.books] == [23272155]
+    assert page.total == 1
+
+    page = repo.get_books_by_facets(FacetedQuery(author_ids=[8551671], release_year_min=2016, operator='or',
+                                                 sort_by='title', descending=True), 0, 10)
+    assert [book.book_id for book in page.books] == [25742454, 30128855]
+    assert page.facet_counts == {'publisher': [('Dargaud', 1), ('N/A', 1)], 'release_year': [(2016, 1)],
+                                 'ebook': [(True, 1), (False, 1)]}
+
+
+def test_repository_facet_filters_use_compound_indexes(session_factory):
+    engine = session_factory.kw['bind']
+    plan = engine.execute("EXPLAIN QUERY PLAN SELECT book_id FROM books WHERE publisher_name = 'N/A' AND "
+                          "release_year BETWEEN 2000 AND 2020").fetchall()
+    assert 'ix_books_publisher_name_release_year' in plan[0][3]
+    plan = engine.execute("EXPLAIN QUERY PLAN SELECT book_id FROM books WHERE ebook = 1 AND "
+                          "release_year > 2000").fetchall()
+    assert 'ix_books_ebook_release_year' in plan[0][3]
+
+
+def test_repository_can_page_through_books_by_publisher_and_release_year(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    assert [book.book_id for book in repo.get_books_by_publisher('N/A', 0, 1)] == [23272155]
+    assert [book.book_id for book in repo.get_books_by_publisher('N/A', 1, 5)] == [25742454]
+    assert [book.book_id for book in repo.get_books_by_release_year(2016, 0, 5)] == [30128855]
+    assert repo.get_books_by_release_year(2016, 1, 5) == []
+
+
+def test_repository_pages_of_books_by_publisher_need_no_sort(session_factory):
+    engine = session_factory.kw['bind']
+    for condition in ("publisher_name = 'N/A'", "release_year = 2014"):
+        plan = engine.execute(f"EXPLAIN QUERY PLAN SELECT book_id FROM books WHERE {condition} ORDER BY book_id "
+                              "LIMIT 10 OFFSET 10").fetchall()
+        assert not any('TEMP B-TREE' in row[3] for row in plan), plan
+
+
+def test_repository_reset_session_keeps_the_session_registry(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    registry = repo._session_cm.session
+    session = registry()
+    repo.get_book(25742454)
+
+    repo.reset_session()
+
+    assert repo._session_cm.session is registry
+    assert registry() is not session
+    assert repo.get_book(25742454).title == 'The Switchblade Mamma'
+
+
+def test_repository_can_list_books_and_authors_as_rows(session_factory):
+    mapped = SqlAlchemyRepository(session_factory)
+    repo = SqlAlchemyRepository(session_factory, loading_strategy='rows')
+
+    books = repo.get_books_after(None, 10)
+    assert all(isinstance(book, BookRow) for book in books)
+    assert [book.book_id for book in books] == [book.book_id for book in mapped.get_books_after(None, 10)]
+    # Every field of a row holds the same value as the attribute of the mapped book, or author, of the same name.
+    for row, book in zip(books, mapped.get_books_after(None, 10)):
+        for field in BookRow._fields:
+            if field == 'publisher':
+                assert (row.publisher and row.publisher.name) == (book.publisher and book.publisher.name)
+            elif field == 'authors':
+                assert [tuple(author) for author in row.authors] == [
+                    tuple(getattr(author, name) for name in AuthorRow._fields) for author in book.authors]
+            else:
+                assert getattr(row, field) == getattr(book, field), field
+    book = next(book for book in books if book.book_id == 25742454)
+    assert book.title == 'The Switchblade Mamma'
+    assert book.publisher.name == 'N/A'
+    assert [(author.unique_id, author.full_name) for author in book.authors] == [(8551671, 'Lindsey Schussman')]
+
+    assert [book.book_id for book in repo.get_books_by_author_id(8551671)] == [25742454]
+    assert [book.book_id for book in repo.search_books('cruelle', 0, 10)] == [30128855]
+    assert repo.get_books_by_facets(FacetedQuery(publisher_names=['Dargaud']), 0, 10).books[0].book_id == 30128855
+
+    authors = repo.get_authors_after(None, 30)
+    assert all(isinstance(author, AuthorRow) for author in authors)
+    assert [tuple(author) for author in authors] == [
+        tuple(getattr(author, name) for name in AuthorRow._fields) for author in mapped.get_authors_after(None, 30)]
@@ -1,6 +1,8 @@
 import pytest
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.exc import IntegrityError
 
+from library.adapters.orm import metadata, create_missing_indexes, set_sqlite_pragmas
 from library.domain.model import User, Author, Book, Publisher, Review, ReadingList
 
 
@@ -401,3 +403,32 @@ def test_saving_of_reading_list(empty_session):
     ]
     result = empty_session.query(ReadingList).all()
     assert result == expected
+
+
+def test_create_missing_indexes_migrates_existing_database():
+    engine = create_engine('sqlite://')
+    metadata.create_all(engine)
+    engine.execute('DROP INDEX ix_books_release_year')
+    engine.execute('DROP INDEX ix_book_authors_author_id_book_id')
+
+    create_missing_indexes(engine)
+    create_missing_indexes(engine)
+
+    index_names = {index['name'] for index in inspect(engine).get_indexes('books')}
+    assert 'ix_books_release_year' in index_names
+    index_names = {index['name'] for index in inspect(engine).get_indexes('book_authors')}
+    assert 'ix_book_authors_author_id_book_id' in index_names
+
+
+def test_set_sqlite_pragmas_configures_every_connection(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/pragmas.db')
+    set_sqlite_pragmas(engine, {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -2048,
+                                'temp_store': ''})
+
+    for _ in range(2):
+        with engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+            assert connection.exec_driver_sql('PRAGMA synchronous').scalar() == 1
+            assert connection.exec_driver_sql('PRAGMA cache_size').scalar() == -2048
+            assert connection.exec_driver_sql('PRAGMA temp_store').scalar() == 0
+        engine.dispose()